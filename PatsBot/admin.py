@@ -0,0 +1,434 @@
+"""
+pats-bot-admin: scriptable bulk maintenance of tracked users.
+
+Every bulk operation is a single set-based UPDATE/INSERT, and listings are
+streamed from the DB in batches, so it stays fast on thousands of rows.
+
+    pats-bot-admin list --guild 123 --status pending_removal --format csv
+    pats-bot-admin reset --guild 123 --status first_warning_sent --yes
+    pats-bot-admin mark --guild 123 --joined-before 2025-06-01 --yes
+    pats-bot-admin set-date removal_date --days 3 --guild 123 --yes
+    pats-bot-admin export users.csv --guild 123
+    pats-bot-admin import users.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    create_engine,
+    func,
+    insert,
+    literal,
+    null,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import RemovalStatus, RemovalTransition, TrackedUser
+from utilities.removal_workflow import RemovalWorkflow
+from utilities.upsert import dialect_insert
+
+# Use the same DB URL logic as the main app
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+CSV_COLUMNS = [
+    "user_id",
+    "guild_id",
+    "removal_status",
+    "joined_at",
+    "removal_date",
+    "first_warning_sent_at",
+    "final_notice_sent_at",
+    "removed_at",
+    "bot_retries",
+    "next_attempt_at",
+    "departed_at",
+    "first_warning_message_id",
+    "final_notice_message_id",
+    "removal_message_id",
+]
+DATE_FIELDS = ["removal_date", "joined_at", "first_warning_sent_at", "next_attempt_at"]
+
+# Fields cleared when a user goes back to ACTIVE or starts over as PENDING_REMOVAL
+CLEARED_FIELDS = {
+    "first_warning_sent_at": None,
+    "final_notice_sent_at": None,
+    "removed_at": None,
+    "first_warning_message_id": None,
+    "final_notice_message_id": None,
+    "removal_message_id": None,
+    "bot_retries": 0,
+    "next_attempt_at": None,
+}
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("filters")
+    group.add_argument("--guild", action="append", help="Guild ID (repeatable)")
+    group.add_argument("--user", action="append", help="User ID (repeatable)")
+    group.add_argument(
+        "--status",
+        action="append",
+        choices=[status.value for status in RemovalStatus],
+        help="Removal status (repeatable)",
+    )
+    group.add_argument("--joined-before", type=_parse_date, metavar="DATE")
+    group.add_argument("--joined-after", type=_parse_date, metavar="DATE")
+    group.add_argument("--removal-before", type=_parse_date, metavar="DATE")
+    group.add_argument("--removal-after", type=_parse_date, metavar="DATE")
+
+
+def build_filters(args) -> list:
+    """Turn the filter arguments into SQLAlchemy where clauses."""
+    filters = []
+    if args.guild:
+        filters.append(TrackedUser.guild_id.in_(args.guild))
+    if args.user:
+        filters.append(TrackedUser.user_id.in_(args.user))
+    if args.status:
+        filters.append(
+            TrackedUser.removal_status.in_([RemovalStatus(s) for s in args.status])
+        )
+    if args.joined_before:
+        filters.append(TrackedUser.joined_at < args.joined_before)
+    if args.joined_after:
+        filters.append(TrackedUser.joined_at >= args.joined_after)
+    if args.removal_before:
+        filters.append(TrackedUser.removal_date < args.removal_before)
+    if args.removal_after:
+        filters.append(TrackedUser.removal_date >= args.removal_after)
+    return filters
+
+
+def _format_value(value, timespec: str = "auto") -> str:
+    if value is None:
+        return ""
+    if isinstance(value, RemovalStatus):
+        return value.value
+    if isinstance(value, datetime):
+        # CSV keeps microseconds, outbox keys are built from removal_date
+        return value.isoformat(sep=" ", timespec=timespec)
+    return str(value)
+
+
+def stream_users(filters: list, batch_size: int):
+    """Yield lists of rows (CSV_COLUMNS order) without loading everything at once."""
+    stmt = (
+        select(*[getattr(TrackedUser, column) for column in CSV_COLUMNS])
+        .where(*filters)
+        .order_by(TrackedUser.guild_id, TrackedUser.user_id)
+        .execution_options(yield_per=batch_size)
+    )
+    with engine.connect() as connection:
+        for partition in connection.execute(stmt).partitions():
+            yield partition
+
+
+def write_users(out, filters: list, output_format: str, batch_size: int) -> int:
+    written = 0
+    if output_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(CSV_COLUMNS)
+    else:
+        out.write(
+            f"{'user_id':<20} {'guild_id':<20} {'status':<19} {'joined_at':<19} removal_date\n"
+        )
+
+    for partition in stream_users(filters, batch_size):
+        if output_format == "csv":
+            writer.writerows([[_format_value(v) for v in row] for row in partition])
+        else:
+            out.writelines(
+                f"{row.user_id:<20} {row.guild_id:<20} "
+                f"{_format_value(row.removal_status):<19} "
+                f"{_format_value(row.joined_at, 'seconds'):<19} "
+                f"{_format_value(row.removal_date, 'seconds')}\n"
+                for row in partition
+            )
+        written += len(partition)
+        out.flush()
+    return written
+
+
+def count_users(filters: list) -> int:
+    session = Session()
+    try:
+        return session.scalar(
+            select(func.count()).select_from(TrackedUser).where(*filters)
+        )
+    finally:
+        session.close()
+
+
+def journal_transitions(session, filters: list, to_status: RemovalStatus):
+    """Journal every matching user moving to `to_status`, as one INSERT ... SELECT."""
+    session.execute(
+        insert(RemovalTransition).from_select(
+            [
+                "guild_id",
+                "user_id",
+                "from_status",
+                "to_status",
+                "occurred_at",
+                "message_id",
+                "actor",
+            ],
+            select(
+                TrackedUser.guild_id,
+                TrackedUser.user_id,
+                TrackedUser.removal_status,
+                literal(to_status, RemovalTransition.to_status.type),
+                literal(datetime.utcnow(), RemovalTransition.occurred_at.type),
+                null(),
+                literal("cli"),
+            ).where(*filters, TrackedUser.removal_status != to_status),
+        )
+    )
+
+
+def bulk_update(filters: list, values: dict) -> int:
+    """Apply one UPDATE to every matching row. Returns the number of rows changed."""
+    session = Session()
+    try:
+        if "removal_status" in values:
+            # Same transaction, so the journal matches what the UPDATE did
+            journal_transitions(session, filters, values["removal_status"])
+        result = session.execute(
+            update(TrackedUser)
+            .where(*filters)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def _confirm(args, filters: list, action: str) -> bool:
+    if not filters and not args.all:
+        print("❌ Refusing to touch every tracked user, add filters or pass --all")
+        return False
+    matching = count_users(filters)
+    if args.dry_run:
+        print(f"[DRY RUN] Would {action} {matching} users")
+        return False
+    if not args.yes:
+        answer = input(f"{action.capitalize()} {matching} users? [y/N] ")
+        if answer.strip().lower() not in ("y", "yes"):
+            print("Aborted")
+            return False
+    return True
+
+
+def cmd_list(args):
+    write_users(sys.stdout, build_filters(args), args.format, args.batch_size)
+
+
+def cmd_export(args):
+    with open(args.file, "w", newline="", encoding="utf-8") as out:
+        written = write_users(out, build_filters(args), "csv", args.batch_size)
+    print(f"✅ Exported {written} users to {args.file}", file=sys.stderr)
+
+
+def _parse_csv_value(column: str, value: str):
+    """A CSV_COLUMNS cell as written by _format_value, back to its column type."""
+    if column == "removal_status":
+        return RemovalStatus(value or "active")
+    column_type = TrackedUser.__table__.c[column].type
+    if isinstance(column_type, DateTime):
+        return _parse_date(value) if value else None
+    if isinstance(column_type, Integer):
+        return int(value or 0)
+    return value or None
+
+
+def cmd_import(args):
+    now = datetime.utcnow()
+    imported = 0
+    session = Session()
+    try:
+        with open(args.file, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            missing = {"user_id", "guild_id"} - set(reader.fieldnames or [])
+            if missing:
+                print(f"❌ {args.file} has no {', '.join(sorted(missing))} column")
+                return
+            # Columns missing from the file keep their current values
+            columns = [
+                column
+                for column in CSV_COLUMNS
+                if column in (reader.fieldnames or [])
+                or column in ("removal_status", "joined_at")
+            ]
+            batch = []
+            for row in reader:
+                user = {
+                    column: _parse_csv_value(column, row.get(column) or "")
+                    for column in columns
+                }
+                user["joined_at"] = user["joined_at"] or now
+                batch.append(user)
+                if len(batch) >= args.batch_size:
+                    imported += _upsert_users(session, batch)
+                    batch = []
+            if batch:
+                imported += _upsert_users(session, batch)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+    print(f"✅ Imported {imported} users from {args.file}")
+
+
+def _upsert_users(session, batch: list) -> int:
+    # Journal status changes of existing users before the upsert overwrites them
+    by_status = {}
+    for user in batch:
+        by_status.setdefault(user["removal_status"], []).append(
+            (user["guild_id"], user["user_id"])
+        )
+    for status, keys in by_status.items():
+        journal_transitions(
+            session,
+            [tuple_(TrackedUser.guild_id, TrackedUser.user_id).in_(keys)],
+            status,
+        )
+
+    stmt = dialect_insert(session.bind, TrackedUser).values(batch)
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["guild_id", "user_id"],
+            set_={
+                column: stmt.excluded[column]
+                for column in batch[0]
+                if column not in ("guild_id", "user_id")
+            },
+        )
+    )
+    return len(batch)
+
+
+def cmd_reset(args):
+    filters = build_filters(args)
+    if _confirm(args, filters, "reset to active"):
+        changed = bulk_update(
+            filters,
+            {
+                "removal_status": RemovalStatus.ACTIVE,
+                "removal_date": None,
+                **CLEARED_FIELDS,
+            },
+        )
+        print(f"✅ Reset {changed} users to active")
+
+
+def cmd_mark(args):
+    filters = build_filters(args)
+    if _confirm(args, filters, "mark for removal"):
+        removal_date = datetime.utcnow() + RemovalWorkflow.FIRST_WARNING_DURATION
+        changed = bulk_update(
+            filters,
+            {
+                "removal_status": RemovalStatus.PENDING_REMOVAL,
+                "removal_date": removal_date,
+                **CLEARED_FIELDS,
+            },
+        )
+        print(f"✅ Marked {changed} users for removal on {removal_date}")
+
+
+def cmd_set_date(args):
+    filters = build_filters(args)
+    if args.at is not None:
+        value = args.at
+    elif args.days is not None:
+        value = datetime.utcnow() + timedelta(days=args.days)
+    else:
+        print("❌ Pass --at DATE or --days N")
+        return
+    if _confirm(args, filters, f"set {args.field} = {value} for"):
+        changed = bulk_update(filters, {args.field: value})
+        print(f"✅ Set {args.field} to {value} for {changed} users")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pats-bot-admin", description="Bulk tools for PatsBot tracked users"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="Rows per fetch/insert batch"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List tracked users")
+    list_parser.add_argument("--format", choices=["table", "csv"], default="table")
+    add_filter_arguments(list_parser)
+    list_parser.set_defaults(func=cmd_list)
+
+    export_parser = subparsers.add_parser("export", help="Export users to CSV")
+    export_parser.add_argument("file")
+    add_filter_arguments(export_parser)
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser(
+        "import", help="Insert or update users from a CSV (user_id, guild_id, ...)"
+    )
+    import_parser.add_argument("file")
+    import_parser.set_defaults(func=cmd_import)
+
+    bulk_commands = [
+        ("reset", "Reset matching users to active", cmd_reset),
+        ("mark", "Mark matching users for removal", cmd_mark),
+        ("set-date", "Set a date field on matching users", cmd_set_date),
+    ]
+    for name, help_text, func in bulk_commands:
+        bulk_parser = subparsers.add_parser(name, help=help_text)
+        if name == "set-date":
+            bulk_parser.add_argument("field", choices=DATE_FIELDS)
+            when = bulk_parser.add_mutually_exclusive_group()
+            when.add_argument("--at", type=_parse_date, metavar="DATE")
+            when.add_argument(
+                "--days", type=float, help="Days from now (negative for the past)"
+            )
+        add_filter_arguments(bulk_parser)
+        bulk_parser.add_argument(
+            "--all", action="store_true", help="Allow running with no filters"
+        )
+        bulk_parser.add_argument(
+            "--dry-run", action="store_true", help="Only count matching users"
+        )
+        bulk_parser.add_argument(
+            "-y", "--yes", action="store_true", help="Don't ask for confirmation"
+        )
+        bulk_parser.set_defaults(func=func)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
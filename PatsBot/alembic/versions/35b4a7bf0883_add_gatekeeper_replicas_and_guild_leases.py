@@ -0,0 +1,42 @@
+"""add_gatekeeper_replicas_and_guild_leases
+
+Revision ID: 35b4a7bf0883
+Revises: 8539765bf3be
+Create Date: 2026-10-19 09:12:44.102318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "35b4a7bf0883"
+down_revision: Union[str, None] = "8539765bf3be"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "gatekeeper_replicas",
+        sa.Column("replica_id", sa.String(), nullable=False),
+        sa.Column("cluster_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("replica_id"),
+    )
+    op.create_table(
+        "guild_leases",
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("guild_id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("guild_leases")
+    op.drop_table("gatekeeper_replicas")
@@ -0,0 +1,32 @@
+"""index_tracked_users_removal_queue
+
+Revision ID: 3abfaf3839ad
+Revises: b05e040f809c
+Create Date: 2026-10-19 13:41:02.551870
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3abfaf3839ad"
+down_revision: Union[str, None] = "b05e040f809c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_tracked_users_guild_status_date",
+        "tracked_users",
+        ["guild_id", "removal_status", "removal_date", "user_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tracked_users_guild_status_date", table_name="tracked_users")
@@ -0,0 +1,95 @@
+"""command_latency_buckets_as_rows
+
+Revision ID: 64a439a0fd2b
+Revises: e4b1d07c9a52
+Create Date: 2026-10-19 19:12:40.318256
+
+"""
+
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "64a439a0fd2b"
+down_revision: Union[str, None] = "e4b1d07c9a52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+usage = sa.table(
+    "command_usage_daily",
+    sa.column("day", sa.Date()),
+    sa.column("guild_id", sa.String()),
+    sa.column("command", sa.String()),
+    sa.column("latency_buckets", sa.Text()),
+)
+latency = sa.table(
+    "command_latency_daily",
+    sa.column("day", sa.Date()),
+    sa.column("guild_id", sa.String()),
+    sa.column("command", sa.String()),
+    sa.column("bucket", sa.Integer()),
+    sa.column("count", sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "command_latency_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("command", sa.String(), nullable=False),
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("day", "guild_id", "command", "bucket"),
+    )
+
+    # Spread the JSON histograms out into rows
+    bind = op.get_bind()
+    rows = [
+        {
+            "day": row.day,
+            "guild_id": row.guild_id,
+            "command": row.command,
+            "bucket": bucket,
+            "count": count,
+        }
+        for row in bind.execute(
+            sa.select(usage).where(usage.c.latency_buckets.is_not(None))
+        )
+        for bucket, count in enumerate(json.loads(row.latency_buckets))
+        if count
+    ]
+    if rows:
+        op.bulk_insert(latency, rows)
+
+    with op.batch_alter_table("command_usage_daily") as batch_op:
+        batch_op.drop_column("latency_buckets")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("command_usage_daily") as batch_op:
+        batch_op.add_column(sa.Column("latency_buckets", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    histograms = {}
+    for row in bind.execute(sa.select(latency)):
+        buckets = histograms.setdefault((row.day, row.guild_id, row.command), [])
+        buckets.extend([0] * (row.bucket + 1 - len(buckets)))
+        buckets[row.bucket] = row.count
+    for (day, guild_id, command), buckets in histograms.items():
+        bind.execute(
+            sa.update(usage)
+            .where(
+                usage.c.day == day,
+                usage.c.guild_id == guild_id,
+                usage.c.command == command,
+            )
+            .values(latency_buckets=json.dumps(buckets))
+        )
+
+    op.drop_table("command_latency_daily")
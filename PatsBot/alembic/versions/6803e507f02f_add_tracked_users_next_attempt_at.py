@@ -0,0 +1,31 @@
+"""add_tracked_users_next_attempt_at
+
+Revision ID: 6803e507f02f
+Revises: f84e6dd65651
+Create Date: 2026-10-19 14:38:12.470661
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "6803e507f02f"
+down_revision: Union[str, None] = "f84e6dd65651"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "tracked_users", sa.Column("next_attempt_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("tracked_users") as batch_op:
+        batch_op.drop_column("next_attempt_at")
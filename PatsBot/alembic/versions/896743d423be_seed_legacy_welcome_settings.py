@@ -0,0 +1,69 @@
+"""seed_legacy_welcome_settings
+
+Revision ID: 896743d423be
+Revises: 9270f79ac3b1
+Create Date: 2026-10-19 12:08:32.640915
+
+"""
+
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "896743d423be"
+down_revision: Union[str, None] = "9270f79ac3b1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The welcome config that used to be hard coded in cogs/welcome.py
+LEGACY_GUILD_ID = "945386790402023554"
+LEGACY_SETTINGS = {
+    "welcome_trigger_role": 1136372559160545375,
+    "welcome_channel": 1136410197921898589,  # Age verification channel
+    "welcome_message": (
+        "Welcome {name} to the Azorewrath Server!\n"
+        "If you want access to nsfw, please visit the age verification channel: {channel}\n"
+        "Other than that, please enjoy your stay!"
+    ),
+}
+
+guild_settings = sa.table(
+    "guild_settings",
+    sa.column("guild_id", sa.String()),
+    sa.column("key", sa.String()),
+    sa.column("value", sa.Text()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    configured = bind.execute(
+        sa.select(guild_settings.c.key).where(
+            guild_settings.c.guild_id == LEGACY_GUILD_ID,
+            guild_settings.c.key.in_(list(LEGACY_SETTINGS)),
+        )
+    ).first()
+    if configured:
+        return
+
+    op.bulk_insert(
+        guild_settings,
+        [
+            {"guild_id": LEGACY_GUILD_ID, "key": key, "value": json.dumps(value)}
+            for key, value in LEGACY_SETTINGS.items()
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        guild_settings.delete().where(
+            guild_settings.c.guild_id == LEGACY_GUILD_ID,
+            guild_settings.c.key.in_(list(LEGACY_SETTINGS)),
+        )
+    )
@@ -0,0 +1,38 @@
+"""add_command_usage_daily
+
+Revision ID: 9270f79ac3b1
+Revises: d1eb25abe4c7
+Create Date: 2026-10-19 11:20:51.873406
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "9270f79ac3b1"
+down_revision: Union[str, None] = "d1eb25abe4c7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "command_usage_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("command", sa.String(), nullable=False),
+        sa.Column("uses", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("latency_buckets", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("day", "guild_id", "command"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("command_usage_daily")
@@ -0,0 +1,63 @@
+"""tracked_users_guild_user_key
+
+Revision ID: a3c9e51d7b20
+Revises: 50ba3a680f5f
+Create Date: 2026-10-19 17:12:44.208613
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a3c9e51d7b20"
+down_revision: Union[str, None] = "50ba3a680f5f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _set_primary_key(columns) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        # SQLite can't alter a primary key, batch mode copies the table
+        table = sa.Table("tracked_users", sa.MetaData(), autoload_with=bind)
+        for column in table.columns:
+            column.primary_key = False
+        table.append_constraint(
+            sa.PrimaryKeyConstraint(*columns, name="tracked_users_pkey")
+        )
+        with op.batch_alter_table("tracked_users", copy_from=table, recreate="always"):
+            pass
+    else:
+        op.drop_constraint("tracked_users_pkey", "tracked_users", type_="primary")
+        op.create_primary_key("tracked_users_pkey", "tracked_users", columns)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # user_id was unique on its own, so no (guild_id, user_id) duplicates exist
+    _set_primary_key(["guild_id", "user_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Keep each user's most recently joined membership, the rest can't fit
+    tracked_users = sa.table(
+        "tracked_users",
+        sa.column("user_id", sa.String),
+        sa.column("guild_id", sa.String),
+        sa.column("joined_at", sa.DateTime),
+    )
+    newer = tracked_users.alias("newer")
+    op.execute(
+        tracked_users.delete().where(
+            sa.exists().where(
+                newer.c.user_id == tracked_users.c.user_id,
+                sa.tuple_(newer.c.joined_at, newer.c.guild_id)
+                > sa.tuple_(tracked_users.c.joined_at, tracked_users.c.guild_id),
+            )
+        )
+    )
+    _set_primary_key(["user_id"])
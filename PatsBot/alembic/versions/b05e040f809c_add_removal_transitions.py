@@ -0,0 +1,66 @@
+"""add_removal_transitions
+
+Revision ID: b05e040f809c
+Revises: 9cd8f4c52f77
+Create Date: 2026-10-19 13:20:44.108263
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "b05e040f809c"
+down_revision: Union[str, None] = "9cd8f4c52f77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REMOVAL_STATUSES = (
+    "ACTIVE",
+    "PENDING_REMOVAL",
+    "FIRST_WARNING_SENT",
+    "FINAL_NOTICE_SENT",
+    "REMOVED",
+)
+
+# Reuse the removalstatus type tracked_users already created on Postgres
+removal_status_enum = sa.Enum(*REMOVAL_STATUSES, name="removalstatus").with_variant(
+    postgresql.ENUM(*REMOVAL_STATUSES, name="removalstatus", create_type=False),
+    "postgresql",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "removal_transitions",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("from_status", removal_status_enum, nullable=True),
+        sa.Column("to_status", removal_status_enum, nullable=False),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("message_id", sa.String(), nullable=True),
+        sa.Column("actor", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_removal_transitions_guild_time",
+        "removal_transitions",
+        ["guild_id", "occurred_at", "id"],
+    )
+    op.create_index(
+        "ix_removal_transitions_user_time",
+        "removal_transitions",
+        ["user_id", "occurred_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_removal_transitions_user_time", table_name="removal_transitions")
+    op.drop_index("ix_removal_transitions_guild_time", table_name="removal_transitions")
+    op.drop_table("removal_transitions")
@@ -0,0 +1,87 @@
+"""normalize_guild_settings
+
+Revision ID: d1eb25abe4c7
+Revises: 35b4a7bf0883
+Create Date: 2026-10-19 10:03:17.554210
+
+"""
+
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "d1eb25abe4c7"
+down_revision: Union[str, None] = "35b4a7bf0883"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+guilds = sa.table(
+    "guilds",
+    sa.column("guild_id", sa.String()),
+    sa.column("settings", sa.Text()),
+)
+guild_settings = sa.table(
+    "guild_settings",
+    sa.column("guild_id", sa.String()),
+    sa.column("key", sa.String()),
+    sa.column("value", sa.Text()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "guild_settings",
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("value", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("guild_id", "key"),
+    )
+    op.create_index(
+        "ix_guild_settings_key_value", "guild_settings", ["key", "value"], unique=False
+    )
+
+    # Explode each JSON blob into one row per setting
+    bind = op.get_bind()
+    rows = []
+    for guild_id, settings in bind.execute(
+        sa.select(guilds.c.guild_id, guilds.c.settings)
+    ):
+        try:
+            parsed = json.loads(settings) if settings else {}
+        except ValueError:
+            parsed = {}
+        for key, value in parsed.items():
+            rows.append({"guild_id": guild_id, "key": key, "value": json.dumps(value)})
+    if rows:
+        op.bulk_insert(guild_settings, rows)
+
+    with op.batch_alter_table("guilds") as batch_op:
+        batch_op.drop_column("settings")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("guilds") as batch_op:
+        batch_op.add_column(sa.Column("settings", sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    blobs = {}
+    for guild_id, key, value in bind.execute(
+        sa.select(
+            guild_settings.c.guild_id, guild_settings.c.key, guild_settings.c.value
+        )
+    ):
+        blobs.setdefault(guild_id, {})[key] = json.loads(value) if value else None
+    for guild_id, settings in blobs.items():
+        bind.execute(
+            guilds.update()
+            .where(guilds.c.guild_id == guild_id)
+            .values(settings=json.dumps(settings))
+        )
+
+    op.drop_index("ix_guild_settings_key_value", table_name="guild_settings")
+    op.drop_table("guild_settings")
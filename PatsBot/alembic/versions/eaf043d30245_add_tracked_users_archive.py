@@ -0,0 +1,79 @@
+"""add_tracked_users_archive
+
+Revision ID: eaf043d30245
+Revises: 6803e507f02f
+Create Date: 2026-10-19 15:02:37.918244
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "eaf043d30245"
+down_revision: Union[str, None] = "6803e507f02f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REMOVAL_STATUSES = (
+    "ACTIVE",
+    "PENDING_REMOVAL",
+    "FIRST_WARNING_SENT",
+    "FINAL_NOTICE_SENT",
+    "REMOVED",
+)
+
+# Reuse the removalstatus type tracked_users already created on Postgres
+removal_status_enum = sa.Enum(*REMOVAL_STATUSES, name="removalstatus").with_variant(
+    postgresql.ENUM(*REMOVAL_STATUSES, name="removalstatus", create_type=False),
+    "postgresql",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "tracked_users", sa.Column("departed_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index("ix_tracked_users_departed_at", "tracked_users", ["departed_at"])
+
+    op.create_table(
+        "tracked_users_archive",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("guild_id", sa.String(), nullable=False),
+        sa.Column("joined_at", sa.DateTime(), nullable=True),
+        sa.Column("roles", sa.Text(), nullable=True),
+        sa.Column("removal_status", removal_status_enum, nullable=False),
+        sa.Column("removal_date", sa.DateTime(), nullable=True),
+        sa.Column("first_warning_sent_at", sa.DateTime(), nullable=True),
+        sa.Column("final_notice_sent_at", sa.DateTime(), nullable=True),
+        sa.Column("removed_at", sa.DateTime(), nullable=True),
+        sa.Column("first_warning_message_id", sa.String(), nullable=True),
+        sa.Column("final_notice_message_id", sa.String(), nullable=True),
+        sa.Column("removal_message_id", sa.String(), nullable=True),
+        sa.Column("bot_retries", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+        sa.Column("departed_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.Column("archive_reason", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_tracked_users_archive_user",
+        "tracked_users_archive",
+        ["user_id", "archived_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tracked_users_archive_user", table_name="tracked_users_archive")
+    op.drop_table("tracked_users_archive")
+
+    op.drop_index("ix_tracked_users_departed_at", table_name="tracked_users")
+    with op.batch_alter_table("tracked_users") as batch_op:
+        batch_op.drop_column("departed_at")
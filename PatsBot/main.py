@@ -1,29 +1,27 @@
 import os
 import sys
+import signal
 import logging
-import colorlog
 import discord
 from discord.ext import commands
 import asyncio
 import discordhealthcheck
+from utilities.cache_invalidation import LISTENER as CACHE_INVALIDATIONS
+from utilities.command_sync import sync_commands
+from utilities.log_pipeline import configure_logging
+from utilities.member_cache import LEAN_MEMBER_CACHE, bot_options
+from utilities.sharding import (
+    CLUSTER_ID,
+    CLUSTER_COUNT,
+    SHARD_COUNT,
+    cluster_shard_ids,
+    is_primary_cluster,
+    is_sharded,
+)
 
 
 class PatsBot:
     def __init__(self):
-        # Set up colorlog for colored logs
-        handler = colorlog.StreamHandler()
-        handler.setFormatter(
-            colorlog.ColoredFormatter(
-                "%(log_color)s%(levelname)s:%(name)s: %(message)s",
-                log_colors={
-                    "DEBUG": "cyan",
-                    "INFO": "green",
-                    "WARNING": "yellow",
-                    "ERROR": "red",
-                    "CRITICAL": "bold_red",
-                },
-            )
-        )
         debug_env = str(os.environ.get("DEBUG", "0")).lower() in (
             "true",
             "1",
@@ -31,7 +29,8 @@ class PatsBot:
             "yes",
         )
         log_level = logging.DEBUG if debug_env else logging.INFO
-        logging.basicConfig(level=log_level, handlers=[handler])
+        # Colored (or LOG_FORMAT=json) output, written from a background thread
+        configure_logging(log_level)
 
         # Mute discord.py logs except warnings/errors
         discord_logger = logging.getLogger("discord")
@@ -39,18 +38,26 @@ class PatsBot:
         for h in discord_logger.handlers[:]:
             discord_logger.removeHandler(h)
 
-        intents = discord.Intents.default()
-        intents.message_content = True  # Required for command processing
-        intents.members = True  # Required for member join/listen
-        # Enable privileged intents only if needed in the future
-        # intents.guilds = True
-        # intents.guild_messages = True
-        # intents.messages = True
-        # intents.reactions = True
-        # intents.members = True
-        # intents.message_content = True
+        # Intents and member cache settings, narrower with LEAN_MEMBER_CACHE
+        options = bot_options()
+        if LEAN_MEMBER_CACHE:
+            logging.info("Lean member cache: only chunking guilds that need members")
 
-        self.bot = commands.Bot(command_prefix=commands.when_mentioned, intents=intents)
+        if is_sharded():
+            # SHARD_COUNT=auto (0) lets discord.py ask the gateway for a count
+            shard_ids = cluster_shard_ids()
+            self.bot = commands.AutoShardedBot(
+                command_prefix=commands.when_mentioned,
+                shard_count=SHARD_COUNT or None,
+                shard_ids=shard_ids,
+                **options,
+            )
+            logging.info(
+                f"Sharded mode: cluster {CLUSTER_ID}/{CLUSTER_COUNT}, "
+                f"shard_count={SHARD_COUNT or 'auto'}, shard_ids={shard_ids or 'all'}"
+            )
+        else:
+            self.bot = commands.Bot(command_prefix=commands.when_mentioned, **options)
         self.bot.remove_command("help")
         self.version = str(os.environ.get("GIT_COMMIT", "dev"))
         self.healthcheck_server = None
@@ -75,32 +82,46 @@ class PatsBot:
         logging.info(
             "Preparing external monitoring (using discordhealthcheck https://pypi.org/project/discordhealthcheck/)"
         )
-        self.healthcheck_server = await discordhealthcheck.start(self.bot)
+        # Each cluster process gets its own port, cluster 0 keeps the default
+        self.healthcheck_server = await discordhealthcheck.start(
+            self.bot, port=40404 + CLUSTER_ID
+        )
         logging.info("Done prepping external monitoring")
 
     def run(self):
         async def runner():
             await self.load_cogs()
+            # Drops cached settings when another process changes them
+            CACHE_INVALIDATIONS.start()
 
             @self.bot.event
             async def on_ready():
-                await self.prep_monitoring()
+                # on_ready fires again after reconnects, the server is still up
+                if self.healthcheck_server is None:
+                    await self.prep_monitoring()
+                if not is_primary_cluster():
+                    # App commands are global, only one cluster needs to sync them
+                    return
                 guild_id = os.environ.get("GUILD_ID")
-                if guild_id:
-                    try:
-                        guild = discord.Object(id=int(guild_id))
-                        await self.bot.tree.sync(guild=guild)
-                        logging.info(f"Synced app commands to guild {guild_id}")
-                    except Exception as e:
-                        logging.error(
-                            f"Failed to sync app commands to guild {guild_id}: {e}"
-                        )
-                else:
-                    try:
-                        await self.bot.tree.sync()
-                        logging.info("Synced app commands globally")
-                    except Exception as e:
-                        logging.error(f"Failed to sync app commands globally: {e}")
+                guild = discord.Object(id=int(guild_id)) if guild_id else None
+                scope = f"guild {guild_id}" if guild_id else "globally"
+                try:
+                    # Only when the commands changed since the last sync
+                    if await sync_commands(self.bot, guild=guild):
+                        logging.info(f"Synced app commands {scope}")
+                    else:
+                        logging.info(f"App commands unchanged, skipped sync {scope}")
+                except Exception as e:
+                    logging.error(f"Failed to sync app commands {scope}: {e}")
+
+            # docker stop sends SIGTERM. Closing the bot unloads the cogs, so their
+            # cog_unload hooks (lease release, journal/stats flush, the state
+            # snapshot, handing running jobs back) get to run before we exit
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(
+                    sig, lambda: asyncio.create_task(self.bot.close())
+                )
 
             await self.bot.start(os.environ.get("DISCORD_TOKEN", ""))
 
@@ -1,5 +1,17 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Date,
+    Text,
+    Boolean,
+    JSON,
+    Enum,
+    Index,
+    PrimaryKeyConstraint,
+)
 from sqlalchemy.dialects.sqlite import JSON
 import datetime
 import enum
@@ -26,13 +38,23 @@ class Guild(Base):
     guild_id = Column(String, primary_key=True)  # Discord guild ID as string
     name = Column(String, nullable=True)
     joined_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
-    settings = Column(Text, nullable=True)  # JSON string for guild settings
+
+
+class GuildSetting(Base):
+    __tablename__ = "guild_settings"
+    guild_id = Column(String, primary_key=True)  # Discord guild ID as string
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=True)  # JSON encoded so types round trip
+
+    # Lets us find e.g. every guild with gatekeeper_enabled = true in one lookup
+    __table_args__ = (Index("ix_guild_settings_key_value", "key", "value"),)
 
 
 class TrackedUser(Base):
     __tablename__ = "tracked_users"
-    user_id = Column(String, primary_key=True)  # Discord user ID as string
-    guild_id = Column(String, nullable=False)  # Which guild this user belongs to
+    # One row per guild membership, keyed (guild_id, user_id)
+    user_id = Column(String, nullable=False)  # Discord user ID as string
+    guild_id = Column(String, nullable=False)  # Which guild this membership is in
     joined_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     roles = Column(Text, nullable=True)  # Store as comma-separated string or JSON
 
@@ -64,9 +86,190 @@ class TrackedUser(Base):
     bot_retries = Column(
         Integer, nullable=False, default=0
     )  # Error code 50007 is when a user has dissallowed bots to send messages to them
+    next_attempt_at = Column(
+        DateTime, nullable=True
+    )  # Don't retry the first warning before this (backoff after 50007)
+    departed_at = Column(
+        DateTime, nullable=True
+    )  # Left the guild (or the bot did); archived a while later
+
+    __table_args__ = (
+        # Guild first so per-guild scans are a range of the key
+        PrimaryKeyConstraint("guild_id", "user_id", name="tracked_users_pkey"),
+        # Serves the removal loop's status scans and /removal_list keyset pages
+        Index(
+            "ix_tracked_users_guild_status_date",
+            "guild_id",
+            "removal_status",
+            "removal_date",
+            "user_id",
+        ),
+        Index("ix_tracked_users_departed_at", "departed_at"),
+    )
+
+
+class ArchivedTrackedUser(Base):
+    __tablename__ = "tracked_users_archive"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Copy of the TrackedUser row when it was archived
+    user_id = Column(String, nullable=False)
+    guild_id = Column(String, nullable=False)
+    joined_at = Column(DateTime, nullable=True)
+    roles = Column(Text, nullable=True)
+    removal_status = Column(Enum(RemovalStatus), nullable=False)
+    removal_date = Column(DateTime, nullable=True)
+    first_warning_sent_at = Column(DateTime, nullable=True)
+    final_notice_sent_at = Column(DateTime, nullable=True)
+    removed_at = Column(DateTime, nullable=True)
+    first_warning_message_id = Column(String, nullable=True)
+    final_notice_message_id = Column(String, nullable=True)
+    removal_message_id = Column(String, nullable=True)
+    bot_retries = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    departed_at = Column(DateTime, nullable=True)
+
+    archived_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    archive_reason = Column(String, nullable=False)  # departed, removed or orphaned
+
+    __table_args__ = (Index("ix_tracked_users_archive_user", "user_id", "archived_at"),)
 
 
 class KeyValue(Base):
     __tablename__ = "key_value_store"
     key = Column(String, primary_key=True)
     value = Column(Text, nullable=True)
+
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Version pollers track
+    topic = Column(String, nullable=False)  # e.g. "guild_settings" or "kv"
+    key = Column(String, nullable=True)  # None drops the whole topic
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    # Ids must never be reused after pruning or pollers would skip them
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class GatekeeperReplica(Base):
+    __tablename__ = "gatekeeper_replicas"
+    replica_id = Column(
+        String, primary_key=True
+    )  # hostname:pid unless REPLICA_ID is set
+    cluster_id = Column(Integer, nullable=False, default=0)  # Shard cluster it serves
+    heartbeat_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
+class GuildLease(Base):
+    __tablename__ = "guild_leases"
+    guild_id = Column(String, primary_key=True)  # Discord guild ID as string
+    owner_id = Column(String, nullable=False)  # replica_id holding the lease
+    expires_at = Column(DateTime, nullable=False)  # Free to claim after this
+
+
+class CommandUsageDaily(Base):
+    __tablename__ = "command_usage_daily"
+    day = Column(Date, primary_key=True)  # UTC day the commands completed on
+    guild_id = Column(String, primary_key=True)  # "0" for DMs
+    command = Column(String, primary_key=True)  # Qualified app command name
+    uses = Column(Integer, nullable=False, default=0)
+    total_ms = Column(Integer, nullable=False, default=0)  # For averages
+    max_ms = Column(Integer, nullable=False, default=0)
+
+
+class CommandLatencyDaily(Base):
+    # Latency histogram of a command_usage_daily row, one row per bucket
+    __tablename__ = "command_latency_daily"
+    day = Column(Date, primary_key=True)
+    guild_id = Column(String, primary_key=True)
+    command = Column(String, primary_key=True)
+    # Index into command_stats.LATENCY_BUCKETS_MS, len() of it for the overflow
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DMChannel(Base):
+    __tablename__ = "dm_channels"
+    user_id = Column(String, primary_key=True)  # Discord user ID as string
+    channel_id = Column(String, nullable=False)  # Their DM channel with the bot
+    updated_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+
+class RemovalTransition(Base):
+    __tablename__ = "removal_transitions"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    guild_id = Column(String, nullable=False)  # Discord guild ID as string
+    user_id = Column(String, nullable=False)  # Discord user ID as string
+    from_status = Column(Enum(RemovalStatus), nullable=True)  # None for new users
+    to_status = Column(Enum(RemovalStatus), nullable=False)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    message_id = Column(String, nullable=True)  # DM sent with the transition, if any
+    actor = Column(
+        String, nullable=False, default="gatekeeper"
+    )  # "gatekeeper", "admin:<user id>" or "cli"
+
+    # Append only and always read newest first, per guild or per user
+    __table_args__ = (
+        Index("ix_removal_transitions_guild_time", "guild_id", "occurred_at", "id"),
+        Index("ix_removal_transitions_user_time", "user_id", "occurred_at", "id"),
+    )
+
+
+class OutboxMessage(Base):
+    __tablename__ = "gatekeeper_outbox"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    idempotency_key = Column(String, nullable=False, unique=True)
+    guild_id = Column(String, nullable=False)  # Discord guild ID as string
+    user_id = Column(String, nullable=True)  # Member the action is about, if any
+    kind = Column(String, nullable=False)  # "dm", "kick" or "admin_post"
+    payload = Column(Text, nullable=False)  # JSON, depends on kind
+    status = Column(
+        String, nullable=False, default="pending"
+    )  # pending, sending, sent or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(
+        DateTime, nullable=False, default=datetime.datetime.utcnow
+    )  # Due time while pending (backoff), lease expiry while sending
+    claimed_by = Column(String, nullable=True)  # Claim token of the current lease
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    result = Column(String, nullable=True)  # e.g. Discord message ID
+    last_error = Column(Text, nullable=True)
+
+    # Dispatchers claim the oldest due entries
+    __table_args__ = (
+        Index("ix_gatekeeper_outbox_due", "status", "available_at", "id"),
+    )
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # e.g. "member_sync"
+    guild_id = Column(String, nullable=False)  # Discord guild ID as string
+    params = Column(Text, nullable=False)  # JSON, depends on kind
+    status = Column(
+        String, nullable=False, default="queued"
+    )  # queued, running, done, failed or cancelled
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)  # None when it isn't known up front
+    checkpoint = Column(Text, nullable=True)  # JSON the handler resumes from
+    available_at = Column(
+        DateTime, nullable=False, default=datetime.datetime.utcnow
+    )  # Due time while queued, lease expiry while running
+    claimed_by = Column(String, nullable=True)  # Claim token of the current lease
+    channel_id = Column(String, nullable=True)  # Status message edited with progress
+    message_id = Column(String, nullable=True)
+    created_by = Column(String, nullable=True)  # Discord user ID
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    result = Column(Text, nullable=True)  # Summary shown when done
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Runners claim the oldest due jobs
+        Index("ix_background_jobs_due", "status", "available_at", "id"),
+        # /jobs lists a guild's latest
+        Index("ix_background_jobs_guild", "guild_id", "id"),
+    )
@@ -1,11 +1,10 @@
 import discord
 import logging
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import yaml
+import asyncio
 import random
-import os
-from pathlib import Path
+from utilities.fact_packs import load_facts, pack_signature
 
 
 class FunFactsCog(commands.Cog):
@@ -13,29 +12,52 @@ class FunFactsCog(commands.Cog):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
         self.facts = []
-        self.load_facts()
+        self.signature = None  # Stat fingerprint of the packs we loaded
+        self.shuffle_bags = {}  # channel_id -> facts not yet served there
 
-    def load_facts(self):
-        """Load fun facts from the YAML file"""
-        try:
-            # Get the path to the Data directory relative to the bot's main directory
-            data_path = (
-                Path(__file__).parent.parent / "PatsBot" / "Data" / "FunFacts.yaml"
-            )
+    async def cog_load(self):
+        await self.load_facts()
+        self.reload_facts_loop.start()
+
+    async def cog_unload(self):
+        self.reload_facts_loop.cancel()
 
-            if not data_path.exists():
-                self.logger.warning(f"FunFacts.yaml not found at {data_path}")
-                return
+    async def load_facts(self):
+        """Load fun facts from the fact packs (off the event loop)"""
+        try:
+            facts, signature = await asyncio.to_thread(load_facts)
+        except Exception as e:
+            self.logger.error(f"Error loading fun facts: {e}")
+            return
 
-            with open(data_path, "r", encoding="utf-8") as file:
-                data = yaml.safe_load(file)
-                self.facts = data.get("facts", [])
+        if not facts:
+            self.logger.warning("No fun facts found in any fact pack")
 
-            self.logger.info(f"Loaded {len(self.facts)} fun facts")
+        self.facts = facts
+        self.signature = signature
+        # Old bags may hold removed facts, start everyone on a fresh shuffle
+        self.shuffle_bags = {}
+        self.logger.info(f"Loaded {len(self.facts)} fun facts")
 
+    @tasks.loop(seconds=30)
+    async def reload_facts_loop(self):
+        """Reload the packs in the background when any of them change."""
+        # An exception would stop the loop for good, so log and try next time
+        try:
+            signature = await asyncio.to_thread(pack_signature)
+            if signature != self.signature:
+                self.logger.info("Fun fact packs changed, reloading")
+                await self.load_facts()
         except Exception as e:
-            self.logger.error(f"Error loading fun facts: {e}")
-            self.facts = []
+            self.logger.error(f"Error checking fun fact packs: {e}")
+
+    def next_fact(self, channel_id: int) -> str:
+        """Draw from the channel's shuffle bag, so no repeats until all facts are used."""
+        bag = self.shuffle_bags.get(channel_id)
+        if not bag:
+            bag = random.sample(self.facts, len(self.facts))
+            self.shuffle_bags[channel_id] = bag
+        return bag.pop()
 
     @app_commands.command(name="fun_fact", description="Get a random fun fact!")
     async def fun_fact(self, interaction: discord.Interaction):
@@ -47,7 +69,7 @@ class FunFactsCog(commands.Cog):
             return
 
         # Get a random fact
-        fact = random.choice(self.facts)
+        fact = self.next_fact(interaction.channel_id)
 
         # Create an embed for the fun fact
         embed = discord.Embed(
@@ -10,15 +10,75 @@ from sqlalchemy.orm import sessionmaker
 import os
 from utilities.guild_settings import (
     get_guild_setting,
+    get_guild_settings,
+    get_guilds_with_setting,
     set_guild_setting,
+    set_guild_settings,
     ensure_guild_exists,
 )
-from utilities.removal_workflow import RemovalWorkflow
+from utilities.removal_workflow import SCAN_CHUNK_SIZE, RemovalWorkflow
+from utilities.removal_journal import JOURNAL, get_history
+from utilities.outbox import Outcome, OutboxDispatcher, enqueue, outbox_entry
+from utilities.pagination import KeysetPaginator
+from utilities.removal_forecast import STAGES as FORECAST_STAGES, get_forecast
+from utilities.sharding import owns_guild
+from utilities.state_snapshot import GuildState, load_snapshot, write_snapshot
+from utilities.clock import Clock, SYSTEM_CLOCK
+from utilities.dm_channels import send_dm
+from utilities.member_cache import ensure_chunked
+from utilities.tracked_user_archive import (
+    ARCHIVE_BATCH_SIZE,
+    archive_batch,
+    archive_rules,
+    get_tracked_guild_ids,
+)
+from utilities.background_jobs import (
+    RUNNER as JOBS,
+    create_job,
+    get_active_job,
+    register,
+    render_status,
+    set_status_message,
+    unregister,
+)
+from utilities.guild_leases import (
+    HEARTBEAT_INTERVAL,
+    rebalance_leases,
+    release_leases,
+    renew_lease,
+)
 import random
 
 REQUIRED_ROLE = os.environ.get("REQUIRED_ROLE", "Verified")
 GRACE_PERIOD = timedelta(days=3)
 
+# TODO: Make this not just hardcoded
+ENTRY_CHANNEL_LINK = (
+    "https://discord.com/channels/945386790402023554/1136377876942442568"
+)
+
+# How often buffered removal transitions are written to the journal
+JOURNAL_FLUSH_SECONDS = int(os.environ.get("REMOVAL_JOURNAL_FLUSH_SECONDS", "10"))
+# Members synced per worker thread hop when gatekeeper is enabled
+MEMBER_SYNC_BATCH_SIZE = 100
+# How often the warm restart snapshot is written (it's also written on shutdown)
+SNAPSHOT_INTERVAL_MINUTES = int(os.environ.get("GATEKEEPER_SNAPSHOT_MINUTES", "10"))
+
+STATUS_EMOJI = {
+    RemovalStatus.ACTIVE: "✅",
+    RemovalStatus.PENDING_REMOVAL: "⏳",
+    RemovalStatus.FIRST_WARNING_SENT: "⚠️",
+    RemovalStatus.FINAL_NOTICE_SENT: "🚨",
+    RemovalStatus.REMOVED: "🚫",
+}
+
+# Status a user must still be in for a queued DM of each stage to go out
+DM_STAGE_STATUS = {
+    "first_warning": RemovalStatus.FIRST_WARNING_SENT,
+    "final_notice": RemovalStatus.FINAL_NOTICE_SENT,
+    "removal": RemovalStatus.REMOVED,
+}
+
 # Dry run mode - set to True to prevent actual DMs and kicks
 DRY_RUN_MODE = os.environ.get("DRY_RUN_MODE", "false").lower() == "true"
 
@@ -29,15 +89,55 @@ Session = sessionmaker(bind=engine)
 
 
 class Gatekeeper(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, clock: Clock = SYSTEM_CLOCK):
         self.bot = bot
+        self.clock = clock  # Swapped for a SimulatedClock in simulations
         self.logger = logging.getLogger(__name__)
+        self.leased_guild_ids = set()  # Guilds this replica runs removals for
+        self.known_guild_ids = set()  # Guilds with a record in the DB
+        self.synced_guilds = {}  # guild_id -> when its members were last synced
+        # DMs, kicks and admin posts are queued in the DB and sent from here
+        self.outbox = OutboxDispatcher(
+            {
+                "dm": self.deliver_dm,
+                "kick": self.deliver_kick,
+                "admin_post": self.deliver_admin_post,
+            },
+            clock=clock,
+            on_give_up=self.delivery_given_up,
+        )
 
         if DRY_RUN_MODE:
             self.logger.warning(
                 "🚨 DRY RUN MODE ENABLED - No actual DMs or kicks will be sent!"
             )
 
+    async def cog_load(self):
+        # /manage_gatekeeper enable runs its member sync as a background job
+        register("member_sync", self.run_member_sync)
+
+    def cog_unload(self):
+        unregister("member_sync", self.run_member_sync)
+        self.lease_heartbeat_loop.cancel()
+        self.removal_check_loop.cancel()
+        self.journal_flush_loop.cancel()
+        self.archive_loop.cancel()
+        self.snapshot_loop.cancel()
+        self.outbox.stop()
+        try:
+            self.write_state_snapshot()
+        except Exception as e:
+            self.logger.error(f"Error writing state snapshot: {e}")
+        try:
+            JOURNAL.flush()
+        except Exception as e:
+            self.logger.error(f"Error flushing removal journal: {e}")
+        try:
+            # Let peers take over right away instead of waiting for expiry
+            release_leases()
+        except Exception as e:
+            self.logger.error(f"Error releasing guild leases: {e}")
+
     def get_gatekeeper_enabled(self, guild_id: int) -> bool:
         """Check if gatekeeper is enabled for a guild."""
         return get_guild_setting(guild_id, "gatekeeper_enabled", False)
@@ -50,19 +150,117 @@ class Gatekeeper(commands.Cog):
         """Get the required role for a guild from guild settings."""
         return get_guild_setting(guild_id, "gatekeeper_required_role")
 
-    async def sync_guild_members(self, guild):
-        """Sync members from a specific guild to the database."""
+    def get_enabled_guild_ids(self) -> set:
+        """IDs of every guild with gatekeeper enabled, from one indexed query."""
+        return set(get_guilds_with_setting("gatekeeper_enabled", True))
+
+    async def sync_guild_members(self, guild, job=None):
+        """
+        Sync members from a specific guild to the database. Run as a job it
+        reports progress and resumes after the last member it checkpointed.
+        """
         self.logger.info(f"Syncing members from guild: {guild.name}")
+        new_users, synced, resume = 0, 0, {}
+        if job is not None:
+            job.update(job.progress, total=guild.member_count)
+            if job.checkpoint:
+                new_users, synced = job.checkpoint["new_users"], job.progress
+                # Members are listed in ID order
+                resume["after"] = discord.Object(id=job.checkpoint["after"])
+
+        async def sync_batch(batch):
+            nonlocal new_users, synced
+            # A DB commit per member, so keep them off the event loop
+            new_users += await asyncio.to_thread(self.sync_members, batch, True)
+            synced += len(batch)
+            if job is not None:
+                job.update(
+                    synced, checkpoint={"after": batch[-1].id, "new_users": new_users}
+                )
+            await self.clock.sleep(0.1)  # Don't hog the DB on big guilds
+
+        batch = []
+        async for member in guild.fetch_members(limit=None, **resume):
+            batch.append(member)
+            if len(batch) >= MEMBER_SYNC_BATCH_SIZE:
+                await sync_batch(batch)
+                batch = []
+        if batch:
+            await sync_batch(batch)
+        self.logger.info(f"Synced {new_users} new users from {guild.name}")
+        self.synced_guilds[guild.id] = self.clock.now()
+        return new_users
+
+    async def run_member_sync(self, job) -> str:
+        """Job handler for the member sync after enabling gatekeeper."""
+        guild = self.bot.get_guild(int(job.guild_id))
+        if guild is None:
+            raise RuntimeError("The bot is no longer in this server")
+        await ensure_chunked(self.bot, [guild.id])
+        new_users = await self.sync_guild_members(guild, job=job)
+        return f"Synced {new_users} new users from {guild.name}"
+
+    def snapshot_config(self, guild) -> dict:
+        """The settings a member sync depends on, with the role resolved to an ID."""
+        required_role = self.get_required_role(guild.id)
+        role = discord.utils.get(guild.roles, name=required_role)
+        return {
+            "admin_channel": self.get_admin_channel(guild.id),
+            "required_role": required_role,
+            "required_role_id": role.id if role else None,
+        }
+
+    async def reconcile_guild_members(self, guild, checkpoint) -> int:
+        """
+        Catch up a guild from a snapshot checkpoint instead of a full sync.
+        Needs the member cache: members not in the checkpoint joined while we
+        were down, and checkpoint members no longer in the guild left.
+        """
+        present = {member.id for member in guild.members}
+        joined = [member for member in guild.members if member.id not in checkpoint]
         new_users = 0
-        async for member in guild.fetch_members(limit=None):
-            if self.sync_member(member, initial_sync=True):
-                new_users += 1
+        for start in range(0, len(joined), MEMBER_SYNC_BATCH_SIZE):
+            # A DB commit per member, so keep them off the event loop
+            new_users += await asyncio.to_thread(
+                self.sync_members, joined[start : start + MEMBER_SYNC_BATCH_SIZE]
+            )
 
-            # Sometimes we process so many users that we hit the rate limit.
-            await asyncio.sleep(0.1)  # Small delay to avoid blocking event loop
-        self.logger.info(f"Synced {new_users} new users from {guild.name}")
+        departed = [
+            member_id for member_id in checkpoint.member_ids if member_id not in present
+        ]
+        if departed:
+            await asyncio.to_thread(
+                self.mark_departed, guild.id, [str(member_id) for member_id in departed]
+            )
+
+        self.logger.info(
+            f"Reconciled {guild.name} from snapshot: {new_users} new users, "
+            f"{len(departed)} left"
+        )
+        self.synced_guilds[guild.id] = self.clock.now()
         return new_users
 
+    def collect_snapshot(self) -> dict:
+        """Checkpoints for synced guilds, read from the cache on the event loop."""
+        guilds = {}
+        for guild_id, synced_at in self.synced_guilds.items():
+            guild = self.bot.get_guild(guild_id)
+            # Without a full member cache the checkpoint would look like departures
+            if guild is None or not guild.chunked:
+                continue
+            guilds[guild_id] = GuildState(
+                self.snapshot_config(guild),
+                synced_at,
+                [member.id for member in guild.members],
+            )
+        return guilds
+
+    def write_state_snapshot(self):
+        """Snapshot synced guilds so a restart only has to reconcile the gap."""
+        if not self.known_guild_ids:
+            return  # Never got ready, keep whatever snapshot is there
+        write_snapshot(self.collect_snapshot(), self.known_guild_ids, self.clock.now())
+
     @app_commands.command(name="manage_gatekeeper")
     @app_commands.describe(
         action="Enable or disable gatekeeper",
@@ -104,31 +302,50 @@ class Gatekeeper(commands.Cog):
                     )
                     return
 
+                # Saving settings, creating the job and posting its status can
+                # outlast the 3s the interaction gives us to respond
+                await interaction.response.defer(ephemeral=True)
+
                 # Enable gatekeeper and set settings
-                set_guild_setting(interaction.guild_id, "gatekeeper_enabled", True)
-                set_guild_setting(
-                    interaction.guild_id, "gatekeeper_admin_channel", admin_channel.id
-                )
-                set_guild_setting(
-                    interaction.guild_id, "gatekeeper_required_role", required_role.name
+                set_guild_settings(
+                    interaction.guild_id,
+                    {
+                        "gatekeeper_enabled": True,
+                        "gatekeeper_admin_channel": admin_channel.id,
+                        "gatekeeper_required_role": required_role.name,
+                    },
                 )
 
-                # Sync members from this guild now that it's enabled
-                await interaction.response.send_message(
-                    f"Gatekeeper enabled! Admin channel: {admin_channel.mention}, Required role: {required_role.mention}\nSyncing members...",
-                    ephemeral=True,
-                )
+                # Big guilds take longer than the interaction lasts, so the
+                # member sync is a job reporting progress in the admin channel
+                job = get_active_job("member_sync", interaction.guild_id)
+                if job is None:
+                    job = create_job(
+                        "member_sync",
+                        interaction.guild_id,
+                        {"title": f"Syncing members of {interaction.guild.name}"},
+                        created_by=interaction.user.id,
+                        clock=self.clock,
+                    )
+                    try:
+                        status = await admin_channel.send(render_status(job))
+                        set_status_message(job.id, admin_channel.id, status.id)
+                    except Exception as e:
+                        # The job is queued, so sync anyway, /jobs shows progress too
+                        self.logger.error(f"Error posting job #{job.id} status: {e}")
+                    JOBS.wake()
 
-                # Sync members in background
-                new_users = await self.sync_guild_members(interaction.guild)
                 await interaction.followup.send(
-                    f"Synced {new_users} new users from {interaction.guild.name}",
+                    f"Gatekeeper enabled! Admin channel: {admin_channel.mention}, Required role: {required_role.mention}\n"
+                    f"Syncing members as job #{job.id}, progress is posted in {admin_channel.mention} and `/jobs`. "
+                    f"Use `/cancel_job {job.id}` to stop it.",
                     ephemeral=True,
                 )
 
             elif action == "disable":
                 # Disable gatekeeper
                 set_guild_setting(interaction.guild_id, "gatekeeper_enabled", False)
+                self.synced_guilds.pop(interaction.guild_id, None)
 
                 await interaction.response.send_message(
                     "Gatekeeper disabled for this server.", ephemeral=True
@@ -136,42 +353,206 @@ class Gatekeeper(commands.Cog):
 
         except Exception as e:
             self.logger.error(f"Error managing gatekeeper: {e}")
-            await interaction.response.send_message(
-                "Error managing gatekeeper. Please try again.", ephemeral=True
-            )
+            message = "Error managing gatekeeper. Please try again."
+            if interaction.response.is_done():
+                await interaction.followup.send(message, ephemeral=True)
+            else:
+                await interaction.response.send_message(message, ephemeral=True)
 
     @commands.Cog.listener()
     async def on_ready(self):
+        # Skips records and member syncs already done before a restart
+        snapshot = await asyncio.to_thread(load_snapshot, self.clock.now())
+        if snapshot:
+            self.logger.info(f"Loaded state snapshot from {snapshot.written_at}")
+
         # Create guild records for all guilds the bot is in
         self.logger.info("Creating guild records...")
         for guild in self.bot.guilds:
-            ensure_guild_exists(guild.id, guild.name)
+            if not snapshot or guild.id not in snapshot.guild_ids:
+                ensure_guild_exists(guild.id, guild.name)
+            self.known_guild_ids.add(guild.id)
 
         # Only sync members from guilds where gatekeeper is enabled
         self.logger.info("Syncing members from enabled gatekeeper guilds...")
         total_new_users = 0
+        enabled_guild_ids = self.get_enabled_guild_ids()
+        # The removal loop reads roles from the member cache
+        await ensure_chunked(
+            self.bot,
+            [guild_id for guild_id in enabled_guild_ids if owns_guild(guild_id)],
+        )
         for guild in self.bot.guilds:
-            if self.get_gatekeeper_enabled(guild.id):
-                new_users = await self.sync_guild_members(guild)
+            if guild.id in enabled_guild_ids:
+                checkpoint = snapshot.checkpoint(guild.id) if snapshot else None
+                if (
+                    checkpoint
+                    and guild.chunked
+                    and checkpoint.config == self.snapshot_config(guild)
+                ):
+                    new_users = await self.reconcile_guild_members(guild, checkpoint)
+                else:
+                    new_users = await self.sync_guild_members(guild)
                 total_new_users += new_users
             else:
                 self.logger.info(
                     f"Skipping guild {guild.name} (gatekeeper not enabled)"
                 )
+        if snapshot:
+            snapshot.close()
 
         self.logger.info(
             f"Sync complete. {total_new_users} total new users from enabled guilds."
         )
 
+        # Claim our share of guilds before the first removal check
+        self.refresh_leases()
+        if not self.lease_heartbeat_loop.is_running():
+            self.lease_heartbeat_loop.start()
+
+        if not self.journal_flush_loop.is_running():
+            self.journal_flush_loop.start()
+        if not self.archive_loop.is_running():
+            self.archive_loop.start()
+        if not self.snapshot_loop.is_running():
+            self.snapshot_loop.start()
+        # Picks up anything left unsent before a restart
+        self.outbox.start()
+
         # Start the removal check loop after bot is ready
-        self.removal_check_loop.start()
-        self.logger.info("Started removal check loop")
+        if not self.removal_check_loop.is_running():
+            self.removal_check_loop.start()
+            self.logger.info("Started removal check loop")
+
+    def refresh_leases(self):
+        """Renew and rebalance guild leases with the other replicas."""
+        try:
+            candidates = [
+                guild_id
+                for guild_id in self.get_enabled_guild_ids()
+                if owns_guild(guild_id) and self.bot.get_guild(guild_id)
+            ]
+            self.leased_guild_ids = rebalance_leases(candidates)
+        except Exception as e:
+            # Without a renewed lease a peer may take over, so stop processing
+            self.logger.error(f"Error refreshing guild leases: {e}")
+            self.leased_guild_ids = set()
+
+    @tasks.loop(seconds=HEARTBEAT_INTERVAL.total_seconds())
+    async def lease_heartbeat_loop(self):
+        """Keeps our guild leases alive and picks up guilds from dead replicas."""
+        self.refresh_leases()
+
+    async def flush_journal(self):
+        try:
+            rows = await asyncio.to_thread(JOURNAL.flush)
+            if rows:
+                self.logger.debug("Appended %d removal transitions", rows)
+        except Exception as e:
+            self.logger.error(f"Error flushing removal journal: {e}")
+
+    @tasks.loop(seconds=JOURNAL_FLUSH_SECONDS)
+    async def journal_flush_loop(self):
+        """Writes transitions queued outside the removal loop (e.g. admin resets)."""
+        await self.flush_journal()
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        self.logger.info(f"New member joined: {member.id}")
+        self.logger.info("New member joined: %s", member.id)
         self.sync_member(member, initial_sync=False)
 
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        """Leaving (or being kicked) takes them out of the removal loop."""
+        try:
+            if await asyncio.to_thread(
+                self.mark_departed, member.guild.id, [str(member.id)]
+            ):
+                self.logger.info("Tracked member left: %s", member.id)
+        except Exception as e:
+            self.logger.error("Error marking member %s departed: %s", member.id, e)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        try:
+            departed = await asyncio.to_thread(self.mark_guild_departed, guild.id)
+            self.logger.info("Left %s, %d tracked users departed", guild.name, departed)
+        except Exception as e:
+            self.logger.error("Error marking guild %s departed: %s", guild.id, e)
+
+    async def archive_tracked_users(self) -> int:
+        """
+        Archive departed, removed and orphaned users in batches. Orphans are
+        users of guilds (on our shards) the bot isn't in anymore, e.g. it was
+        removed while offline. Returns how many rows were archived.
+        """
+        orphaned = [
+            guild_id
+            for guild_id in await asyncio.to_thread(get_tracked_guild_ids)
+            if guild_id.isdigit()
+            and owns_guild(int(guild_id))
+            and not self.bot.get_guild(int(guild_id))
+        ]
+        for guild_id in orphaned:
+            await asyncio.to_thread(self.mark_guild_departed, guild_id)
+
+        archived = 0
+        for reason, criteria in archive_rules(self.clock, orphaned):
+            while True:
+                moved = await asyncio.to_thread(
+                    archive_batch, reason, criteria, self.clock
+                )
+                archived += moved
+                if moved < ARCHIVE_BATCH_SIZE:
+                    break
+                await self.clock.sleep(0.1)  # Let events through between batches
+        return archived
+
+    @tasks.loop(minutes=SNAPSHOT_INTERVAL_MINUTES)
+    async def snapshot_loop(self):
+        """Keeps the warm restart snapshot recent in case we don't shut down cleanly."""
+        try:
+            guilds = self.collect_snapshot()
+            await asyncio.to_thread(
+                write_snapshot, guilds, set(self.known_guild_ids), self.clock.now()
+            )
+        except Exception as e:
+            self.logger.error(f"Error writing state snapshot: {e}")
+
+    @tasks.loop(hours=1)
+    async def archive_loop(self):
+        """Keeps tracked_users down to members still in our guilds."""
+        try:
+            archived = await self.archive_tracked_users()
+            if archived:
+                self.logger.info(f"Archived {archived} departed or removed users")
+        except Exception as e:
+            self.logger.error(f"Error archiving tracked users: {e}")
+
+    def mark_departed(self, guild_id, user_ids) -> int:
+        """Mark `user_ids` as having left the guild, for a worker thread."""
+        session = Session()
+        try:
+            return RemovalWorkflow.mark_many_departed(
+                session, user_ids, str(guild_id), clock=self.clock
+            )
+        finally:
+            session.close()
+
+    def mark_guild_departed(self, guild_id) -> int:
+        """Mark everyone tracked in a guild the bot left, for a worker thread."""
+        session = Session()
+        try:
+            return RemovalWorkflow.mark_guild_departed(
+                session, str(guild_id), clock=self.clock
+            )
+        finally:
+            session.close()
+
+    def sync_members(self, members, initial_sync=False) -> int:
+        """sync_member for each of `members`, for a worker thread. Returns how many were new."""
+        return sum(self.sync_member(member, initial_sync) for member in members)
+
     def sync_member(self, member, initial_sync=False) -> bool:
         """Sync a member to the database. Returns True if new user, False if existing user."""
         # Skip bots and admins
@@ -180,15 +561,17 @@ class Gatekeeper(commands.Cog):
 
         session = Session()
         try:
-            user = session.get(TrackedUser, str(member.id))
+            user = RemovalWorkflow.get_user_status(
+                session, str(member.id), str(member.guild.id)
+            )
             if not user:
                 if initial_sync:
                     # Dither: random time between now and 3 days ago
                     dither_days = random.uniform(0, 3)
-                    joined_at = datetime.utcnow() - timedelta(days=dither_days)
+                    joined_at = self.clock.now() - timedelta(days=dither_days)
                 else:
                     # Normal members get a 3 day
-                    joined_at = member.joined_at or datetime.utcnow()
+                    joined_at = member.joined_at or self.clock.now()
                 user = TrackedUser(
                     user_id=str(member.id),
                     guild_id=str(member.guild.id),
@@ -201,344 +584,545 @@ class Gatekeeper(commands.Cog):
                 session.add(user)
                 session.commit()
                 return True  # New user
-            else:
-                # Update existing user's guild_id if needed
-                if user.guild_id != str(member.guild.id):
-                    user.guild_id = str(member.guild.id)
-                    session.commit()
-                return False  # Existing user
+            elif user.departed_at is not None or not initial_sync:
+                # Joining again means they left at some point, even if we missed it
+                RemovalWorkflow.mark_rejoined(
+                    session,
+                    user.user_id,
+                    str(member.guild.id),
+                    member.joined_at or self.clock.now(),
+                    clock=self.clock,
+                )
+            return False  # Existing user
         except Exception as e:
-            self.logger.error(f"Error syncing member {member.id}: {e}")
+            self.logger.error("Error syncing member %s: %s", member.id, e)
             return False
         finally:
             session.close()
 
-    async def send_first_warning(self, guild, user, admin_channel):
-        """Send the first warning to a user and post to admin channel."""
-
-        # TODO: Make this not just hardcoded
-        ENTRY_CHANNEL_LINK = (
-            "https://discord.com/channels/945386790402023554/1136377876942442568"
+    def admin_post(self, key, guild_id, channel_id, content, user_id=None) -> dict:
+        """Outbox entry for a message to the guild's admin channel."""
+        return outbox_entry(
+            key,
+            guild_id,
+            "admin_post",
+            {"channel_id": channel_id, "content": content},
+            user_id=user_id,
         )
 
-        try:
-            # Send DM to user (or simulate in dry run)
-            member = guild.get_member(int(user.user_id))
-            if member:
-                if DRY_RUN_MODE:
-                    dm_message_id = f"DRY_RUN_{datetime.utcnow().timestamp()}"
-                    self.logger.info(
-                        f"[DRY RUN] Would send first warning DM to {user.user_id}"
-                    )
-                else:
-                    dm_message = await member.send(
-                        f"You have been marked for removal from **{guild.name}** because you haven't verified.\n"
-                        f"You have **7 days** to get the required role or you will be removed from the server.\n"
-                        f"Please submit your entry application here: {ENTRY_CHANNEL_LINK}\n"
-                        f"Please contact a server administrator if you need help."
-                    )
-                    dm_message_id = str(dm_message.id)
-
-                # Post to admin channel
-                dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
-                admin_message = await admin_channel.send(
+    def queue_first_warning(self, session, guild, user, admin_channel):
+        """Move a user to FIRST_WARNING_SENT and queue the DM in one transaction."""
+        dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
+        # Retries get a new key, a repeat of the same attempt does not
+        key = (
+            f"first_warning:{guild.id}:{user.user_id}:"
+            f"{user.removal_date.isoformat()}:{user.bot_retries or 0}"
+        )
+        dm = outbox_entry(
+            key,
+            guild.id,
+            "dm",
+            {
+                "stage": "first_warning",
+                "content": (
+                    f"You have been marked for removal from **{guild.name}** because you haven't verified.\n"
+                    f"You have **7 days** to get the required role or you will be removed from the server.\n"
+                    f"Please submit your entry application here: {ENTRY_CHANNEL_LINK}\n"
+                    f"Please contact a server administrator if you need help."
+                ),
+                "message_field": "first_warning_message_id",
+                "admin_channel_id": admin_channel.id,
+                "success_post": (
                     f"{dry_run_prefix}⚠️ **First Warning Sent**\n"
                     f"User: <@{user.user_id}>\n"
                     f"Reason: Not verified after grace period\n"
                     f"Removal date: <t:{int(user.removal_date.timestamp())}:F>\n"
-                    f"DM Message ID: {dm_message_id}"
-                )
-
-                # Update database
-                session = Session()
-                try:
-                    RemovalWorkflow.mark_first_warning_sent(
-                        session, user.user_id, dm_message_id
-                    )
-                finally:
-                    session.close()
-
-                self.logger.info(
-                    f"{'[DRY RUN] ' if DRY_RUN_MODE else ''}Sent first warning to user {user.user_id}"
-                )
+                    "DM Message ID: {message_id}"
+                ),
+                "failure_post": (
+                    f"❌ **Failed to send first warning**\n"
+                    f"User: <@{user.user_id}>\n"
+                    "Error: {error}"
+                ),
+            },
+            user_id=user.user_id,
+        )
+        RemovalWorkflow.mark_first_warning_sent(
+            session, user.user_id, str(guild.id), None, clock=self.clock, outbox=[dm]
+        )
+        self.logger.info(
+            "%sQueued first warning for user %s", dry_run_prefix, user.user_id
+        )
 
-        except discord.Forbidden as e:
-            # Pats asked for this, specific error code 50007 for when a user
-            # has dissallowed bots to send messages to them
-            if e.code == 50007:
-                self.logger.error(
-                    f"Failed to send first warning to {user.user_id}: {e} (code: {e.code})"
-                )
+    def queue_final_notice(self, session, guild, user, admin_channel):
+        """Move a user to FINAL_NOTICE_SENT and queue the DM in one transaction."""
+        dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
+        dm = outbox_entry(
+            f"final_notice:{guild.id}:{user.user_id}:{user.removal_date.isoformat()}",
+            guild.id,
+            "dm",
+            {
+                "stage": "final_notice",
+                "content": (
+                    "⚠️ Reminder: its been 5 Days, please go through server entry process in "
+                    f"{ENTRY_CHANNEL_LINK} within the next 2 days or you'll be kicked from the server!"
+                ),
+                "message_field": "final_notice_message_id",
+                "admin_channel_id": admin_channel.id,
+                "success_post": (
+                    f"{dry_run_prefix}🚨 **Final Notice Sent**\n"
+                    f"User: <@{user.user_id}>\n"
+                    f"Removal date: <t:{int(user.removal_date.timestamp())}:F>\n"
+                    "DM Message ID: {message_id}"
+                ),
+                "failure_post": (
+                    f"❌ **Failed to send final notice**\n"
+                    f"User: <@{user.user_id}>\n"
+                    "Error: {error}"
+                ),
+            },
+            user_id=user.user_id,
+        )
+        RemovalWorkflow.mark_final_notice_sent(
+            session, user.user_id, str(guild.id), None, clock=self.clock, outbox=[dm]
+        )
+        self.logger.info(
+            "%sQueued final notice for user %s", dry_run_prefix, user.user_id
+        )
 
-                # Get member object for potential kick
-                member = guild.get_member(int(user.user_id))
+    def queue_removal(self, session, guild, user, admin_channel):
+        """Move a user to REMOVED and queue the goodbye DM, which is followed by the kick."""
+        dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
+        dm = outbox_entry(
+            f"removal:{guild.id}:{user.user_id}:{user.removal_date.isoformat()}",
+            guild.id,
+            "dm",
+            {
+                "stage": "removal",
+                "content": (
+                    f"🚫 **You have been removed from {guild.name}**\n"
+                    "You failed to enter server application within the required time frame\n"
+                    "You can rejoin the server here: https://discord.gg/azorewrath"
+                ),
+                "message_field": "removal_message_id",
+                "admin_channel_id": admin_channel.id,
+                # Kicked whether or not the DM arrives
+                "kick_reason": "Not verified after removal period",
+                "success_post": (
+                    f"{dry_run_prefix}🚫 **User Removed**\n"
+                    f"User: <@{user.user_id}>\n"
+                    f"Reason: Not verified after removal period\n"
+                    f"Removal time: <t:{int(self.clock.now().timestamp())}:F>\n"
+                    "DM Message ID: {message_id}"
+                ),
+                "failure_post": (
+                    f"❌ **Failed to remove user**\n"
+                    f"User: <@{user.user_id}>\n"
+                    "Error: {error}"
+                ),
+            },
+            user_id=user.user_id,
+        )
+        RemovalWorkflow.mark_user_removed(
+            session, user.user_id, str(guild.id), None, clock=self.clock, outbox=[dm]
+        )
+        self.logger.info("%sQueued removal of user %s", dry_run_prefix, user.user_id)
+
+    def kick_entry(self, entry: dict, reason: str, message_id=None, **posts) -> dict:
+        """Outbox entry kicking the member a DM entry was about."""
+        payload = entry["payload"]
+        return outbox_entry(
+            f"{entry['idempotency_key']}:kick",
+            entry["guild_id"],
+            "kick",
+            {
+                "reason": reason,
+                "message_id": message_id,
+                "admin_channel_id": payload["admin_channel_id"],
+                "success_post": posts.get("success_post", payload["success_post"]),
+                "failure_post": posts.get("failure_post", payload["failure_post"]),
+            },
+            user_id=entry["user_id"],
+        )
 
-                # Increment bot_retries in database
-                session = Session()
-                try:
-                    retry_count = RemovalWorkflow.increment_bot_retries(
-                        session, user.user_id
-                    )
-                    self.logger.info(
-                        f"Bot retries for user {user.user_id}: {retry_count}/3"
-                    )
+    def post_followup(self, entry: dict, post: str, suffix: str, **values) -> dict:
+        """Admin post following an entry, e.g. its success or failure message."""
+        content = post
+        for name, value in values.items():
+            # Not str.format, error messages may contain braces
+            content = content.replace(f"{{{name}}}", str(value))
+        return self.admin_post(
+            f"{entry['idempotency_key']}:{suffix}",
+            entry["guild_id"],
+            entry["payload"]["admin_channel_id"],
+            content,
+            user_id=entry["user_id"],
+        )
 
-                    if retry_count >= 3:
-                        # After 3 retries, kick the user
-                        if member:
-                            if DRY_RUN_MODE:
-                                self.logger.info(
-                                    f"[DRY RUN] Would kick user {user.user_id} for not having send_messages enabled"
-                                )
-                            else:
-                                await member.kick(
-                                    reason="User has send_messages disabled for bot (3 retries failed)"
-                                )
+    def get_entry_member(self, entry: dict):
+        guild = self.bot.get_guild(int(entry["guild_id"]))
+        if guild is None or entry["user_id"] is None:
+            return None
+        return guild.get_member(int(entry["user_id"]))
+
+    def entry_is_stale(self, entry: dict, status: RemovalStatus) -> bool:
+        """
+        Whether the user has left `status` since the entry was queued, e.g. they
+        verified while their DM waited. Blocking, run in a thread.
+        """
+        session = Session()
+        try:
+            user = RemovalWorkflow.get_user_status(
+                session, entry["user_id"], entry["guild_id"]
+            )
+            return user is None or user.removal_status != status
+        finally:
+            session.close()
 
-                        # Mark user as removed in database
-                        RemovalWorkflow.mark_user_removed(session, user.user_id, None)
+    async def deliver_dm(self, entry: dict) -> Outcome:
+        """Outbox handler: send a removal workflow DM."""
+        payload = entry["payload"]
+        if await asyncio.to_thread(
+            self.entry_is_stale, entry, DM_STAGE_STATUS[payload["stage"]]
+        ):
+            return Outcome(sent=False, error="stale")
+        member = self.get_entry_member(entry)
+        if member is None:
+            error = "Member is no longer in the guild"
+            return Outcome(sent=False, error=error, apply=self.dm_failed(entry, error))
 
-                        # Ping the specified user and post to admin channel
-                        await admin_channel.send(
-                            f"❌ **User Kicked - Cannot Send Messages**\n"
-                            f"User: <@{user.user_id}>\n"
-                            f"Reason: User has send_messages disabled for bot (failed {retry_count} times)\n"
-                            f"<@1397634241034063872>"
-                        )
-                        self.logger.info(
-                            f"Kicked user {user.user_id} after {retry_count} failed DM attempts"
-                        )
-                    else:
-                        # Still post to admin channel about the failure (but don't kick yet)
-                        await admin_channel.send(
-                            f"❌ **Failed to send first warning**\n"
-                            f"User: <@{user.user_id}>\n"
-                            f"Error: {str(e)}\n"
-                            f"Retry count: {retry_count}/3"
-                        )
-                finally:
-                    session.close()
-            else:
-                # Other Forbidden errors - just log and post
+        if DRY_RUN_MODE:
+            message_id = f"DRY_RUN_{self.clock.now().timestamp()}"
+            self.logger.info(
+                "[DRY RUN] Would send %s DM to %s", payload["stage"], entry["user_id"]
+            )
+        else:
+            try:
+                message = await send_dm(self.bot, member, payload["content"])
+                message_id = str(message.id)
+            except discord.Forbidden as e:
+                # Pats asked for this, specific error code 50007 for when a user
+                # has dissallowed bots to send messages to them
                 self.logger.error(
-                    f"Failed to send first warning to {user.user_id}: {e}"
+                    "Failed to send %s to %s: %s (code: %s)",
+                    payload["stage"],
+                    entry["user_id"],
+                    e,
+                    e.code,
                 )
-                await admin_channel.send(
-                    f"❌ **Failed to send first warning**\n"
-                    f"User: <@{user.user_id}>\n"
-                    f"Error: {str(e)}"
-                )
-        except Exception as e:
-            self.logger.error(f"Failed to send first warning to {user.user_id}: {e}")
-            # Still post to admin channel about the failure
-            await admin_channel.send(
-                f"❌ **Failed to send first warning**\n"
-                f"User: <@{user.user_id}>\n"
-                f"Error: {str(e)}"
-            )
-
-    async def send_final_notice(self, guild, user, admin_channel):
-        """Send the final notice to a user and post to admin channel."""
-        try:
-            # Send DM to user (or simulate in dry run)
-            member = guild.get_member(int(user.user_id))
-            if member:
-                if DRY_RUN_MODE:
-                    dm_message_id = f"DRY_RUN_{datetime.utcnow().timestamp()}"
-                    self.logger.info(
-                        f"[DRY RUN] Would send final notice DM to {user.user_id}"
-                    )
+                if e.code == 50007 and payload["stage"] == "first_warning":
+                    apply = self.first_warning_refused(entry, str(e))
                 else:
-                    dm_message = await member.send(
-                        "⚠️ Reminder: its been 5 Days, please go through server entry process in "
-                        "https://discord.com/channels/945386790402023554/1136377876942442568 within the next 2 days or you'll be kicked from the server!"
-                    )
-                    dm_message_id = str(dm_message.id)
-
-                # Post to admin channel
-                dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
-                admin_message = await admin_channel.send(
-                    f"{dry_run_prefix}🚨 **Final Notice Sent**\n"
-                    f"User: <@{user.user_id}>\n"
-                    f"Removal date: <t:{int(user.removal_date.timestamp())}:F>\n"
-                    f"DM Message ID: {dm_message_id}"
+                    apply = self.dm_failed(entry, str(e))
+                return Outcome(sent=False, error=str(e), apply=apply)
+
+        def apply(session):
+            user_id = entry["user_id"]
+            if payload["stage"] == "removal":
+                enqueue(
+                    session,
+                    [self.kick_entry(entry, payload["kick_reason"], message_id)],
+                    self.clock,
                 )
-
-                # Update database
-                session = Session()
-                try:
-                    RemovalWorkflow.mark_final_notice_sent(
-                        session, user.user_id, dm_message_id
-                    )
-                finally:
-                    session.close()
-
-                self.logger.info(
-                    f"{'[DRY RUN] ' if DRY_RUN_MODE else ''}Sent final notice to user {user.user_id}"
+            else:
+                enqueue(
+                    session,
+                    [
+                        self.post_followup(
+                            entry,
+                            payload["success_post"],
+                            "posted",
+                            message_id=message_id,
+                        )
+                    ],
+                    self.clock,
                 )
-
-        except Exception as e:
-            self.logger.error(f"Failed to send final notice to {user.user_id}: {e}")
-            # Still post to admin channel about the failure
-            await admin_channel.send(
-                f"❌ **Failed to send final notice**\n"
-                f"User: <@{user.user_id}>\n"
-                f"Error: {str(e)}"
+            RemovalWorkflow.record_dm_delivered(
+                session,
+                user_id,
+                entry["guild_id"],
+                payload["message_field"],
+                message_id,
             )
 
-    async def remove_user(self, guild, user, admin_channel):
-        """Remove a user from the guild and post to admin channel."""
-        try:
-            # Send final DM (or simulate in dry run)
-            member = guild.get_member(int(user.user_id))
-            if member:
-                if DRY_RUN_MODE:
-                    dm_message_id = f"DRY_RUN_{datetime.utcnow().timestamp()}"
-                    self.logger.info(
-                        f"[DRY RUN] Would send removal DM and kick user {user.user_id}"
-                    )
-                else:
-                    dm_message = await member.send(
-                        "🚫 **You have been removed from {guild.name}**\n"
-                        "You failed to enter server application within the required time frame\n"
-                        "You can rejoin the server here: https://discord.gg/azorewrath"
-                    )
-                    dm_message_id = str(dm_message.id)
+        self.logger.info(
+            "%sSent %s to user %s",
+            "[DRY RUN] " if DRY_RUN_MODE else "",
+            payload["stage"],
+            entry["user_id"],
+        )
+        return Outcome(sent=True, result=message_id, apply=apply)
 
-                    # Kick the user
-                    await member.kick(reason="Not verified after removal period")
+    def dm_failed(self, entry: dict, error: str):
+        """Follow ups for a DM that won't be delivered."""
 
-                # Post to admin channel
-                dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
-                admin_message = await admin_channel.send(
-                    f"{dry_run_prefix}🚫 **User Removed**\n"
-                    f"User: <@{user.user_id}>\n"
-                    f"Reason: Not verified after removal period\n"
-                    f"Removal time: <t:{int(datetime.utcnow().timestamp())}:F>\n"
-                    f"DM Message ID: {dm_message_id}"
+        def apply(session):
+            payload = entry["payload"]
+            if payload["stage"] == "removal":
+                # Still remove them, just without the goodbye DM
+                followup = self.kick_entry(entry, payload["kick_reason"])
+            else:
+                followup = self.post_followup(
+                    entry, payload["failure_post"], "failed", error=error
+                )
+            enqueue(session, [followup], self.clock)
+
+        return apply
+
+    def first_warning_refused(self, entry: dict, error: str):
+        """
+        The user doesn't accept DMs from the bot (50007). Count the retry and try
+        the first warning again next check, kicking them after 3 failures.
+        """
+
+        def apply(session):
+            user_id, guild_id = entry["user_id"], entry["guild_id"]
+            user = RemovalWorkflow.get_user_status(session, user_id, guild_id)
+            retry_count = ((user.bot_retries or 0) if user else 0) + 1
+            self.logger.info("Bot retries for user %s: %d/3", user_id, retry_count)
+
+            if retry_count >= 3:
+                # After 3 retries, kick the user
+                kick = self.kick_entry(
+                    entry,
+                    "User has send_messages disabled for bot (3 retries failed)",
+                    success_post=(
+                        f"❌ **User Kicked - Cannot Send Messages**\n"
+                        f"User: <@{user_id}>\n"
+                        f"Reason: User has send_messages disabled for bot (failed {retry_count} times)\n"
+                        f"<@1397634241034063872>"
+                    ),
+                )
+                RemovalWorkflow.mark_user_removed(
+                    session, user_id, guild_id, None, clock=self.clock, outbox=[kick]
+                )
+            else:
+                # Still post to admin channel about the failure (but don't kick yet)
+                next_attempt = self.clock.now() + RemovalWorkflow.retry_backoff(
+                    retry_count
+                )
+                post = self.post_followup(
+                    entry,
+                    entry["payload"]["failure_post"]
+                    + f"\nRetry count: {retry_count}/3"
+                    + f"\nNext attempt: <t:{int(next_attempt.timestamp())}:R>",
+                    "failed",
+                    error=error,
+                )
+                RemovalWorkflow.mark_first_warning_failed(
+                    session, user_id, guild_id, clock=self.clock, outbox=[post]
                 )
 
-                # Update database
-                session = Session()
-                try:
-                    RemovalWorkflow.mark_user_removed(
-                        session, user.user_id, dm_message_id
-                    )
-                finally:
-                    session.close()
+        return apply
+
+    async def deliver_kick(self, entry: dict) -> Outcome:
+        """Outbox handler: kick a member, then post to the admin channel."""
+        payload = entry["payload"]
+        if await asyncio.to_thread(self.entry_is_stale, entry, RemovalStatus.REMOVED):
+            return Outcome(sent=False, error="stale")
+        member = self.get_entry_member(entry)
+        if member is None:
+            error = "Member is no longer in the guild"
+        elif DRY_RUN_MODE:
+            self.logger.info("[DRY RUN] Would kick user %s", entry["user_id"])
+            error = None
+        else:
+            try:
+                await member.kick(reason=payload["reason"])
+                error = None
+            except discord.Forbidden as e:
+                error = str(e)  # Missing permissions won't fix themselves
+
+        if error:
+            self.logger.error("Failed to remove user %s: %s", entry["user_id"], error)
+            post = self.post_followup(
+                entry, payload["failure_post"], "failed", error=error
+            )
+        else:
+            self.logger.info(
+                "%sRemoved user %s",
+                "[DRY RUN] " if DRY_RUN_MODE else "",
+                entry["user_id"],
+            )
+            post = self.post_followup(
+                entry,
+                payload["success_post"],
+                "posted",
+                message_id=payload["message_id"],
+            )
+        return Outcome(
+            sent=error is None,
+            error=error,
+            apply=lambda session: enqueue(session, [post], self.clock),
+        )
 
-                self.logger.info(
-                    f"{'[DRY RUN] ' if DRY_RUN_MODE else ''}Removed user {user.user_id}"
-                )
+    async def deliver_admin_post(self, entry: dict) -> Outcome:
+        """Outbox handler: post to a guild's admin channel."""
+        payload = entry["payload"]
+        guild = self.bot.get_guild(int(entry["guild_id"]))
+        channel = guild.get_channel(payload["channel_id"]) if guild else None
+        if channel is None:
+            return Outcome(sent=False, error="Admin channel not found")
+        message = await channel.send(payload["content"])
+        return Outcome(sent=True, result=str(message.id))
+
+    def delivery_given_up(self, entry: dict, error: str):
+        """Outbox entries that kept failing still get their failure follow ups."""
+        if entry["kind"] == "dm":
+            return self.dm_failed(entry, error)
+        if entry["kind"] == "kick":
+            post = self.post_followup(
+                entry, entry["payload"]["failure_post"], "failed", error=error
+            )
+            return lambda session: enqueue(session, [post], self.clock)
+        self.logger.error("Giving up on %s: %s", entry["idempotency_key"], error)
+        return None
 
+    async def hold_lease(self, guild) -> bool:
+        """Renew our lease on a guild mid-check. False (and dropped) if it's gone."""
+        if guild.id not in self.leased_guild_ids:
+            return False
+        try:
+            held = await asyncio.to_thread(renew_lease, guild.id)
         except Exception as e:
-            self.logger.error(f"Failed to remove user {user.user_id}: {e}")
-            # Still post to admin channel about the failure
-            await admin_channel.send(
-                f"❌ **Failed to remove user**\n"
-                f"User: <@{user.user_id}>\n"
-                f"Error: {str(e)}"
-            )
+            self.logger.error("Error renewing lease for %s: %s", guild.id, e)
+            held = False
+        if not held:
+            self.logger.warning("Lost the gatekeeper lease for %s", guild.name)
+            self.leased_guild_ids.discard(guild.id)
+        return held
+
+    async def scan(self, guild, rows):
+        """
+        Yield rows from a RemovalWorkflow scan of `guild`, letting the loop run
+        between chunks. Before each chunk the guild's lease is renewed, and the
+        scan stops if a peer has taken it over.
+        """
+        for count, row in enumerate(rows):
+            if count % SCAN_CHUNK_SIZE == 0:
+                await asyncio.sleep(0)
+                if not await self.hold_lease(guild):
+                    return
+            yield row
 
     @tasks.loop(minutes=5)  # Check every 5 minutes
     async def removal_check_loop(self):
         """Main loop that checks for users needing removal actions."""
         self.logger.debug("🔄 Removal check loop running...")
-        self.logger.debug(f"Found {len(self.bot.guilds)} guilds to check")
         session = Session()
         try:
-            for guild in self.bot.guilds:
-                self.logger.debug(f"Checking guild: {guild.name} ({guild.id})")
-                # Check if gatekeeper is enabled for this guild
-                if not self.get_gatekeeper_enabled(guild.id):
-                    self.logger.debug(f"Gatekeeper not enabled for {guild.name}")
+            # Only guilds with gatekeeper enabled, straight from the settings index
+            enabled_guild_ids = self.get_enabled_guild_ids()
+            self.logger.debug(
+                "Found %d enabled guilds to check", len(enabled_guild_ids)
+            )
+            for guild_id in sorted(enabled_guild_ids):
+                # Other shard clusters handle guilds outside our shards
+                if not owns_guild(guild_id):
                     continue
 
+                guild = self.bot.get_guild(guild_id)
+                if not guild:
+                    continue
+
+                # Another replica holds the lease for this guild
+                if guild.id not in self.leased_guild_ids:
+                    self.logger.debug("No lease held for %s", guild.name)
+                    continue
+
+                self.logger.debug("Checking guild: %s (%s)", guild.name, guild.id)
+
                 # Check if admin channel and required role are configured
-                admin_channel_id = self.get_admin_channel(guild.id)
-                required_role_name = self.get_required_role(guild.id)
+                settings = get_guild_settings(guild.id)
+                admin_channel_id = settings.get("gatekeeper_admin_channel")
+                required_role_name = settings.get("gatekeeper_required_role")
 
                 self.logger.debug(
-                    f"Admin channel: {admin_channel_id}, Required role: {required_role_name}"
+                    "Admin channel: %s, Required role: %s",
+                    admin_channel_id,
+                    required_role_name,
                 )
 
                 if not admin_channel_id or not required_role_name:
-                    self.logger.debug(f"Missing configuration for {guild.name}")
+                    self.logger.debug("Missing configuration for %s", guild.name)
                     continue
 
                 admin_channel = guild.get_channel(admin_channel_id)
                 if not admin_channel:
                     self.logger.debug(
-                        f"Admin channel {admin_channel_id} not found in {guild.name}"
+                        "Admin channel %s not found in %s", admin_channel_id, guild.name
                     )
                     continue
 
                 guild_id_str = str(guild.id)
-                now = datetime.utcnow()
+                now = self.clock.now()
+
+                # Side effects go through the outbox, committed with each state change
 
                 # --- NEW LOGIC: Clear users who now have the required role ---
-                for user in (
-                    session.query(TrackedUser)
-                    .filter(
-                        TrackedUser.guild_id == guild_id_str,
-                        TrackedUser.removal_status != RemovalStatus.ACTIVE,
-                    )
-                    .all()
+                async for user in self.scan(
+                    guild, RemovalWorkflow.get_flagged_users(session, guild_id_str)
                 ):
                     member = guild.get_member(int(user.user_id))
                     if not member:
                         continue
                     has_role = any(r.name == required_role_name for r in member.roles)
                     if has_role:
-                        RemovalWorkflow.reset_user_status(session, user.user_id)
-                        self.logger.info(
-                            f"User {user.user_id} was cleared by getting the required role."
+                        RemovalWorkflow.reset_user_status(
+                            session,
+                            user.user_id,
+                            guild_id_str,
+                            clock=self.clock,
+                            outbox=[
+                                self.admin_post(
+                                    f"cleared:{guild.id}:{user.user_id}:{now.isoformat()}",
+                                    guild.id,
+                                    admin_channel.id,
+                                    f"✅ **User Cleared**\n"
+                                    f"User: <@{user.user_id}>\n"
+                                    f"Reason: Gained the required role `{required_role_name}` in time.",
+                                    user_id=user.user_id,
+                                )
+                            ],
                         )
-                        await admin_channel.send(
-                            f"✅ **User Cleared**\n"
-                            f"User: <@{user.user_id}>\n"
-                            f"Reason: Gained the required role `{required_role_name}` in time."
+                        self.logger.info(
+                            "User %s was cleared by getting the required role.",
+                            user.user_id,
                         )
 
                 # Check for users who need first warnings
-                users_needing_first_warning = (
+                async for user in self.scan(
+                    guild,
                     RemovalWorkflow.get_users_needing_first_warning(
-                        session, guild_id_str
-                    )
-                )
-
-                for user in users_needing_first_warning:
-                    await self.send_first_warning(guild, user, admin_channel)
-                    await asyncio.sleep(2)  # Small delay to avoid rate limiting
+                        session, guild_id_str, clock=self.clock
+                    ),
+                ):
+                    if guild.get_member(int(user.user_id)):
+                        self.queue_first_warning(session, guild, user, admin_channel)
 
                 # Check for users who need final notices
-                users_needing_final_notice = (
+                async for user in self.scan(
+                    guild,
                     RemovalWorkflow.get_users_needing_final_notice(
-                        session, guild_id_str
-                    )
-                )
-
-                for user in users_needing_final_notice:
-                    await self.send_final_notice(guild, user, admin_channel)
-                    await asyncio.sleep(2)  # Small delay to avoid rate limiting
+                        session, guild_id_str, clock=self.clock
+                    ),
+                ):
+                    if guild.get_member(int(user.user_id)):
+                        self.queue_final_notice(session, guild, user, admin_channel)
 
                 # Check for users ready for removal
-                users_ready_for_removal = RemovalWorkflow.get_users_ready_for_removal(
-                    session, guild_id_str
-                )
-
-                for user in users_ready_for_removal:
-                    await self.remove_user(guild, user, admin_channel)
-                    await asyncio.sleep(5)  # Longer delay for removals
+                async for user in self.scan(
+                    guild,
+                    RemovalWorkflow.get_users_ready_for_removal(
+                        session, guild_id_str, clock=self.clock
+                    ),
+                ):
+                    if guild.get_member(int(user.user_id)):
+                        self.queue_removal(session, guild, user, admin_channel)
 
                 # Check for users who should be marked for removal
-                for user in (
-                    session.query(TrackedUser)
-                    .filter(
-                        TrackedUser.guild_id == guild_id_str,
-                        TrackedUser.removal_status == RemovalStatus.ACTIVE,
-                    )
-                    .all()
+                async for user in self.scan(
+                    guild, RemovalWorkflow.get_active_users(session, guild_id_str)
                 ):
                     member = guild.get_member(int(user.user_id))
                     if not member:
@@ -554,24 +1138,38 @@ class Gatekeeper(commands.Cog):
 
                     # If they don't have the role and have been here longer than the grace period, mark them for removal
                     if not has_role and now - joined > GRACE_PERIOD:
-                        RemovalWorkflow.mark_user_for_removal(
-                            session, user.user_id, guild_id_str
-                        )
-
                         # Post initial warning to admin channel
                         dry_run_prefix = "[DRY RUN] " if DRY_RUN_MODE else ""
-                        await admin_channel.send(
-                            f"{dry_run_prefix}⚠️ **User Marked for Removal**\n"
-                            f"User: <@{user.user_id}>\n"
-                            f"Reason: Not verified after grace period\n"
-                            f"Grace period exceeded by: {(now - joined - GRACE_PERIOD).days} days\n"
-                            f"First warning will be sent automatically."
+                        removal_date = now + RemovalWorkflow.FIRST_WARNING_DURATION
+                        RemovalWorkflow.mark_user_for_removal(
+                            session,
+                            user.user_id,
+                            guild_id_str,
+                            clock=self.clock,
+                            removal_date=removal_date,
+                            only_from=RemovalStatus.ACTIVE,
+                            outbox=[
+                                self.admin_post(
+                                    f"marked:{guild.id}:{user.user_id}:{removal_date.isoformat()}",
+                                    guild.id,
+                                    admin_channel.id,
+                                    f"{dry_run_prefix}⚠️ **User Marked for Removal**\n"
+                                    f"User: <@{user.user_id}>\n"
+                                    f"Reason: Not verified after grace period\n"
+                                    f"Grace period exceeded by: {(now - joined - GRACE_PERIOD).days} days\n"
+                                    f"First warning will be sent automatically.",
+                                    user_id=user.user_id,
+                                )
+                            ],
                         )
 
                         self.logger.info(
-                            f"{'[DRY RUN] ' if DRY_RUN_MODE else ''}Marked user {user.user_id} for removal"
+                            "%sMarked user %s for removal", dry_run_prefix, user.user_id
                         )
 
+                # Start sending this guild's batch while we check the next one
+                self.outbox.wake()
+
         except Exception as e:
             self.logger.error(f"Error in removal check loop: {e}")
             import traceback
@@ -579,6 +1177,8 @@ class Gatekeeper(commands.Cog):
             self.logger.error(f"Traceback: {traceback.format_exc()}")
         finally:
             session.close()
+            # Append this tick's transitions in one batch
+            await self.flush_journal()
 
     @app_commands.command(name="removal_status")
     @app_commands.describe(
@@ -604,23 +1204,17 @@ class Gatekeeper(commands.Cog):
 
             if user:
                 # Check specific user
-                tracked_user = RemovalWorkflow.get_user_status(session, str(user.id))
+                tracked_user = RemovalWorkflow.get_user_status(
+                    session, str(user.id), guild_id_str
+                )
                 if tracked_user:
-                    status_emoji = {
-                        RemovalStatus.ACTIVE: "✅",
-                        RemovalStatus.PENDING_REMOVAL: "⏳",
-                        RemovalStatus.FIRST_WARNING_SENT: "⚠️",
-                        RemovalStatus.FINAL_NOTICE_SENT: "🚨",
-                        RemovalStatus.REMOVED: "🚫",
-                    }
-
                     embed = discord.Embed(
                         title=f"Removal Status for {user.display_name}",
                         color=discord.Color.blue(),
                     )
                     embed.add_field(
                         name="Status",
-                        value=f"{status_emoji[tracked_user.removal_status]} {tracked_user.removal_status.value}",
+                        value=f"{STATUS_EMOJI[tracked_user.removal_status]} {tracked_user.removal_status.value}",
                         inline=True,
                     )
                     embed.add_field(
@@ -699,24 +1293,36 @@ class Gatekeeper(commands.Cog):
 
         session = Session()
         try:
-            RemovalWorkflow.reset_user_status(session, str(user.id))
-
-            await interaction.response.send_message(
-                f"✅ Reset removal status for {user.display_name} to active.",
-                ephemeral=True,
-            )
-
             # Also post to admin channel if configured
             admin_channel_id = self.get_admin_channel(interaction.guild.id)
+            outbox = []
             if admin_channel_id:
-                admin_channel = interaction.guild.get_channel(admin_channel_id)
-                if admin_channel:
-                    await admin_channel.send(
+                outbox.append(
+                    self.admin_post(
+                        f"reset:{interaction.id}",
+                        interaction.guild.id,
+                        admin_channel_id,
                         f"✅ **User Status Reset**\n"
                         f"User: <@{user.id}>\n"
                         f"Reset by: {interaction.user.mention}\n"
-                        f"Status: Active"
+                        f"Status: Active",
+                        user_id=user.id,
                     )
+                )
+            RemovalWorkflow.reset_user_status(
+                session,
+                str(user.id),
+                str(interaction.guild.id),
+                clock=self.clock,
+                actor=f"admin:{interaction.user.id}",
+                outbox=outbox,
+            )
+            self.outbox.wake()
+
+            await interaction.response.send_message(
+                f"✅ Reset removal status for {user.display_name} to active.",
+                ephemeral=True,
+            )
 
         except Exception as e:
             self.logger.error(f"Error resetting user status: {e}")
@@ -727,6 +1333,202 @@ class Gatekeeper(commands.Cog):
         finally:
             session.close()
 
+    @app_commands.command(name="removal_list")
+    @app_commands.describe(status="Which stage of the removal queue to list")
+    @app_commands.choices(
+        status=[
+            app_commands.Choice(name="Pending removal", value="pending_removal"),
+            app_commands.Choice(name="First warning sent", value="first_warning_sent"),
+            app_commands.Choice(name="Final notice sent", value="final_notice_sent"),
+            app_commands.Choice(name="Removed", value="removed"),
+        ]
+    )
+    async def removal_list(
+        self, interaction: discord.Interaction, status: str = "pending_removal"
+    ):
+        """List users in the removal queue, soonest removal first (Admin only)"""
+        if not (
+            interaction.user.guild_permissions.administrator
+            or interaction.user.id == 185206201011798016
+        ):
+            await interaction.response.send_message(
+                "You need administrator permissions or be the bot developer to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        removal_status = RemovalStatus(status)
+        guild_id_str = str(interaction.guild.id)
+
+        def fetch_page(cursor):
+            session = Session()
+            try:
+                return RemovalWorkflow.get_removal_queue_page(
+                    session, guild_id_str, removal_status, after=cursor
+                )
+            finally:
+                session.close()
+
+        def render(rows, page):
+            embed = discord.Embed(
+                title=f"{STATUS_EMOJI[removal_status]} {removal_status.value} in {interaction.guild.name}",
+                color=discord.Color.blue(),
+            )
+            lines = []
+            for row in rows:
+                line = (
+                    f"<@{row.user_id}> removal <t:{int(row.removal_date.timestamp())}:R>, "
+                    f"joined <t:{int(row.joined_at.timestamp())}:d>"
+                )
+                if row.bot_retries:
+                    line += f", DM retries {row.bot_retries}/3"
+                lines.append(line)
+            embed.description = "\n".join(lines) or "Nobody here."
+            embed.set_footer(text=f"Page {page}, soonest removal first")
+            return embed
+
+        try:
+            await KeysetPaginator(fetch_page, render, interaction.user.id).start(
+                interaction
+            )
+        except Exception as e:
+            self.logger.error(f"Error listing removal queue: {e}")
+            await interaction.response.send_message(
+                "Error listing removal queue. Please try again.",
+                ephemeral=True,
+            )
+
+    @app_commands.command(name="removal_history")
+    @app_commands.describe(
+        user="Only show transitions for this user (optional, shows the whole guild if not provided)"
+    )
+    async def removal_history(
+        self, interaction: discord.Interaction, user: discord.User = None
+    ):
+        """Page through the removal transition journal (Admin only)"""
+        if not (
+            interaction.user.guild_permissions.administrator
+            or interaction.user.id == 185206201011798016
+        ):
+            await interaction.response.send_message(
+                "You need administrator permissions or be the bot developer to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        guild_id_str = str(interaction.guild.id)
+        user_id_str = str(user.id) if user else None
+        title = (
+            f"Removal history for {user.display_name}"
+            if user
+            else f"Removal history for {interaction.guild.name}"
+        )
+
+        def fetch_page(cursor):
+            return get_history(guild_id_str, user_id=user_id_str, before=cursor)
+
+        def render(rows, page):
+            embed = discord.Embed(title=title, color=discord.Color.blue())
+            lines = []
+            for row in rows:
+                from_status = row.from_status.value if row.from_status else "new"
+                line = (
+                    f"<t:{int(row.occurred_at.timestamp())}:f> "
+                    f"<@{row.user_id}> {from_status} → "
+                    f"{STATUS_EMOJI[row.to_status]} {row.to_status.value} "
+                    f"by `{row.actor}`"
+                )
+                if row.message_id:
+                    line += f" (DM {row.message_id})"
+                lines.append(line)
+            embed.description = "\n".join(lines) or "No transitions recorded yet."
+            embed.set_footer(text=f"Page {page}, newest first")
+            return embed
+
+        try:
+            await KeysetPaginator(fetch_page, render, interaction.user.id).start(
+                interaction
+            )
+        except Exception as e:
+            self.logger.error(f"Error reading removal history: {e}")
+            await interaction.response.send_message(
+                "Error reading removal history. Please try again.",
+                ephemeral=True,
+            )
+
+    @app_commands.command(name="gatekeeper_forecast")
+    @app_commands.describe(
+        days="How many days ahead to project (1-30)",
+        what_if="Project as if gatekeeper were enabled right now",
+        grace_days="Try a different grace period, in days (optional)",
+    )
+    async def gatekeeper_forecast(
+        self,
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 1, 30] = 14,
+        what_if: bool = False,
+        grace_days: app_commands.Range[float, 0, 60] = None,
+    ):
+        """Project warnings, final notices and removals per day (Admin only)"""
+        if not (
+            interaction.user.guild_permissions.administrator
+            or interaction.user.id == 185206201011798016
+        ):
+            await interaction.response.send_message(
+                "You need administrator permissions or be the bot developer to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        if not what_if and not self.get_gatekeeper_enabled(interaction.guild.id):
+            await interaction.response.send_message(
+                "Gatekeeper isn't enabled here, use `what_if: True` to see what enabling it would do.",
+                ephemeral=True,
+            )
+            return
+
+        grace_period = (
+            timedelta(days=grace_days) if grace_days is not None else GRACE_PERIOD
+        )
+        try:
+            forecast = await asyncio.to_thread(
+                get_forecast,
+                str(interaction.guild.id),
+                days,
+                grace_period,
+                self.clock,
+                what_if,
+            )
+        except Exception as e:
+            self.logger.error(f"Error computing removal forecast: {e}")
+            await interaction.response.send_message(
+                "Error computing the forecast. Please try again.", ephemeral=True
+            )
+            return
+
+        today = self.clock.now().date()
+        lines = [f"{'Day':<10} {'Warn':>5} {'Notice':>7} {'Kick':>5}"]
+        for day in range(days):
+            counts = [forecast[stage][day] for stage in FORECAST_STAGES]
+            if any(counts):
+                date = (today + timedelta(days=day)).strftime("%a %b %d")
+                lines.append(f"{date:<10} {counts[0]:>5} {counts[1]:>7} {counts[2]:>5}")
+        totals = [sum(forecast[stage]) for stage in FORECAST_STAGES]
+        lines.append(f"{'Total':<10} {totals[0]:>5} {totals[1]:>7} {totals[2]:>5}")
+
+        embed = discord.Embed(
+            title=f"{'What if: ' if what_if else ''}Gatekeeper forecast for {interaction.guild.name}",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(
+            text=(
+                f"Next {days} days, grace period {grace_period.total_seconds() / 86400:g} days, "
+                "assuming nobody verifies. Only tracked members are counted."
+            )
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
 async def setup(bot):
     await bot.add_cog(Gatekeeper(bot))
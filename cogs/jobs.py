@@ -0,0 +1,106 @@
+import discord
+import logging
+from discord import app_commands
+from discord.ext import commands
+from utilities.background_jobs import (
+    CANCELLED,
+    RUNNER,
+    STATUS_EMOJI,
+    get_job,
+    get_jobs,
+    request_cancel,
+)
+from utilities.sharding import owns_guild
+
+
+class JobsCog(commands.Cog):
+    """Runs background jobs (e.g. member syncs) and lets admins follow or cancel them."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = logging.getLogger(__name__)
+
+    def accepts(self, guild_id: str) -> bool:
+        """Only run jobs for guilds this process can reach."""
+        return (
+            owns_guild(int(guild_id)) and self.bot.get_guild(int(guild_id)) is not None
+        )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Also resumes jobs interrupted by a restart
+        RUNNER.start(self.bot, accepts=self.accepts)
+
+    def cog_unload(self):
+        # Running jobs go back to the queue, to resume from their checkpoints
+        RUNNER.stop()
+
+    def is_admin(self, interaction: discord.Interaction) -> bool:
+        return (
+            interaction.user.guild_permissions.administrator
+            or interaction.user.id == 185206201011798016
+        )
+
+    @app_commands.command(name="jobs")
+    async def jobs(self, interaction: discord.Interaction):
+        """List this server's latest background jobs (Admin only)"""
+        if not self.is_admin(interaction):
+            await interaction.response.send_message(
+                "You need administrator permissions or be the bot developer to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        try:
+            lines = []
+            for job in get_jobs(interaction.guild_id):
+                line = f"{STATUS_EMOJI[job.status]} #{job.id} {job.kind}: {job.status}"
+                if job.total:
+                    line += f", {job.progress:,}/{job.total:,}"
+                if job.cancel_requested and job.status != CANCELLED:
+                    line += " (cancelling)"
+                line += f", started <t:{int(job.created_at.timestamp())}:R>"
+                lines.append(line)
+            embed = discord.Embed(
+                title=f"Background jobs in {interaction.guild.name}",
+                description="\n".join(lines) or "No jobs yet.",
+                color=discord.Color.blue(),
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception as e:
+            self.logger.error(f"Error listing jobs: {e}")
+            await interaction.response.send_message(
+                "Error listing jobs. Please try again.", ephemeral=True
+            )
+
+    @app_commands.command(name="cancel_job")
+    @app_commands.describe(job_id="The job number, see /jobs")
+    async def cancel_job(self, interaction: discord.Interaction, job_id: int):
+        """Cancel a queued or running background job (Admin only)"""
+        if not self.is_admin(interaction):
+            await interaction.response.send_message(
+                "You need administrator permissions or be the bot developer to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        try:
+            state = request_cancel(job_id, interaction.guild_id)
+            if state is None:
+                message = f"Job #{job_id} isn't queued or running in this server."
+            elif state == CANCELLED:
+                message = f"🛑 Job #{job_id} cancelled before it started."
+                # Nothing is running it, so update its status message here
+                await RUNNER.edit_status(get_job(job_id))
+            else:
+                message = f"🛑 Job #{job_id} will stop at its next progress update."
+            await interaction.response.send_message(message, ephemeral=True)
+        except Exception as e:
+            self.logger.error(f"Error cancelling job {job_id}: {e}")
+            await interaction.response.send_message(
+                "Error cancelling job. Please try again.", ephemeral=True
+            )
+
+
+async def setup(bot):
+    await bot.add_cog(JobsCog(bot))
@@ -4,11 +4,19 @@ import random
 import asyncio
 from discord import app_commands
 from discord.ext import commands, tasks
-from datetime import datetime
+from datetime import datetime, time, timezone
 import os
+from utilities.command_stats import (
+    LATENCY_BUCKETS_MS,
+    CommandStats,
+    get_usage_rollup,
+)
 
 version = os.environ.get("GIT_COMMIT", "dev")
 
+# How often buffered command stats are written to the DB
+STATS_FLUSH_SECONDS = int(os.environ.get("COMMAND_STATS_FLUSH_SECONDS", "60"))
+
 
 class ToolCog(commands.Cog, name="ToolsCog"):
     def __init__(self, bot):
@@ -17,11 +25,20 @@ class ToolCog(commands.Cog, name="ToolsCog"):
         self.command_counter = 0  # Initialize a command counter
         self.start_time = datetime.now()  # Track when the bot started
         self.bot.usage_today = self.command_counter
+        self.command_stats = CommandStats()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.update_status.start()
-        self.reset_counter_task.start()
+        if not self.update_status.is_running():
+            self.update_status.start()
+        if not self.reset_counter_task.is_running():
+            self.reset_counter_task.start()
+        if not self.flush_stats_task.is_running():
+            self.flush_stats_task.start()
+
+    async def cog_unload(self):
+        self.flush_stats_task.cancel()
+        await self.flush_stats()
 
     @tasks.loop(minutes=1)
     async def update_status(self):
@@ -34,18 +51,35 @@ class ToolCog(commands.Cog, name="ToolsCog"):
         await self.bot.change_presence(activity=discord.Game(name=new_status))
 
     @commands.Cog.listener()
-    async def on_app_command_completion(self, ctx, cmd):
+    async def on_app_command_completion(self, interaction, cmd):
         self.command_counter += 1
         self.bot.usage_today = self.command_counter
 
-    @tasks.loop(seconds=1)
+        # Latency from when Discord created the interaction to completion
+        latency = discord.utils.utcnow() - interaction.created_at
+        self.command_stats.record(
+            interaction.guild_id,
+            cmd.qualified_name,
+            latency.total_seconds() * 1000,
+        )
+
+    @tasks.loop(time=time(hour=0, minute=0, tzinfo=timezone.utc))
     async def reset_counter_task(self):
-        while True:
-            # Replace with your own logic for midnight reset
-            await asyncio.sleep(86400)
-            self.command_counter = 0
-            self.bot.usage_today = self.command_counter
-            self.logger.info("Command counter reset.")
+        self.command_counter = 0
+        self.bot.usage_today = self.command_counter
+        self.logger.info("Command counter reset.")
+
+    async def flush_stats(self):
+        try:
+            rows = await asyncio.to_thread(self.command_stats.flush)
+            if rows:
+                self.logger.debug(f"Flushed {rows} command stat rollups")
+        except Exception as e:
+            self.logger.error(f"Error flushing command stats: {e}")
+
+    @tasks.loop(seconds=STATS_FLUSH_SECONDS)
+    async def flush_stats_task(self):
+        await self.flush_stats()
 
     @app_commands.command(name="invite_bot")
     async def invite_bot(self, ctx: discord.Interaction):
@@ -60,6 +94,67 @@ class ToolCog(commands.Cog, name="ToolsCog"):
             f"Bot version: {getattr(self.bot, 'version', 'unknown')}"
         )
 
+    @app_commands.command(name="bot_stats")
+    @app_commands.describe(
+        days="How many days back to include (default 7)",
+        all_guilds="Include every guild instead of just this one",
+    )
+    async def usage_stats(
+        self,
+        ctx: discord.Interaction,
+        days: app_commands.Range[int, 1, 90] = 7,
+        all_guilds: bool = False,
+    ):
+        """Show the busiest and slowest commands from the daily rollups"""
+        if all_guilds:
+            permissions = getattr(ctx.user, "guild_permissions", None)
+            if not (
+                await self.bot.is_owner(ctx.user)
+                or (permissions and permissions.administrator)
+            ):
+                await ctx.response.send_message(
+                    "You need administrator permissions or be the bot owner to see stats for every guild.",
+                    ephemeral=True,
+                )
+                return
+
+        try:
+            rollup = await asyncio.to_thread(
+                get_usage_rollup, days, None if all_guilds else ctx.guild_id or 0
+            )
+        except Exception as e:
+            self.logger.error(f"Error reading command stats: {e}")
+            await ctx.response.send_message(
+                "Error reading command stats. Please try again.", ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(
+            title=f"Command stats, last {days} day{'s' if days != 1 else ''}",
+            color=discord.Color.blue(),
+        )
+        if not rollup:
+            embed.description = "No commands recorded yet."
+        for total in rollup[:15]:
+            if total["p95_ms"] is not None:
+                p95 = f"≤{total['p95_ms']}ms"
+            elif any(total["buckets"]):
+                p95 = f">{LATENCY_BUCKETS_MS[-1]}ms"  # Overflow bucket
+            else:
+                p95 = "n/a"
+            embed.add_field(
+                name=f"/{total['command']}",
+                value=(
+                    f"Uses: {total['uses']}\n"
+                    f"Avg: {total['avg_ms']}ms, p95: {p95}\n"
+                    f"Max: {total['max_ms']}ms"
+                ),
+                inline=True,
+            )
+        embed.set_footer(text="Rollups are flushed every minute")
+
+        await ctx.response.send_message(embed=embed, ephemeral=True)
+
 
 async def setup(bot):
     await bot.add_cog(ToolCog(bot))
@@ -1,39 +1,236 @@
 import discord
 from discord.ext import commands
+from discord import app_commands
+import asyncio
 import logging
+import string
+from typing import NamedTuple, Optional
+from utilities.dm_channels import send_dm
+from utilities.member_cache import ensure_chunked
+from utilities.cache_invalidation import register, unregister
+from utilities.guild_settings import (
+    delete_guild_settings,
+    get_guild_settings,
+    get_settings_for_keys,
+    set_guild_settings,
+)
 
-WELCOME_CHANNEL_ID = 1136410197921898589  # Age verification channel
-GUILD_ID = 945386790402023554
-CHANNEL_LINK = f"https://discord.com/channels/{GUILD_ID}/{WELCOME_CHANNEL_ID}"
-TRIGGER_ROLE_ID = 1136372559160545375
+WELCOME_KEYS = ["welcome_trigger_role", "welcome_channel", "welcome_message"]
+DEFAULT_WELCOME_MESSAGE = (
+    "Welcome {name} to {guild}!\n"
+    "Please have a look at {channel}\n"
+    "Other than that, please enjoy your stay!"
+)
+
+WELCOME_FIELDS = ("name", "guild", "channel")
+
+
+def template_error(template: str) -> Optional[str]:
+    """Why `template` can't be used as a welcome message, None if it's fine."""
+    try:
+        fields = [
+            (field, spec, conversion)
+            for _, field, spec, conversion in string.Formatter().parse(template)
+            if field is not None
+        ]
+    except ValueError as e:
+        return f"It isn't a valid template: {e}. Use {{{{ and }}}} for literal braces."
+    for field, spec, conversion in fields:
+        # Only plain names, {name.__class__} or {name:>99999} could do real harm
+        if field not in WELCOME_FIELDS:
+            return (
+                f"`{{{field}}}` isn't a placeholder, use "
+                + ", ".join(f"`{{{name}}}`" for name in WELCOME_FIELDS)
+                + ". Use {{ and }} for literal braces."
+            )
+        if spec or conversion:
+            return f"`{{{field}}}` can't have a format spec or conversion."
+    return None
+
+
+class WelcomeConfig(NamedTuple):
+    trigger_role_id: int
+    channel_id: int
+    message: str
 
 
 class WelcomeCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
+        self.dispatch = {}  # guild_id -> WelcomeConfig, only configured guilds
+        self._send_tasks = set()  # Keep references so DMs aren't garbage collected
+
+    async def cog_load(self):
+        await self.load_dispatch_table()
+        # Keep the dispatch table in step with /manage_welcome in other processes
+        register("guild_settings", self.reload_guild_config)
+
+    async def cog_unload(self):
+        unregister("guild_settings", self.reload_guild_config)
+
+    async def reload_guild_config(self, guild_id):
+        """Re-read one guild's welcome config after its settings changed."""
+        if guild_id is None:
+            await self.load_dispatch_table()
+            return
+        guild_id = int(guild_id)
+        settings = await asyncio.to_thread(get_guild_settings, guild_id)
+        config = self.build_config(settings)
+        if config is None:
+            self.dispatch.pop(guild_id, None)
+            return
+        newly_enabled = guild_id not in self.dispatch
+        self.dispatch[guild_id] = config
+        if newly_enabled:
+            await ensure_chunked(self.bot, [guild_id])
+
+    async def load_dispatch_table(self):
+        """Load every guild's welcome config in one query."""
+        try:
+            settings = await asyncio.to_thread(get_settings_for_keys, WELCOME_KEYS)
+        except Exception as e:
+            self.logger.error(f"Error loading welcome config: {e}")
+            return
+
+        dispatch = {}
+        for guild_id, guild_settings in settings.items():
+            config = self.build_config(guild_settings)
+            if config:
+                dispatch[guild_id] = config
+        self.dispatch = dispatch
+        self.logger.info(f"Loaded welcome config for {len(dispatch)} guilds")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_member_update only fires for cached members
+        await ensure_chunked(self.bot, list(self.dispatch))
+
+    @staticmethod
+    def build_config(guild_settings: dict):
+        if not guild_settings.get("welcome_trigger_role"):
+            return None
+        message = guild_settings.get("welcome_message") or DEFAULT_WELCOME_MESSAGE
+        if template_error(message):
+            message = DEFAULT_WELCOME_MESSAGE  # Saved before it was validated
+        return WelcomeConfig(
+            trigger_role_id=int(guild_settings["welcome_trigger_role"]),
+            channel_id=int(guild_settings.get("welcome_channel") or 0),
+            message=message,
+        )
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
+        config = self.dispatch.get(after.guild.id)
+        if config is None:
+            return
+
         # Only trigger when the user is given the trigger role
-        before_roles = set(r.id for r in before.roles)
-        after_roles = set(r.id for r in after.roles)
-        if TRIGGER_ROLE_ID in after_roles and TRIGGER_ROLE_ID not in before_roles:
-            try:
-                welcome_message = (
-                    f"Welcome {after.display_name} to the Azorewrath Server!\n"
-                    f"If you want access to nsfw, please visit the age verification channel: {CHANNEL_LINK}\n"
-                    f"Other than that, please enjoy your stay!"
-                )
-                await after.send(welcome_message)
-                self.logger.info(
-                    f"Sent welcome message to {after.display_name} ({after.id})"
+        role_id = config.trigger_role_id
+        if after.get_role(role_id) is None or before.get_role(role_id) is not None:
+            return
+
+        # Send in the background so a slow DM doesn't hold up the gateway
+        task = asyncio.create_task(self.send_welcome(after, config))
+        self._send_tasks.add(task)
+        task.add_done_callback(self._send_tasks.discard)
+
+    async def send_welcome(self, member, config: WelcomeConfig):
+        channel_link = (
+            f"https://discord.com/channels/{member.guild.id}/{config.channel_id}"
+        )
+        try:
+            welcome_message = config.message.format(
+                name=member.display_name,
+                guild=member.guild.name,
+                channel=channel_link,
+            )
+            await send_dm(self.bot, member, welcome_message)
+            self.logger.info(
+                "Sent welcome message to %s (%s)", member.display_name, member.id
+            )
+        except Exception as e:
+            self.logger.warning(
+                "Could not send welcome message to %s (%s): %s",
+                member.display_name,
+                member.id,
+                e,
+            )
+
+    @app_commands.command(name="manage_welcome")
+    @app_commands.describe(
+        action="Enable or disable welcome DMs",
+        trigger_role="Role that triggers the welcome DM when given (required when enabling)",
+        channel="Channel linked in the welcome DM (required when enabling)",
+        message="Custom message, can use {name}, {guild} and {channel} (optional)",
+    )
+    @app_commands.choices(
+        action=[
+            app_commands.Choice(name="enable", value="enable"),
+            app_commands.Choice(name="disable", value="disable"),
+        ]
+    )
+    async def manage_welcome(
+        self,
+        interaction: discord.Interaction,
+        action: str,
+        trigger_role: discord.Role = None,
+        channel: discord.TextChannel = None,
+        message: str = None,
+    ):
+        """Manage welcome DMs for this server (Admin only)"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(
+                "You need administrator permissions to use this command.",
+                ephemeral=True,
+            )
+            return
+
+        try:
+            if action == "enable":
+                if not trigger_role or not channel:
+                    await interaction.response.send_message(
+                        "Both trigger_role and channel are required when enabling welcome DMs.",
+                        ephemeral=True,
+                    )
+                    return
+
+                error = template_error(message) if message else None
+                if error:
+                    await interaction.response.send_message(
+                        f"That welcome message can't be used. {error}",
+                        ephemeral=True,
+                    )
+                    return
+
+                settings = {
+                    "welcome_trigger_role": trigger_role.id,
+                    "welcome_channel": channel.id,
+                    "welcome_message": message or DEFAULT_WELCOME_MESSAGE,
+                }
+                set_guild_settings(interaction.guild_id, settings)
+                self.dispatch[interaction.guild_id] = self.build_config(settings)
+
+                await interaction.response.send_message(
+                    f"Welcome DMs enabled! Trigger role: {trigger_role.mention}, Channel: {channel.mention}",
+                    ephemeral=True,
                 )
-            except Exception as e:
-                self.logger.warning(
-                    f"Could not send welcome message to {after.display_name} ({after.id}): {e}"
+                await ensure_chunked(self.bot, [interaction.guild_id])
+
+            elif action == "disable":
+                delete_guild_settings(interaction.guild_id, WELCOME_KEYS)
+                self.dispatch.pop(interaction.guild_id, None)
+
+                await interaction.response.send_message(
+                    "Welcome DMs disabled for this server.", ephemeral=True
                 )
 
+        except Exception as e:
+            self.logger.error(f"Error managing welcome: {e}")
+            await interaction.response.send_message(
+                "Error managing welcome DMs. Please try again.", ephemeral=True
+            )
+
 
 async def setup(bot):
     await bot.add_cog(WelcomeCog(bot))
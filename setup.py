@@ -15,6 +15,7 @@ setup(
     entry_points={
         "console_scripts": [
             "pats-bot=PatsBot.__main__:main",
+            "pats-bot-admin=PatsBot.admin:main",
         ],
     },
     python_requires=">=3.10.0",
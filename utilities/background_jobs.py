@@ -0,0 +1,542 @@
+"""
+Background jobs for long running admin operations, e.g. member syncs
+
+Jobs are rows in background_jobs, claimed by JobRunner workers with a lease
+(available_at doubles as the lease expiry, like the outbox). While a job runs,
+a heartbeat renews the lease, saves its progress and checkpoint, edits its
+status message and cancels it if someone asked to. Jobs handed back on
+shutdown, or left behind by a crashed process once the lease runs out, are
+claimed again and resume from their checkpoint.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import BackgroundJob
+from utilities.clock import Clock, SYSTEM_CLOCK
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_RETENTION = datetime.timedelta(days=int(os.environ.get("JOB_RETENTION_DAYS", "7")))
+LEASE_DURATION = datetime.timedelta(minutes=2)
+# Saves progress and edits the status message, well inside the lease
+HEARTBEAT_SECONDS = 10
+POLL_SECONDS = 5  # How often run() looks for work nobody woke it up for
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATUS_EMOJI = {
+    QUEUED: "🕓",
+    RUNNING: "⏳",
+    DONE: "✅",
+    FAILED: "❌",
+    CANCELLED: "🛑",
+}
+
+
+class JobContext:
+    """A claimed job, as its handler sees it."""
+
+    def __init__(self, row: BackgroundJob, token: str):
+        self.id = row.id
+        self.kind = row.kind
+        self.guild_id = row.guild_id
+        self.params = json.loads(row.params)
+        self.progress = row.progress
+        self.total = row.total
+        # None on the first run, else the last checkpoint saved before a restart
+        self.checkpoint = json.loads(row.checkpoint) if row.checkpoint else None
+        self.channel_id = row.channel_id
+        self.message_id = row.message_id
+        self.token = token
+        self.rendered = None  # Last status message content, to skip no-op edits
+
+    def update(self, progress: int, total: Optional[int] = None, checkpoint=None):
+        """
+        Record progress, saved by the next heartbeat so it's cheap to call per
+        item. `checkpoint` (anything JSON) must only cover committed work.
+        """
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+
+
+# handler(job) -> summary shown once done; raising fails the job
+Handler = Callable[[JobContext], Awaitable[Optional[str]]]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def register(kind: str, handler: Handler):
+    """Run jobs of `kind` with `handler`. Unregistered kinds stay queued."""
+    _handlers[kind] = handler
+
+
+def unregister(kind: str, handler: Handler):
+    if _handlers.get(kind) == handler:
+        del _handlers[kind]
+
+
+def render_status(job) -> str:
+    """Status message for a job row or JobContext."""
+    params = json.loads(job.params) if isinstance(job.params, str) else job.params
+    status = getattr(job, "status", RUNNING)
+    lines = [
+        f"{STATUS_EMOJI[status]} **{params.get('title', job.kind)}** (job #{job.id})"
+    ]
+    if job.total:
+        percent = min(100, job.progress * 100 // job.total)
+        lines.append(f"{job.progress:,} / {job.total:,} ({percent}%)")
+    elif job.progress:
+        lines.append(f"{job.progress:,} done")
+    if status == DONE and getattr(job, "result", None):
+        lines.append(job.result)
+    elif status == FAILED:
+        lines.append(f"Error: {getattr(job, 'last_error', None)}")
+    return "\n".join(lines)
+
+
+def create_job(
+    kind: str,
+    guild_id,
+    params: dict,
+    created_by=None,
+    clock: Clock = SYSTEM_CLOCK,
+) -> BackgroundJob:
+    """Queue a job. Returns the new row (detached)."""
+    now = clock.now()
+    session = Session(expire_on_commit=False)
+    try:
+        job = BackgroundJob(
+            kind=kind,
+            guild_id=str(guild_id),
+            params=json.dumps(params),
+            status=QUEUED,
+            cancel_requested=False,
+            progress=0,
+            available_at=now,
+            created_by=str(created_by) if created_by is not None else None,
+            created_at=now,
+        )
+        session.add(job)
+        session.commit()
+        return job
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def set_status_message(job_id: int, channel_id, message_id) -> None:
+    session = Session()
+    try:
+        session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id)
+            .values(channel_id=str(channel_id), message_id=str(message_id))
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def get_active_job(kind: str, guild_id) -> Optional[BackgroundJob]:
+    """A queued or running job of `kind` for the guild, to avoid starting another."""
+    session = Session()
+    try:
+        return session.scalars(
+            select(BackgroundJob)
+            .where(
+                BackgroundJob.guild_id == str(guild_id),
+                BackgroundJob.kind == kind,
+                BackgroundJob.status.in_([QUEUED, RUNNING]),
+            )
+            .limit(1)
+        ).first()
+    finally:
+        session.close()
+
+
+def get_job(job_id: int) -> Optional[BackgroundJob]:
+    session = Session()
+    try:
+        return session.get(BackgroundJob, job_id)
+    finally:
+        session.close()
+
+
+def get_jobs(guild_id, limit: int = 10) -> List[BackgroundJob]:
+    """The guild's latest jobs, newest first."""
+    session = Session()
+    try:
+        return session.scalars(
+            select(BackgroundJob)
+            .where(BackgroundJob.guild_id == str(guild_id))
+            .order_by(BackgroundJob.id.desc())
+            .limit(limit)
+        ).all()
+    finally:
+        session.close()
+
+
+def request_cancel(job_id: int, guild_id, clock: Clock = SYSTEM_CLOCK) -> Optional[str]:
+    """
+    Cancel a guild's job. Queued jobs are cancelled right away (returns
+    CANCELLED), running ones on their next heartbeat (returns RUNNING).
+    None if there is no such unfinished job.
+    """
+    session = Session()
+    try:
+        ours = (BackgroundJob.id == job_id, BackgroundJob.guild_id == str(guild_id))
+        result = session.execute(
+            update(BackgroundJob)
+            .where(*ours, BackgroundJob.status == QUEUED)
+            .values(status=CANCELLED, finished_at=clock.now())
+        )
+        if result.rowcount:
+            session.commit()
+            return CANCELLED
+        result = session.execute(
+            update(BackgroundJob)
+            .where(*ours, BackgroundJob.status == RUNNING)
+            .values(cancel_requested=True)
+        )
+        session.commit()
+        return RUNNING if result.rowcount else None
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def claim_jobs(
+    limit: int,
+    accepts: Callable[[str], bool] = lambda guild_id: True,
+    clock: Clock = SYSTEM_CLOCK,
+) -> List[JobContext]:
+    """
+    Lease up to `limit` due jobs of registered kinds whose guild `accepts`
+    (e.g. is on our shards), oldest first. Safe across processes.
+    """
+    if not _handlers or limit <= 0:
+        return []
+    now = clock.now()
+    token = uuid.uuid4().hex
+    due = (
+        BackgroundJob.kind.in_(list(_handlers)),
+        BackgroundJob.status.in_([QUEUED, RUNNING]),
+        BackgroundJob.available_at <= now,
+    )
+    session = Session()
+    try:
+        candidates = session.execute(
+            select(BackgroundJob.id, BackgroundJob.guild_id)
+            .where(*due)
+            .order_by(BackgroundJob.id)
+            .limit(limit * 4)
+        ).all()
+        ids = [row.id for row in candidates if accepts(row.guild_id)][:limit]
+        if not ids:
+            return []
+        # Re-check due-ness in the UPDATE, so a concurrent claimer wins cleanly
+        session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(ids), *due)
+            .values(
+                status=RUNNING,
+                claimed_by=token,
+                available_at=now + LEASE_DURATION,
+            )
+        )
+        session.commit()
+        claimed = session.scalars(
+            select(BackgroundJob)
+            .where(BackgroundJob.claimed_by == token)
+            .order_by(BackgroundJob.id)
+        ).all()
+        return [JobContext(row, token) for row in claimed]
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def heartbeat(job: JobContext, clock: Clock = SYSTEM_CLOCK) -> Optional[bool]:
+    """
+    Save progress and renew the lease. Returns whether cancelling was
+    requested, or None if the lease was lost to another runner.
+    """
+    session = Session()
+    try:
+        result = session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job.id, BackgroundJob.claimed_by == job.token)
+            .values(
+                progress=job.progress,
+                total=job.total,
+                checkpoint=(
+                    json.dumps(job.checkpoint) if job.checkpoint is not None else None
+                ),
+                available_at=clock.now() + LEASE_DURATION,
+            )
+        )
+        if result.rowcount == 0:
+            session.rollback()
+            return None
+        session.commit()
+        return session.scalar(
+            select(BackgroundJob.cancel_requested).where(BackgroundJob.id == job.id)
+        )
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def finish_job(
+    job: JobContext,
+    status: str,
+    result: Optional[str] = None,
+    error: Optional[str] = None,
+    clock: Clock = SYSTEM_CLOCK,
+) -> Optional[BackgroundJob]:
+    """Mark a claimed job finished. Returns the final row, None if the lease was lost."""
+    session = Session(expire_on_commit=False)
+    try:
+        updated = session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job.id, BackgroundJob.claimed_by == job.token)
+            .values(
+                status=status,
+                progress=job.progress,
+                total=job.total,
+                finished_at=clock.now(),
+                result=result,
+                last_error=error,
+            )
+        )
+        if updated.rowcount == 0:
+            session.rollback()
+            return None
+        session.commit()
+        return session.get(BackgroundJob, job.id)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def release_jobs(jobs: List[JobContext], clock: Clock = SYSTEM_CLOCK) -> None:
+    """Hand claimed jobs back so the next runner resumes them without waiting."""
+    session = Session()
+    try:
+        for job in jobs:
+            session.execute(
+                update(BackgroundJob)
+                .where(
+                    BackgroundJob.id == job.id, BackgroundJob.claimed_by == job.token
+                )
+                .values(
+                    status=QUEUED,
+                    claimed_by=None,
+                    progress=job.progress,
+                    total=job.total,
+                    checkpoint=(
+                        json.dumps(job.checkpoint)
+                        if job.checkpoint is not None
+                        else None
+                    ),
+                    available_at=clock.now(),
+                )
+            )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def prune(clock: Clock = SYSTEM_CLOCK) -> int:
+    """Delete jobs finished longer than JOB_RETENTION ago."""
+    session = Session()
+    try:
+        result = session.execute(
+            delete(BackgroundJob).where(
+                BackgroundJob.status.in_([DONE, FAILED, CANCELLED]),
+                BackgroundJob.finished_at < clock.now() - JOB_RETENTION,
+            )
+        )
+        session.commit()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+class JobRunner:
+    """Runs claimed jobs with a bounded pool of concurrent workers."""
+
+    def __init__(self, clock: Clock = SYSTEM_CLOCK, workers: int = JOB_WORKERS):
+        self.clock = clock
+        self.workers = workers
+        self.logger = logging.getLogger(__name__)
+        self.bot = None
+        self.accepts = lambda guild_id: True
+        self._running: Dict[int, JobContext] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def wake(self):
+        """Tell run() there is a new job, instead of waiting for the next poll."""
+        self._wake.set()
+
+    def start(self, bot, accepts: Optional[Callable[[str], bool]] = None):
+        self.bot = bot
+        if accepts is not None:
+            self.accepts = accepts
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        """Stop, handing running jobs back to resume from their checkpoints."""
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            release_jobs(list(self._running.values()), self.clock)
+        except Exception as e:
+            self.logger.error(f"Error releasing background jobs: {e}")
+        for task in self._tasks.values():
+            task.cancel()
+        self._running.clear()
+        self._tasks.clear()
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        last_prune = None
+        while True:
+            try:
+                jobs = await asyncio.to_thread(
+                    claim_jobs,
+                    self.workers - len(self._tasks),
+                    self.accepts,
+                    self.clock,
+                )
+                for job in jobs:
+                    self._running[job.id] = job
+                    self._tasks[job.id] = asyncio.create_task(self.execute(job))
+                now = self.clock.now()
+                if last_prune is None or now - last_prune > datetime.timedelta(hours=1):
+                    last_prune = now
+                    pruned = await asyncio.to_thread(prune, self.clock)
+                    if pruned:
+                        self.logger.debug(f"Pruned {pruned} finished background jobs")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error claiming background jobs: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def execute(self, job: JobContext):
+        self.logger.info(f"Running job #{job.id} ({job.kind}) for {job.guild_id}")
+        work = asyncio.create_task(_handlers[job.kind](job))
+        status, result, error = DONE, None, None
+        try:
+            await self.edit_status(job)
+            while not work.done():
+                await asyncio.wait({work}, timeout=HEARTBEAT_SECONDS)
+                if work.done():
+                    break
+                try:
+                    cancel = await asyncio.to_thread(heartbeat, job, self.clock)
+                except Exception as e:
+                    self.logger.error(f"Error saving job #{job.id} progress: {e}")
+                    continue  # The lease has some slack, try again next beat
+                if cancel is None:
+                    self.logger.warning(f"Lost lease on job #{job.id}")
+                    work.cancel()
+                    return
+                if cancel:
+                    work.cancel()
+                    await asyncio.wait({work})
+                    status = CANCELLED
+                    break
+                await self.edit_status(job)
+
+            if status != CANCELLED:
+                try:
+                    result = work.result()
+                except asyncio.CancelledError:
+                    status = CANCELLED
+                except Exception as e:
+                    self.logger.error(f"Job #{job.id} ({job.kind}) failed: {e}")
+                    status, error = FAILED, str(e)
+
+            row = await asyncio.to_thread(
+                finish_job, job, status, result, error, self.clock
+            )
+            if row is not None:
+                self.logger.info(f"Job #{job.id} {status}")
+                await self.edit_status(row)
+        except asyncio.CancelledError:
+            work.cancel()  # stop() already handed the job back
+            raise
+        except Exception as e:
+            self.logger.error(f"Error running job #{job.id}: {e}")
+        finally:
+            self._running.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+            self.wake()  # A worker is free
+
+    async def edit_status(self, job):
+        """Show the job's progress in its status message, if it has one."""
+        if not job.message_id or self.bot is None:
+            return
+        channel = self.bot.get_channel(int(job.channel_id))
+        if channel is None:
+            return
+        content = render_status(job)
+        if getattr(job, "rendered", None) == content:
+            return
+        try:
+            await channel.get_partial_message(int(job.message_id)).edit(content=content)
+            job.rendered = content
+        except discord.HTTPException as e:
+            self.logger.warning(f"Couldn't update status of job #{job.id}: {e}")
+
+
+RUNNER = JobRunner()
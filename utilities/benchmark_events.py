@@ -0,0 +1,188 @@
+"""
+Benchmark how fast the cogs absorb gateway events.
+
+Feeds synthetic on_member_join / on_member_update streams straight into the
+Gatekeeper and WelcomeCog listeners, the way discord.py dispatches them (one
+task per listener), using the fake Discord objects from utilities.simulation.
+Reports events/sec, handler latency and event loop lag per scenario:
+
+    python -m utilities.benchmark_events --events 2000 --rate 100
+    python -m utilities.benchmark_events --database-url postgresql://...
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilities.simulation import (
+    FakeBot,
+    FakeChannel,
+    FakeGuild,
+    FakeMember,
+    FakeRole,
+    use_temp_database,
+)
+
+SCENARIOS = ["steady_joins", "raid_burst", "mass_role_grants"]
+LAG_SAMPLE_SECONDS = 0.005
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class EventBench:
+    """Dispatches events to cog listeners and times them."""
+
+    def __init__(self, cogs):
+        self.listeners = {}  # event name -> bound listener methods
+        for cog in cogs:
+            for name, method in cog.get_listeners():
+                self.listeners.setdefault(name, []).append(method)
+        self.latencies = []  # Seconds from dispatch to listener return
+        self.lags = []  # How late the loop woke the lag sampler
+        self.errors = 0
+        self._tasks = set()
+
+    def dispatch(self, event: str, *args):
+        """Like Client.dispatch: schedule every listener, don't wait for them."""
+        for listener in self.listeners.get(f"on_{event}", []):
+            task = asyncio.create_task(self._run(listener, time.perf_counter(), args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, listener, dispatched_at, args):
+        try:
+            await listener(*args)
+        except Exception:
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - dispatched_at)
+
+    async def sample_lag(self):
+        while True:
+            expected = time.perf_counter() + LAG_SAMPLE_SECONDS
+            await asyncio.sleep(LAG_SAMPLE_SECONDS)
+            self.lags.append(max(time.perf_counter() - expected, 0))
+
+    async def drain(self, *task_sets):
+        """Wait for listeners and anything they spawned (e.g. welcome DMs)."""
+        while self._tasks or any(task_sets):
+            await asyncio.gather(*self._tasks, *[t for s in task_sets for t in s])
+
+
+async def run_scenario(name: str, events: int, rate: float) -> dict:
+    """Run one scenario against a fresh guild. Expects the DB to be set up."""
+    from cogs.gatekeeper import Gatekeeper
+    from cogs.welcome import WelcomeCog
+    from utilities.guild_settings import set_guild_settings
+
+    guild = FakeGuild(name=f"Bench {name}")
+    trigger_role = guild.add_role(FakeRole("Verified"))
+    welcome_channel = guild.add_channel(FakeChannel(name="welcome"))
+    bot = FakeBot([guild])
+    set_guild_settings(
+        guild.id,
+        {
+            "welcome_trigger_role": trigger_role.id,
+            "welcome_channel": welcome_channel.id,
+        },
+    )
+
+    gatekeeper = Gatekeeper(bot)
+    welcome = WelcomeCog(bot)
+    await welcome.load_dispatch_table()
+    bench = EventBench([gatekeeper, welcome])
+
+    joined_at = datetime.datetime.utcnow()
+    members = [FakeMember(guild, joined_at=joined_at) for _ in range(events)]
+    if name == "mass_role_grants":
+        # Already members, not part of the measurement
+        for member in members:
+            guild.add_member(member)
+
+    sampler = asyncio.create_task(bench.sample_lag())
+    start = time.perf_counter()
+    for i, member in enumerate(members):
+        if name == "mass_role_grants":
+            before = member
+            after = FakeMember(guild, member_id=member.id, joined_at=joined_at)
+            after.roles = member.roles + [trigger_role]
+            bench.dispatch("member_update", before, after)
+        else:
+            guild.add_member(member)
+            bench.dispatch("member_join", member)
+
+        if name == "steady_joins":
+            # Hold the rate, sleeping until the next event is due
+            delay = start + (i + 1) / rate - time.perf_counter()
+            await asyncio.sleep(max(delay, 0))
+        elif i % 100 == 99:
+            # A burst still arrives in gateway reads, not one giant batch
+            await asyncio.sleep(0)
+    await bench.drain(welcome._send_tasks)
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "events_per_sec": events / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(bench.latencies, 0.50) * 1000,
+        "p99_ms": percentile(bench.latencies, 0.99) * 1000,
+        "max_ms": max(bench.latencies, default=0) * 1000,
+        "loop_lag_p99_ms": percentile(bench.lags, 0.99) * 1000,
+        "loop_lag_max_ms": max(bench.lags, default=0) * 1000,
+        "errors": bench.errors,
+    }
+
+
+def use_database(url: str) -> str:
+    """Point module level engines at an existing database, e.g. Postgres."""
+    os.environ["DATABASE_URL"] = url
+
+    from sqlalchemy import create_engine
+    from PatsBot.models import Base
+
+    Base.metadata.create_all(create_engine(url))
+    return url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument(
+        "--rate", type=float, default=50, help="Events/sec for steady_joins"
+    )
+    parser.add_argument(
+        "--database-url", help="Use this database instead of a temp SQLite file"
+    )
+    args = parser.parse_args()
+
+    if args.database_url:
+        db = use_database(args.database_url)
+    else:
+        db = use_temp_database()
+
+    print(f"⏱️  Gateway event benchmark (db: {db})")
+    for name in args.scenario or SCENARIOS:
+        results = asyncio.run(run_scenario(name, args.events, args.rate))
+        print("-" * 50)
+        print(name)
+        for key, value in results.items():
+            if isinstance(value, float):
+                value = f"{value:.2f}"
+            print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Cross-process cache invalidation
+
+Writers call publish() in the transaction that changes the data. On Postgres
+that is a NOTIFY, delivered to every listening process when the transaction
+commits. Elsewhere (SQLite) it appends to cache_invalidations, which every
+process polls by id about once a second. Either way the running listener
+calls the handlers registered for the topic, including in the process that
+made the change.
+"""
+
+import asyncio
+import datetime
+import inspect
+import json
+import logging
+import os
+import select as select_module
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, delete, func, insert, select, text
+from sqlalchemy.orm import Session as SessionType
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import CacheInvalidation
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+NOTIFY_CHANNEL = "cache_invalidation"
+POLL_SECONDS = float(os.environ.get("CACHE_INVALIDATION_POLL_SECONDS", "1"))
+# Pollers only need rows newer than their last poll, older ones get pruned
+RETENTION = datetime.timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+# handler(key) where key is None for "everything in the topic". May be async.
+Handler = Callable[[Optional[str]], Any]
+
+_handlers: Dict[str, List[Handler]] = {}
+
+
+def register(topic: str, handler: Handler):
+    """Call `handler` on invalidations for `topic`, in registration order."""
+    _handlers.setdefault(topic, []).append(handler)
+
+
+def unregister(topic: str, handler: Handler):
+    if handler in _handlers.get(topic, []):
+        _handlers[topic].remove(handler)
+
+
+def uses_notify(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def publish(session: SessionType, topic: str, key: Optional[str] = None):
+    """Invalidate `key` everywhere once the caller's transaction commits."""
+    key = str(key) if key is not None else None
+    if uses_notify(session.get_bind()):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {
+                "channel": NOTIFY_CHANNEL,
+                "payload": json.dumps({"topic": topic, "key": key}),
+            },
+        )
+    else:
+        session.execute(insert(CacheInvalidation).values(topic=topic, key=key))
+
+
+async def dispatch(topic: str, key: Optional[str]):
+    for handler in list(_handlers.get(topic, [])):
+        try:
+            result = handler(key)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Error invalidating {topic}:{key}: {e}")
+
+
+class InvalidationListener:
+    """Receives invalidations from other processes and dispatches them."""
+
+    def __init__(self):
+        self._task = None
+        self._last_id = None  # Highest cache_invalidations id seen when polling
+        self._connection = None  # Dedicated LISTEN connection on Postgres
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._close()
+
+    async def run(self):
+        polls = 0
+        while True:
+            try:
+                if uses_notify(engine):
+                    # Blocks up to POLL_SECONDS waiting for notifications
+                    events = await asyncio.to_thread(self._wait_for_notify)
+                else:
+                    events = await asyncio.to_thread(self._poll_table)
+                    polls += 1
+                    if polls % 60 == 0:
+                        await asyncio.to_thread(self._prune)
+                for topic, key in events:
+                    await dispatch(topic, key)
+                if not uses_notify(engine):
+                    await asyncio.sleep(POLL_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error receiving cache invalidations: {e}")
+                self._close()
+                await asyncio.sleep(POLL_SECONDS)
+
+    def _wait_for_notify(self) -> List[tuple]:
+        if self._connection is None:
+            connection = engine.raw_connection()
+            connection.driver_connection.autocommit = True
+            with connection.driver_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            self._connection = connection
+
+        driver_connection = self._connection.driver_connection
+        if select_module.select([driver_connection], [], [], POLL_SECONDS)[0]:
+            driver_connection.poll()
+        events = []
+        while driver_connection.notifies:
+            payload = json.loads(driver_connection.notifies.pop(0).payload)
+            events.append((payload["topic"], payload.get("key")))
+        return events
+
+    def _poll_table(self) -> List[tuple]:
+        session = Session()
+        try:
+            if self._last_id is None:
+                # Only what happens from now on, caches start out empty anyway
+                self._last_id = session.scalar(select(func.max(CacheInvalidation.id)))
+                self._last_id = self._last_id or 0
+                return []
+            rows = session.execute(
+                select(
+                    CacheInvalidation.id, CacheInvalidation.topic, CacheInvalidation.key
+                )
+                .where(CacheInvalidation.id > self._last_id)
+                .order_by(CacheInvalidation.id)
+            ).all()
+            if rows:
+                self._last_id = rows[-1].id
+            return [(row.topic, row.key) for row in rows]
+        finally:
+            session.close()
+
+    def _prune(self):
+        session = Session()
+        try:
+            session.execute(
+                delete(CacheInvalidation).where(
+                    CacheInvalidation.created_at
+                    < datetime.datetime.utcnow() - RETENTION
+                )
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def _close(self):
+        if self._connection is not None:
+            # Discard rather than return it to the pool, it is still LISTENing
+            self._connection.invalidate()
+            self._connection = None
+
+
+# Started once per bot process, see PatsBot/main.py
+LISTENER = InvalidationListener()
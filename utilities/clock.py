@@ -0,0 +1,40 @@
+"""
+Clock abstraction so the removal workflow can run on simulated time
+"""
+
+import asyncio
+import datetime
+from typing import Optional, Union
+
+
+class Clock:
+    """The real clock. Times are naive UTC like everything stored in the DB."""
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.utcnow()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock(Clock):
+    """A clock that only moves when told to. sleep() advances it instantly."""
+
+    def __init__(self, start: Optional[datetime.datetime] = None):
+        self._now = start or datetime.datetime(2025, 1, 1)
+
+    def now(self) -> datetime.datetime:
+        return self._now
+
+    def advance(self, delta: Union[datetime.timedelta, float]):
+        if not isinstance(delta, datetime.timedelta):
+            delta = datetime.timedelta(seconds=delta)
+        self._now += delta
+
+    async def sleep(self, seconds: float):
+        self.advance(seconds)
+        # Still yield so other tasks get a turn, just like a real sleep
+        await asyncio.sleep(0)
+
+
+SYSTEM_CLOCK = Clock()
@@ -0,0 +1,183 @@
+"""
+In-memory app command usage/latency counters, flushed to daily rollups
+"""
+
+import datetime
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import CommandLatencyDaily, CommandUsageDaily
+from utilities.upsert import dialect_insert
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+# Histogram upper bounds in ms, anything slower lands in a final overflow bucket
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _Counter:
+    __slots__ = ("uses", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.uses = 0
+        self.total_ms = 0
+        self.max_ms = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, other: "_Counter"):
+        self.uses += other.uses
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+
+
+def percentile_ms(buckets: List[int], fraction: float) -> Optional[int]:
+    """Approximate a percentile from histogram counts (upper bound of its bucket)."""
+    total = sum(buckets)
+    if not total:
+        return None
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= total * fraction:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+    return None
+
+
+class CommandStats:
+    """Buffers command completions in memory; flush() rolls them into the DB."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[datetime.date, str, str], _Counter] = {}
+        self._lock = threading.Lock()  # flush() runs in a worker thread
+
+    def record(self, guild_id: Optional[int], command: str, latency_ms: float):
+        """Count one completed command. Cheap, safe to call on the hot path."""
+        key = (datetime.datetime.utcnow().date(), str(guild_id or 0), command)
+        latency_ms = max(int(latency_ms), 0)
+        with self._lock:
+            counter = self._pending.get(key)
+            if counter is None:
+                counter = self._pending[key] = _Counter()
+            counter.uses += 1
+            counter.total_ms += latency_ms
+            counter.max_ms = max(counter.max_ms, latency_ms)
+            counter.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def flush(self) -> int:
+        """Write buffered counters into command_usage_daily. Returns rows touched."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        usage_rows, latency_rows = [], []
+        for (day, guild_id, command), counter in pending.items():
+            key = {"day": day, "guild_id": guild_id, "command": command}
+            usage_rows.append(
+                {
+                    **key,
+                    "uses": counter.uses,
+                    "total_ms": counter.total_ms,
+                    "max_ms": counter.max_ms,
+                }
+            )
+            latency_rows.extend(
+                {**key, "bucket": bucket, "count": count}
+                for bucket, count in enumerate(counter.buckets)
+                if count
+            )
+
+        session = Session()
+        try:
+            # Add to the existing rows in the upsert itself, so concurrent
+            # flushes from other replicas can't lose each other's counts
+            usage = CommandUsageDaily.__table__
+            stmt = dialect_insert(session.bind, usage).values(usage_rows)
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["day", "guild_id", "command"],
+                    set_={
+                        "uses": usage.c.uses + stmt.excluded.uses,
+                        "total_ms": usage.c.total_ms + stmt.excluded.total_ms,
+                        "max_ms": case(
+                            (usage.c.max_ms > stmt.excluded.max_ms, usage.c.max_ms),
+                            else_=stmt.excluded.max_ms,
+                        ),
+                    },
+                )
+            )
+            latency = CommandLatencyDaily.__table__
+            stmt = dialect_insert(session.bind, latency).values(latency_rows)
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["day", "guild_id", "command", "bucket"],
+                    set_={"count": latency.c.count + stmt.excluded.count},
+                )
+            )
+            session.commit()
+            return len(pending)
+        except Exception as e:
+            session.rollback()
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                for key, counter in pending.items():
+                    self._pending.setdefault(key, _Counter()).add(counter)
+            raise e
+        finally:
+            session.close()
+
+
+def get_usage_rollup(days: int, guild_id: Optional[int] = None) -> List[dict]:
+    """Per command totals over the last `days` days, busiest first."""
+    since = datetime.datetime.utcnow().date() - datetime.timedelta(days=days - 1)
+    session = Session()
+    try:
+        query = session.query(CommandUsageDaily).filter(CommandUsageDaily.day >= since)
+        if guild_id is not None:
+            query = query.filter(CommandUsageDaily.guild_id == str(guild_id))
+
+        totals = {}
+        for row in query:
+            total = totals.setdefault(
+                row.command,
+                {
+                    "command": row.command,
+                    "uses": 0,
+                    "total_ms": 0,
+                    "max_ms": 0,
+                    "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                },
+            )
+            total["uses"] += row.uses
+            total["total_ms"] += row.total_ms
+            total["max_ms"] = max(total["max_ms"], row.max_ms)
+
+        histogram = session.query(
+            CommandLatencyDaily.command,
+            CommandLatencyDaily.bucket,
+            func.sum(CommandLatencyDaily.count),
+        ).filter(CommandLatencyDaily.day >= since)
+        if guild_id is not None:
+            histogram = histogram.filter(CommandLatencyDaily.guild_id == str(guild_id))
+        for command, bucket, count in histogram.group_by(
+            CommandLatencyDaily.command, CommandLatencyDaily.bucket
+        ):
+            if command in totals and bucket <= len(LATENCY_BUCKETS_MS):
+                totals[command]["buckets"][bucket] += count
+
+        for total in totals.values():
+            total["avg_ms"] = total["total_ms"] // total["uses"] if total["uses"] else 0
+            total["p95_ms"] = percentile_ms(total["buckets"], 0.95)
+        return sorted(totals.values(), key=lambda t: t["uses"], reverse=True)
+    finally:
+        session.close()
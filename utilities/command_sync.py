@@ -0,0 +1,58 @@
+"""
+Skip app command syncs when the command tree hasn't changed since the last one
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Optional
+
+import discord
+
+from utilities.key_value_store import get_value, set_value
+
+# Sync even if the stored hash matches, e.g. after editing commands in the portal
+FORCE_COMMAND_SYNC = str(os.environ.get("FORCE_COMMAND_SYNC", "0")).lower() in (
+    "true",
+    "1",
+    "t",
+    "yes",
+)
+
+
+async def command_tree_hash(
+    tree: discord.app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]
+) -> str:
+    """sha256 of the payload tree.sync() would send for `guild` (None = global)."""
+    commands = tree.get_commands(guild=guild)
+    if tree.translator:
+        payload = [
+            await command.get_translated_payload(tree, tree.translator)
+            for command in commands
+        ]
+    else:
+        payload = [command.to_dict(tree) for command in commands]
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def sync_commands(
+    bot: discord.Client,
+    guild: Optional[discord.abc.Snowflake] = None,
+    force: bool = FORCE_COMMAND_SYNC,
+) -> bool:
+    """
+    Sync the command tree unless it hashes the same as the last successful
+    sync for this application and scope. Returns True if it synced.
+    """
+    scope = f"guild:{guild.id}" if guild else "global"
+    key = f"command_sync_hash:{bot.application_id}:{scope}"
+    digest = await command_tree_hash(bot.tree, guild)
+    if not force and await asyncio.to_thread(get_value, key) == digest:
+        return False
+
+    await bot.tree.sync(guild=guild)
+    await asyncio.to_thread(set_value, key, digest)
+    return True
@@ -0,0 +1,124 @@
+"""
+DM channel ID cache so DMs can skip the create_dm REST call.
+
+member.send() has to POST /users/@me/channels before every DM unless the DM
+channel is already in discord.py's cache. We remember each user's DM channel ID
+in a bounded in-memory LRU and in the dm_channels table, and send through a
+PartialMessageable. DB lookups and writes happen in worker threads.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+from typing import Optional
+
+import discord
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import DMChannel
+from utilities.lru_cache import MISSING, LRUCache
+from utilities.upsert import dialect_insert
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+DM_CHANNEL_CACHE_SIZE = int(os.environ.get("DM_CHANNEL_CACHE_SIZE", "10000"))
+DM_CHANNEL_CACHE_TTL = float(os.environ.get("DM_CHANNEL_CACHE_TTL", "86400"))  # Seconds
+
+logger = logging.getLogger(__name__)
+
+# user_id -> channel_id, or None once the DB had none
+_channel_ids = LRUCache(DM_CHANNEL_CACHE_SIZE, DM_CHANNEL_CACHE_TTL)
+
+
+def get_dm_channel_id(user_id: int) -> Optional[int]:
+    """Known DM channel for a user, checking memory then the DB. Blocking on a miss."""
+    channel_id = _channel_ids.get(user_id)
+    if channel_id is not MISSING:
+        return channel_id
+
+    generation = _channel_ids.generation
+    session = Session()
+    try:
+        row = session.get(DMChannel, str(user_id))
+        channel_id = int(row.channel_id) if row else None
+    except Exception as e:
+        logger.error(f"Error reading DM channel for {user_id}: {e}")
+        return None
+    finally:
+        session.close()
+
+    _channel_ids.put(user_id, channel_id, generation)
+    return channel_id
+
+
+def remember_dm_channel(user_id: int, channel_id: int):
+    """Store a user's DM channel in memory and the DB. Blocking."""
+    _channel_ids.put(user_id, channel_id)
+
+    session = Session()
+    try:
+        now = datetime.datetime.utcnow()
+        stmt = dialect_insert(session.bind, DMChannel).values(
+            user_id=str(user_id), channel_id=str(channel_id), updated_at=now
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={"channel_id": str(channel_id), "updated_at": now},
+            )
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error saving DM channel for {user_id}: {e}")
+    finally:
+        session.close()
+
+
+def forget_dm_channel(user_id: int):
+    """Drop a user's cached DM channel, e.g. after a failed send. Blocking."""
+    _channel_ids.put(user_id, None)
+
+    session = Session()
+    try:
+        session.execute(delete(DMChannel).where(DMChannel.user_id == str(user_id)))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error forgetting DM channel for {user_id}: {e}")
+    finally:
+        session.close()
+
+
+async def send_dm(client: discord.Client, user, *args, **kwargs) -> discord.Message:
+    """
+    DM a user or member, reusing their known DM channel. Raises the same
+    discord exceptions as user.send(), e.g. Forbidden 50007 for closed DMs.
+    """
+    # discord.py already has the channel cached, user.send() won't create one
+    if user.dm_channel is None:
+        channel_id = _channel_ids.get(user.id)
+        if channel_id is MISSING:
+            channel_id = await asyncio.to_thread(get_dm_channel_id, user.id)
+        if channel_id:
+            channel = client.get_partial_messageable(
+                channel_id, type=discord.ChannelType.private
+            )
+            try:
+                return await channel.send(*args, **kwargs)
+            except discord.NotFound:
+                # Stale channel, fall back to creating a fresh one below
+                await asyncio.to_thread(forget_dm_channel, user.id)
+            except discord.HTTPException:
+                await asyncio.to_thread(forget_dm_channel, user.id)
+                raise
+
+    message = await user.send(*args, **kwargs)
+    if _channel_ids.get(user.id) != message.channel.id:
+        await asyncio.to_thread(remember_dm_channel, user.id, message.channel.id)
+    return message
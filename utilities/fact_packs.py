@@ -0,0 +1,104 @@
+"""
+Loading of fun fact packs with a compiled cache.
+
+Every PatsBot/Data/FunFacts*.yaml file is a pack with a top level `facts` list.
+The merged list is cached as JSON next to them, keyed by each pack's mtime/size
+and content hash, so a normal startup never has to parse YAML.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import yaml
+
+DATA_DIR = Path(__file__).parent.parent / "PatsBot" / "Data"
+PACK_GLOB = "FunFacts*.yaml"
+CACHE_PATH = Path(os.environ.get("FUN_FACTS_CACHE", str(DATA_DIR / ".fun_facts.cache")))
+CACHE_VERSION = 2  # 1 was a pickle
+
+logger = logging.getLogger(__name__)
+
+
+def find_packs() -> List[Path]:
+    """All fact pack files, in a stable order."""
+    return sorted(DATA_DIR.glob(PACK_GLOB))
+
+
+def pack_signature(paths: Optional[List[Path]] = None) -> Tuple:
+    """Cheap stat based fingerprint used to notice changed packs."""
+    paths = find_packs() if paths is None else paths
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _read_cache() -> Optional[dict]:
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as file:
+            cached = json.load(file)
+        if cached.get("version") == CACHE_VERSION:
+            # JSON has no tuples, pack_signature() does
+            cached["signature"] = tuple(tuple(entry) for entry in cached["signature"])
+            return cached
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable fun facts cache {CACHE_PATH}: {e}")
+    return None
+
+
+def _write_cache(cached: dict):
+    # Write then rename so a concurrent reader never sees half a file
+    tmp_path = CACHE_PATH.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(cached, file, ensure_ascii=False)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write fun facts cache {CACHE_PATH}: {e}")
+
+
+def load_facts() -> Tuple[List[str], Tuple]:
+    """
+    Load and merge every pack, returning (facts, signature). Blocking, so call it
+    from a worker thread when the event loop is running.
+    """
+    paths = find_packs()
+    signature = pack_signature(paths)
+    cached = _read_cache()
+    if cached and cached["signature"] == signature:
+        return cached["facts"], signature
+
+    # Stat changed (edit, fresh checkout, docker COPY); only reparse if content did
+    blobs = {path.name: path.read_bytes() for path in paths}
+    digests = {name: hashlib.sha256(blob).hexdigest() for name, blob in blobs.items()}
+    if cached and cached["digests"] == digests:
+        facts = cached["facts"]
+    else:
+        facts = []
+        for name, blob in blobs.items():
+            data = yaml.safe_load(blob) or {}
+            pack_facts = data.get("facts") or []
+            logger.info(f"Parsed {len(pack_facts)} fun facts from {name}")
+            facts.extend(str(fact) for fact in pack_facts)
+        # Packs may overlap, keep the first copy of each fact
+        facts = list(dict.fromkeys(facts))
+
+    _write_cache(
+        {
+            "version": CACHE_VERSION,
+            "signature": signature,
+            "digests": digests,
+            "facts": facts,
+        }
+    )
+    return facts, signature
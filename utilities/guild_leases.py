@@ -0,0 +1,189 @@
+"""
+Lease based partitioning of gatekeeper guilds between bot replicas.
+
+Every replica heartbeats into gatekeeper_replicas and holds a lease per guild
+it processes. Leases are renewed on each heartbeat, so a dead replica's guilds
+free up once its leases expire and the survivors claim them.
+"""
+
+import datetime
+import logging
+import math
+import os
+import socket
+from typing import Iterable, Set
+
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import GatekeeperReplica, GuildLease
+from utilities.sharding import CLUSTER_ID
+from utilities.upsert import dialect_insert
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+REPLICA_ID = os.environ.get("REPLICA_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_DURATION = datetime.timedelta(
+    seconds=int(os.environ.get("GATEKEEPER_LEASE_SECONDS", "90"))
+)
+# Renew well inside the lease so one slow heartbeat doesn't drop guilds
+HEARTBEAT_INTERVAL = LEASE_DURATION / 3
+
+logger = logging.getLogger(__name__)
+
+
+def rebalance_leases(
+    guild_ids: Iterable[int],
+    replica_id: str = REPLICA_ID,
+    cluster_id: int = CLUSTER_ID,
+) -> Set[int]:
+    """
+    Heartbeat, renew our leases and claim or release guilds so live replicas
+    of this cluster each hold a fair share. Returns the guild IDs we now own.
+    """
+    now = datetime.datetime.utcnow()
+    expires_at = now + LEASE_DURATION
+    candidates = sorted(str(guild_id) for guild_id in guild_ids)
+
+    session = Session()
+    try:
+        stmt = dialect_insert(session.bind, GatekeeperReplica).values(
+            replica_id=replica_id, cluster_id=cluster_id, heartbeat_at=now
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["replica_id"],
+                set_={"cluster_id": cluster_id, "heartbeat_at": now},
+            )
+        )
+
+        # Forget replicas that have been gone for a while (every restart is a new ID)
+        session.execute(
+            delete(GatekeeperReplica).where(
+                GatekeeperReplica.heartbeat_at < now - LEASE_DURATION * 10
+            )
+        )
+
+        live_replicas = (
+            session.query(GatekeeperReplica)
+            .filter(
+                GatekeeperReplica.cluster_id == cluster_id,
+                GatekeeperReplica.heartbeat_at > now - LEASE_DURATION,
+            )
+            .count()
+        )
+        fair_share = math.ceil(len(candidates) / max(live_replicas, 1))
+
+        leases = {
+            lease.guild_id: lease
+            for lease in session.query(GuildLease).filter(
+                GuildLease.guild_id.in_(candidates)
+            )
+        }
+        owned = [
+            g for g in candidates if g in leases and leases[g].owner_id == replica_id
+        ]
+
+        # Hand surplus back so a freshly started peer can pick it up
+        surplus = owned[fair_share:]
+        owned = owned[:fair_share]
+        if surplus:
+            session.execute(
+                delete(GuildLease).where(
+                    GuildLease.guild_id.in_(surplus),
+                    GuildLease.owner_id == replica_id,
+                )
+            )
+            logger.info(f"Released {len(surplus)} guild leases to peers")
+
+        if owned:
+            session.execute(
+                update(GuildLease)
+                .where(
+                    GuildLease.guild_id.in_(owned),
+                    GuildLease.owner_id == replica_id,
+                )
+                .values(expires_at=expires_at)
+            )
+
+        for guild_id in candidates:
+            if len(owned) >= fair_share:
+                break
+            lease = leases.get(guild_id)
+            if lease is None:
+                stmt = dialect_insert(session.bind, GuildLease).values(
+                    guild_id=guild_id, owner_id=replica_id, expires_at=expires_at
+                )
+                result = session.execute(
+                    stmt.on_conflict_do_nothing(index_elements=["guild_id"])
+                )
+            elif lease.owner_id != replica_id and lease.expires_at <= now:
+                # Conditional update so two replicas can't both take it over
+                result = session.execute(
+                    update(GuildLease)
+                    .where(
+                        GuildLease.guild_id == guild_id,
+                        GuildLease.owner_id == lease.owner_id,
+                        GuildLease.expires_at <= now,
+                    )
+                    .values(owner_id=replica_id, expires_at=expires_at)
+                )
+            else:
+                continue
+
+            if result.rowcount == 1:
+                owned.append(guild_id)
+                logger.info(f"Claimed gatekeeper lease for guild {guild_id}")
+
+        session.commit()
+        return {int(guild_id) for guild_id in owned}
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def renew_lease(guild_id: int, replica_id: str = REPLICA_ID) -> bool:
+    """
+    Extend our lease on one guild, e.g. between chunks of a long removal check.
+    Returns False if it expired or a peer took it over, so the caller stops.
+    """
+    now = datetime.datetime.utcnow()
+    session = Session()
+    try:
+        result = session.execute(
+            update(GuildLease)
+            .where(
+                GuildLease.guild_id == str(guild_id),
+                GuildLease.owner_id == replica_id,
+                GuildLease.expires_at > now,
+            )
+            .values(expires_at=now + LEASE_DURATION)
+        )
+        session.commit()
+        return result.rowcount == 1
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def release_leases(replica_id: str = REPLICA_ID):
+    """Drop all leases and the heartbeat so peers take over without waiting."""
+    session = Session()
+    try:
+        session.execute(delete(GuildLease).where(GuildLease.owner_id == replica_id))
+        session.execute(
+            delete(GatekeeperReplica).where(GatekeeperReplica.replica_id == replica_id)
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
@@ -1,54 +1,161 @@
-from PatsBot.models import Guild
+from PatsBot.models import Guild, GuildSetting
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, select
+from typing import Dict, List, Optional
+from utilities.cache_invalidation import publish, register
+from utilities.upsert import dialect_insert
 import os
 import json
+import threading
+import time
 
 # Use the same DB URL logic as Alembic
 DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
 engine = create_engine(DATABASE_URL, future=True)
 Session = sessionmaker(bind=engine)
 
+# Writes invalidate every process's copy, the TTL only covers a missed invalidation
+GUILD_SETTINGS_CACHE_TTL = float(os.environ.get("GUILD_SETTINGS_CACHE_TTL", "3600"))
+
+_cache = {}  # guild_id -> (expires_at, settings)
+_cache_lock = threading.Lock()
+_generation = 0  # Bumped on invalidation so a read that raced it isn't cached
+
+
+def invalidate_guild_settings(guild_id: Optional[str] = None):
+    """Drop a guild's cached settings, or every guild's with None."""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        if guild_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(guild_id), None)
+
+
+register("guild_settings", invalidate_guild_settings)
+
 
 def get_guild_settings(guild_id: int) -> dict:
     """Get all settings for a guild."""
+    with _cache_lock:
+        entry = _cache.get(str(guild_id))
+        generation = _generation
+    if entry is not None and entry[0] > time.monotonic():
+        return dict(entry[1])
+
     session = Session()
     try:
-        guild = session.get(Guild, str(guild_id))
-        if guild and guild.settings:
-            return json.loads(guild.settings)
-        return {}
+        rows = session.execute(
+            select(GuildSetting.key, GuildSetting.value).where(
+                GuildSetting.guild_id == str(guild_id)
+            )
+        )
+        settings = {key: json.loads(value) for key, value in rows if value is not None}
     except:
         return {}
     finally:
         session.close()
 
+    with _cache_lock:
+        if generation == _generation:
+            expires_at = time.monotonic() + GUILD_SETTINGS_CACHE_TTL
+            _cache[str(guild_id)] = (expires_at, settings)
+    return dict(settings)
+
+
+def set_guild_settings(guild_id: int, settings: dict):
+    """Set several settings for a guild in one transaction."""
+    if not settings:
+        return
 
-def set_guild_setting(guild_id: int, key: str, value):
-    """Set a specific setting for a guild."""
     session = Session()
     try:
-        guild = session.get(Guild, str(guild_id))
-        if not guild:
-            guild = Guild(guild_id=str(guild_id))
-            session.add(guild)
+        guild_stmt = dialect_insert(session.bind, Guild).values(guild_id=str(guild_id))
+        session.execute(guild_stmt.on_conflict_do_nothing(index_elements=["guild_id"]))
+
+        stmt = dialect_insert(session.bind, GuildSetting).values(
+            [
+                {"guild_id": str(guild_id), "key": key, "value": json.dumps(value)}
+                for key, value in settings.items()
+            ]
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["guild_id", "key"],
+                set_={"value": stmt.excluded.value},
+            )
+        )
+        publish(session, "guild_settings", guild_id)
+
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+        invalidate_guild_settings(guild_id)
 
-        settings = json.loads(guild.settings) if guild.settings else {}
-        settings[key] = value
-        guild.settings = json.dumps(settings)
 
+def set_guild_setting(guild_id: int, key: str, value):
+    """Set a specific setting for a guild."""
+    set_guild_settings(guild_id, {key: value})
+
+
+def delete_guild_settings(guild_id: int, keys: List[str]):
+    """Remove settings from a guild so they fall back to their defaults."""
+    session = Session()
+    try:
+        session.execute(
+            delete(GuildSetting).where(
+                GuildSetting.guild_id == str(guild_id), GuildSetting.key.in_(keys)
+            )
+        )
+        publish(session, "guild_settings", guild_id)
         session.commit()
     except Exception as e:
         session.rollback()
         raise e
     finally:
         session.close()
+        invalidate_guild_settings(guild_id)
 
 
 def get_guild_setting(guild_id: int, key: str, default=None):
     """Get a specific setting for a guild."""
-    settings = get_guild_settings(guild_id)
-    return settings.get(key, default)
+    return get_guild_settings(guild_id).get(key, default)
+
+
+def get_guilds_with_setting(key: str, value) -> List[int]:
+    """Get the IDs of every guild where a setting equals value (uses the key/value index)."""
+    session = Session()
+    try:
+        rows = session.scalars(
+            select(GuildSetting.guild_id).where(
+                GuildSetting.key == key, GuildSetting.value == json.dumps(value)
+            )
+        )
+        return [int(guild_id) for guild_id in rows]
+    finally:
+        session.close()
+
+
+def get_settings_for_keys(keys: List[str]) -> Dict[int, dict]:
+    """Get the given settings for every guild that has any of them, in one query."""
+    session = Session()
+    try:
+        rows = session.execute(
+            select(GuildSetting.guild_id, GuildSetting.key, GuildSetting.value).where(
+                GuildSetting.key.in_(keys)
+            )
+        )
+        settings = {}
+        for guild_id, key, value in rows:
+            if value is not None:
+                settings.setdefault(int(guild_id), {})[key] = json.loads(value)
+        return settings
+    finally:
+        session.close()
 
 
 def ensure_guild_exists(guild_id: int, guild_name: str = None):
@@ -57,7 +164,7 @@ def ensure_guild_exists(guild_id: int, guild_name: str = None):
     try:
         guild = session.get(Guild, str(guild_id))
         if not guild:
-            guild = Guild(guild_id=str(guild_id), name=guild_name, settings="{}")
+            guild = Guild(guild_id=str(guild_id), name=guild_name)
             session.add(guild)
             session.commit()
     except Exception as e:
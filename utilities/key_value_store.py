@@ -1,6 +1,11 @@
 from PatsBot.models import KeyValue
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select
+from typing import Dict, Iterable, Optional
+from utilities.cache_invalidation import publish, register
+from utilities.lru_cache import MISSING, LRUCache
+from utilities.upsert import dialect_insert
+import logging
 import os
 
 # Use the same DB URL logic as Alembic
@@ -8,28 +13,117 @@ DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
 engine = create_engine(DATABASE_URL, future=True)
 Session = sessionmaker(bind=engine)
 
+KV_CACHE_SIZE = int(os.environ.get("KV_CACHE_SIZE", "1024"))
+KV_CACHE_TTL = float(os.environ.get("KV_CACHE_TTL", "300"))  # Seconds
 
-def get_value(key: str) -> str:
+logger = logging.getLogger(__name__)
+
+_cache = LRUCache(KV_CACHE_SIZE, KV_CACHE_TTL)
+
+
+def _invalidate(key: Optional[str]):
+    if key is None:
+        _cache.clear()
+    else:
+        _cache.invalidate(key)
+
+
+# Other processes' writes
+register("kv", _invalidate)
+
+
+def get_value(key: str) -> Optional[str]:
     """Get a value from the key-value store."""
+    cached = _cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    generation = _cache.generation
     session = Session()
     try:
         kv = session.get(KeyValue, key)
-        return kv.value if kv else None
-    except:
+        value = kv.value if kv else None
+        _cache.put(key, value, generation)
+        return value
+    except Exception as e:
+        logger.error(f"Error reading key {key}: {e}")
         return None
     finally:
         session.close()
 
 
+def get_many(keys: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Get several values at once, fetching cache misses in a single query."""
+    values = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        cached = _cache.get(key)
+        if cached is MISSING:
+            missing.append(key)
+        else:
+            values[key] = cached
+
+    if not missing:
+        return values
+
+    generation = _cache.generation
+    session = Session()
+    try:
+        rows = dict(
+            session.execute(
+                select(KeyValue.key, KeyValue.value).where(KeyValue.key.in_(missing))
+            ).all()
+        )
+        for key in missing:
+            values[key] = rows.get(key)
+            _cache.put(key, values[key], generation)
+        return values
+    except Exception as e:
+        logger.error(f"Error reading {len(missing)} keys: {e}")
+        values.update({key: None for key in missing})
+        return values
+    finally:
+        session.close()
+
+
 def set_value(key: str, value: str):
     """Set a value in the key-value store."""
+    set_many({key: value})
+
+
+def set_many(values: Dict[str, Optional[str]]):
+    """Upsert several values in one statement."""
+    if not values:
+        return
+
     session = Session()
     try:
-        kv = KeyValue(key=key, value=value)
-        session.merge(kv)
+        stmt = dialect_insert(session.bind, KeyValue).values(
+            [{"key": key, "value": value} for key, value in values.items()]
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["key"], set_={"value": stmt.excluded.value}
+            )
+        )
+        for key in values:
+            publish(session, "kv", key)
         session.commit()
     except Exception as e:
         session.rollback()
         raise e
     finally:
         session.close()
+        # Drop cached copies even if the write failed, the DB is the source of truth
+        for key in values:
+            _cache.invalidate(key)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for the read-through cache."""
+    return _cache.stats()
+
+
+def clear_cache():
+    """Drop every cached entry (counters are kept)."""
+    _cache.clear()
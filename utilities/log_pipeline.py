@@ -0,0 +1,136 @@
+"""
+Non-blocking logging: records go on a queue and a background thread writes them
+"""
+
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+import colorlog
+
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "color").lower()  # "color" or "json"
+# Records per second each logger may emit (bursts up to LOG_RATE_BURST), 0 = no limit
+LOG_RATE_LIMIT = float(os.environ.get("LOG_RATE_LIMIT", "20"))
+LOG_RATE_BURST = float(os.environ.get("LOG_RATE_BURST", "100"))
+
+LOG_COLORS = {
+    "DEBUG": "cyan",
+    "INFO": "green",
+    "WARNING": "yellow",
+    "ERROR": "red",
+    "CRITICAL": "bold_red",
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitedQueueHandler(QueueHandler):
+    """
+    QueueHandler with a token bucket per logger. Records over the limit are
+    dropped before they are formatted or queued, and a count of what was
+    dropped is logged once the logger is allowed through again. ERROR and
+    CRITICAL records are never dropped.
+    """
+
+    def __init__(self, log_queue, rate: float, burst: float):
+        super().__init__(log_queue)
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # logger name -> [tokens, last refill, dropped]
+        self._buckets_lock = threading.Lock()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if self.rate > 0 and record.levelno < logging.ERROR:
+            dropped = self._take(record.name)
+            if dropped is None:
+                return False
+            if dropped:
+                self.enqueue(
+                    logging.LogRecord(
+                        record.name,
+                        logging.WARNING,
+                        record.pathname,
+                        record.lineno,
+                        "Rate limited, dropped %d log records",
+                        (dropped,),
+                        None,
+                    )
+                )
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the args now (they may change later), the listener thread
+        # does the formatting. Same process, so exc_info can stay as it is.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def _take(self, name: str):
+        """None if the record must be dropped, else how many were dropped before it."""
+        now = time.monotonic()
+        with self._buckets_lock:
+            bucket = self._buckets.setdefault(name, [self.burst, now, 0])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return None
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+            return dropped
+
+
+def output_handler() -> logging.Handler:
+    """The handler the background thread writes through."""
+    if LOG_FORMAT == "json":
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler = colorlog.StreamHandler()
+        handler.setFormatter(
+            colorlog.ColoredFormatter(
+                "%(log_color)s%(levelname)s:%(name)s: %(message)s",
+                log_colors=LOG_COLORS,
+            )
+        )
+    return handler
+
+
+def configure_logging(level: int) -> QueueListener:
+    """
+    Route the root logger through a queue. Returns the started listener,
+    which is also stopped (flushing what's left) at exit.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, output_handler(), respect_handler_level=True)
+    logging.basicConfig(
+        level=level,
+        handlers=[RateLimitedQueueHandler(log_queue, LOG_RATE_LIMIT, LOG_RATE_BURST)],
+        force=True,
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,76 @@
+"""
+Intents and member caching, with an opt-in lean mode for bots in many large guilds
+"""
+
+import asyncio
+import logging
+import os
+from typing import Iterable
+
+import discord
+
+# Only chunk/cache members for guilds a cog actually needs them in
+LEAN_MEMBER_CACHE = str(os.environ.get("LEAN_MEMBER_CACHE", "0")).lower() in (
+    "true",
+    "1",
+    "t",
+    "yes",
+)
+
+logger = logging.getLogger(__name__)
+
+# guild_id -> chunk in progress, so cogs asking for the same guild share it
+_chunking = {}
+
+
+def bot_options() -> dict:
+    """Intents and cache options for the Bot constructor."""
+    if not LEAN_MEMBER_CACHE:
+        intents = discord.Intents.default()
+        intents.message_content = True  # Required for command processing
+        intents.members = True  # Required for member join/listen
+        return {"intents": intents}
+
+    # Everything is an app command, so no message intents are needed.
+    # guilds: channels/roles for gatekeeper. members: joins, role updates, chunking
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True
+
+    # Keep joiners (welcome and gatekeeper look them up later), nothing for voice
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.joined = True
+
+    return {
+        "intents": intents,
+        "member_cache_flags": member_cache_flags,
+        "chunk_guilds_at_startup": False,  # Cogs chunk the guilds they need
+        "max_messages": None,  # No message events, no message cache
+    }
+
+
+async def ensure_chunked(bot, guild_ids: Iterable[int]) -> int:
+    """
+    Chunk the given guilds if they aren't already. Only does anything in lean
+    mode, otherwise discord.py chunked everything at startup. Returns how many
+    guilds were chunked.
+    """
+    if not LEAN_MEMBER_CACHE:
+        return 0
+
+    chunked = 0
+    for guild_id in guild_ids:
+        guild = bot.get_guild(guild_id)
+        if guild is None or guild.chunked:
+            continue
+        task = _chunking.get(guild_id)
+        if task is None:
+            task = _chunking[guild_id] = asyncio.create_task(guild.chunk(cache=True))
+            task.add_done_callback(lambda _, guild_id=guild_id: _chunking.pop(guild_id))
+        try:
+            await asyncio.shield(task)
+            chunked += 1
+            logger.info(f"Chunked {guild.member_count} members of {guild.name}")
+        except Exception as e:
+            logger.error(f"Failed to chunk guild {guild_id}: {e}")
+    return chunked
@@ -0,0 +1,390 @@
+"""
+Transactional outbox for gatekeeper side effects (DMs, kicks, admin posts)
+
+Entries are enqueued in the same transaction as the state change that caused
+them, deduplicated by an idempotency key, and delivered by OutboxDispatcher
+workers. A claimed entry is leased (available_at doubles as the lease expiry),
+renewed while its handler runs, so entries from a crashed process are picked
+up again once the lease runs out.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import Session as SessionType
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import OutboxMessage
+from utilities.clock import Clock, SYSTEM_CLOCK
+from utilities.upsert import dialect_insert
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETENTION = datetime.timedelta(
+    days=int(os.environ.get("OUTBOX_RETENTION_DAYS", "7"))
+)
+CLAIM_DURATION = datetime.timedelta(minutes=2)  # Lease on a claimed entry
+RENEW_SECONDS = 30  # How often a running handler's lease is renewed
+POLL_SECONDS = 2  # How often run() looks for work nobody woke it up for
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class Outcome(NamedTuple):
+    """What a handler did with an entry."""
+
+    sent: bool  # False marks the entry failed without retrying
+    result: Optional[str] = None  # e.g. the Discord message ID
+    error: Optional[str] = None
+    # DB follow ups (state changes, more entries) run on the session that marks
+    # the entry done, so they commit together. May call one RemovalWorkflow
+    # method, whose commit covers both.
+    apply: Optional[Callable[[SessionType], None]] = None
+
+
+# handler(entry) -> Outcome; raising means "try again later"
+Handler = Callable[[dict], Awaitable[Outcome]]
+
+
+def outbox_entry(
+    key: str,
+    guild_id,
+    kind: str,
+    payload: dict,
+    user_id=None,
+) -> dict:
+    """Build an entry for enqueue(). `key` must be unique per intended action."""
+    return {
+        "idempotency_key": key,
+        "guild_id": str(guild_id),
+        "user_id": str(user_id) if user_id is not None else None,
+        "kind": kind,
+        "payload": json.dumps(payload),
+    }
+
+
+def enqueue(
+    session: SessionType, entries: Iterable[dict], clock: Clock = SYSTEM_CLOCK
+) -> None:
+    """
+    Add entries in the caller's transaction; nothing is sent until it commits.
+    Entries whose idempotency key already exists are skipped.
+    """
+    now = clock.now()
+    rows = [
+        {
+            **entry,
+            "status": PENDING,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+        }
+        for entry in entries
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(session.get_bind(), OutboxMessage).values(rows)
+    session.execute(stmt.on_conflict_do_nothing(index_elements=["idempotency_key"]))
+
+
+def claim_batch(limit: int, clock: Clock = SYSTEM_CLOCK) -> List[dict]:
+    """Lease up to `limit` due entries, oldest first. Safe across processes."""
+    now = clock.now()
+    token = uuid.uuid4().hex
+    due = (
+        OutboxMessage.status.in_([PENDING, SENDING]),
+        OutboxMessage.available_at <= now,
+    )
+    session = Session()
+    try:
+        ids = session.scalars(
+            select(OutboxMessage.id).where(*due).order_by(OutboxMessage.id).limit(limit)
+        ).all()
+        if not ids:
+            return []
+        # Re-check due-ness in the UPDATE, so a concurrent claimer wins cleanly
+        session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids), *due)
+            .values(
+                status=SENDING,
+                claimed_by=token,
+                available_at=now + CLAIM_DURATION,
+                attempts=OutboxMessage.attempts + 1,
+            )
+        )
+        session.commit()
+        claimed = session.scalars(
+            select(OutboxMessage)
+            .where(OutboxMessage.claimed_by == token)
+            .order_by(OutboxMessage.id)
+        ).all()
+        return [
+            {
+                "id": row.id,
+                "token": token,
+                "idempotency_key": row.idempotency_key,
+                "guild_id": row.guild_id,
+                "user_id": row.user_id,
+                "kind": row.kind,
+                "payload": json.loads(row.payload),
+                "attempts": row.attempts,
+            }
+            for row in claimed
+        ]
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def finish(entry: dict, outcome: Outcome, clock: Clock = SYSTEM_CLOCK) -> bool:
+    """
+    Mark a claimed entry sent/failed and apply its follow ups in one
+    transaction. Returns False if our lease was lost to another worker.
+    """
+    session = Session()
+    try:
+        result = session.execute(
+            update(OutboxMessage)
+            .where(
+                OutboxMessage.id == entry["id"],
+                OutboxMessage.claimed_by == entry["token"],
+            )
+            .values(
+                status=SENT if outcome.sent else FAILED,
+                finished_at=clock.now(),
+                result=outcome.result,
+                last_error=outcome.error,
+            )
+        )
+        if result.rowcount == 0:
+            session.rollback()
+            return False
+        if outcome.apply:
+            outcome.apply(session)
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def renew(entry: dict, clock: Clock = SYSTEM_CLOCK) -> bool:
+    """Extend a claimed entry's lease. Returns False if it was lost."""
+    session = Session()
+    try:
+        result = session.execute(
+            update(OutboxMessage)
+            .where(
+                OutboxMessage.id == entry["id"],
+                OutboxMessage.claimed_by == entry["token"],
+            )
+            .values(available_at=clock.now() + CLAIM_DURATION)
+        )
+        session.commit()
+        return result.rowcount > 0
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def retry_later(entry: dict, error: str, clock: Clock = SYSTEM_CLOCK) -> None:
+    """Release a claimed entry to be retried with exponential backoff."""
+    delay = datetime.timedelta(seconds=min(30 * 2 ** (entry["attempts"] - 1), 3600))
+    session = Session()
+    try:
+        session.execute(
+            update(OutboxMessage)
+            .where(
+                OutboxMessage.id == entry["id"],
+                OutboxMessage.claimed_by == entry["token"],
+            )
+            .values(
+                status=PENDING,
+                available_at=clock.now() + delay,
+                last_error=error,
+            )
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+def prune(clock: Clock = SYSTEM_CLOCK) -> int:
+    """Delete entries finished longer than OUTBOX_RETENTION ago."""
+    session = Session()
+    try:
+        result = session.execute(
+            delete(OutboxMessage).where(
+                OutboxMessage.status.in_([SENT, FAILED]),
+                OutboxMessage.finished_at < clock.now() - OUTBOX_RETENTION,
+            )
+        )
+        session.commit()
+        return result.rowcount
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+
+class OutboxDispatcher:
+    """Drains the outbox with a bounded pool of concurrent workers."""
+
+    def __init__(
+        self,
+        handlers: Dict[str, Handler],
+        clock: Clock = SYSTEM_CLOCK,
+        workers: int = OUTBOX_WORKERS,
+        on_give_up: Optional[
+            Callable[[dict, str], Optional[Callable[[SessionType], None]]]
+        ] = None,
+    ):
+        self.handlers = handlers
+        self.clock = clock
+        self.workers = workers
+        # on_give_up(entry, error) -> Outcome.apply for entries out of attempts
+        self.on_give_up = on_give_up
+        self.logger = logging.getLogger(__name__)
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def wake(self):
+        """Tell run() there is new work, instead of waiting for the next poll."""
+        self._wake.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def run(self):
+        last_prune = None
+        while True:
+            try:
+                await self.drain()
+                now = self.clock.now()
+                if last_prune is None or now - last_prune > datetime.timedelta(hours=1):
+                    last_prune = now
+                    pruned = await asyncio.to_thread(prune, self.clock)
+                    if pruned:
+                        self.logger.debug(f"Pruned {pruned} finished outbox entries")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Error draining outbox: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> int:
+        """
+        Deliver everything currently due. Each worker claims its next entry
+        when it's free, so a slow send doesn't hold up (or sit on the leases
+        of) a whole batch. Returns how many entries were handled.
+        """
+        handled = 0
+
+        async def work():
+            nonlocal handled
+            while True:
+                claimed = await asyncio.to_thread(claim_batch, 1, self.clock)
+                if not claimed:
+                    return
+                await self.deliver(claimed[0])
+                handled += 1
+
+        await asyncio.gather(*(work() for _ in range(self.workers)))
+        return handled
+
+    async def call_handler(self, handler: Handler, entry: dict) -> Optional[Outcome]:
+        """Run a handler, renewing the entry's lease meanwhile. None if it was lost."""
+        work = asyncio.create_task(handler(entry))
+        try:
+            while True:
+                done, _ = await asyncio.wait({work}, timeout=RENEW_SECONDS)
+                if done:
+                    return work.result()
+                try:
+                    held = await asyncio.to_thread(renew, entry, self.clock)
+                except Exception as e:
+                    # The lease has some slack, try again next time
+                    self.logger.error("Error renewing outbox lease: %s", e)
+                    continue
+                if not held:
+                    work.cancel()  # Another worker has it now
+                    return None
+        except asyncio.CancelledError:
+            work.cancel()
+            raise
+
+    async def deliver(self, entry: dict):
+        handler = self.handlers.get(entry["kind"])
+        try:
+            if handler is None:
+                outcome = Outcome(sent=False, error=f"No handler for {entry['kind']}")
+            else:
+                outcome = await self.call_handler(handler, entry)
+                if outcome is None:
+                    self.logger.warning(
+                        "Lost lease on outbox entry %s", entry["idempotency_key"]
+                    )
+                    return
+        except Exception as e:
+            self.logger.warning(
+                "Outbox entry %s failed (attempt %d): %s",
+                entry["idempotency_key"],
+                entry["attempts"],
+                e,
+            )
+            if entry["attempts"] < OUTBOX_MAX_ATTEMPTS:
+                try:
+                    await asyncio.to_thread(retry_later, entry, str(e), self.clock)
+                except Exception as db_error:
+                    # The lease will expire and the entry gets retried anyway
+                    self.logger.error("Error releasing outbox entry: %s", db_error)
+                return
+            outcome = Outcome(
+                sent=False,
+                error=str(e),
+                apply=self.on_give_up(entry, str(e)) if self.on_give_up else None,
+            )
+
+        try:
+            if not await asyncio.to_thread(finish, entry, outcome, self.clock):
+                self.logger.warning(
+                    "Lost lease on outbox entry %s", entry["idempotency_key"]
+                )
+        except Exception as e:
+            self.logger.error(
+                "Error finishing outbox entry %s: %s", entry["idempotency_key"], e
+            )
@@ -0,0 +1,98 @@
+"""
+Button driven paging for keyset paginated queries
+"""
+
+import asyncio
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import discord
+
+# fetch_page(cursor) -> (rows, next_cursor); next_cursor is None on the last page
+FetchPage = Callable[[Optional[object]], Tuple[List, Optional[object]]]
+# render(rows, page_number) -> embed for that page
+RenderPage = Callable[[List, int], discord.Embed]
+
+
+class KeysetPaginator(discord.ui.View):
+    """
+    Previous/next buttons over a keyset paginated query. Only the cursors of
+    pages already seen are kept, so paging deep stays one indexed query per
+    page. fetch_page is blocking and runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        fetch_page: FetchPage,
+        render: RenderPage,
+        author_id: int,
+        timeout: float = 300,
+    ):
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        self.render = render
+        self.author_id = author_id
+        self.logger = logging.getLogger(__name__)
+        self.cursors = [None]  # Cursor used to load each page seen so far
+        self.page = 0
+        self.next_cursor = None
+        self.rows = []
+
+    async def load(self) -> discord.Embed:
+        self.rows, self.next_cursor = await asyncio.to_thread(
+            self.fetch_page, self.cursors[self.page]
+        )
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.next_cursor is None
+        return self.render(self.rows, self.page + 1)
+
+    async def start(self, interaction: discord.Interaction, ephemeral: bool = True):
+        """Send the first page as the response to `interaction`."""
+        embed = await self.load()
+        if self.next_cursor is None and self.page == 0:
+            # Single page, no need for buttons
+            await interaction.response.send_message(embed=embed, ephemeral=ephemeral)
+            self.stop()
+            return
+        await interaction.response.send_message(
+            embed=embed, view=self, ephemeral=ephemeral
+        )
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "Only the person who ran the command can page through it.",
+                ephemeral=True,
+            )
+            return False
+        return True
+
+    async def show(self, interaction: discord.Interaction):
+        try:
+            embed = await self.load()
+        except Exception as e:
+            self.logger.error(f"Error loading page {self.page + 1}: {e}")
+            await interaction.response.send_message(
+                "Error loading that page. Please try again.", ephemeral=True
+            )
+            return
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.page = max(self.page - 1, 0)
+        await self.show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        if self.next_cursor is None:
+            await interaction.response.defer()
+            return
+        self.page += 1
+        del self.cursors[self.page :]
+        self.cursors.append(self.next_cursor)
+        await self.show(interaction)
@@ -0,0 +1,156 @@
+"""
+Per-day projection of first warnings, final notices and removals for a guild
+"""
+
+import datetime
+import os
+from typing import Dict, List
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Integer,
+    and_,
+    bindparam,
+    case,
+    cast,
+    create_engine,
+    extract,
+    func,
+    literal,
+    select,
+    union_all,
+)
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import RemovalStatus, TrackedUser
+from utilities.clock import Clock, SYSTEM_CLOCK
+from utilities.removal_workflow import RemovalWorkflow
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+STAGES = ["first_warning", "final_notice", "removal"]
+DAY = 86400.0
+
+
+def seconds_from(column, now, dialect: str):
+    """Seconds from `now` to a DateTime column, negative in the past."""
+    if dialect == "postgresql":
+        return extract("epoch", column - now)
+    # SQLite stores DateTime as text, julianday() parses it
+    return (func.julianday(column) - func.julianday(now)) * DAY
+
+
+def day_offset(seconds, dialect: str):
+    """Whole days from now for a non negative number of seconds."""
+    if dialect == "postgresql":
+        return cast(func.floor(seconds / DAY), Integer)
+    # CAST truncates, same as floor for non negative values
+    return cast(seconds / DAY, Integer)
+
+
+def _later(a, b):
+    """Portable GREATEST() of two expressions."""
+    return case((a > b, a), else_=b)
+
+
+def get_forecast(
+    guild_id: str,
+    days: int,
+    grace_period: datetime.timedelta,
+    clock: Clock = SYSTEM_CLOCK,
+    what_if: bool = False,
+) -> Dict[str, List[int]]:
+    """
+    Project `days` days of gatekeeper actions for a guild, assuming nobody
+    verifies from now on. Returns {stage: [count for day 0, day 1, ...]}.
+
+    Users already in the removal process follow their removal_date. ACTIVE
+    users get marked (and warned) once their grace period ends: only those
+    still inside it normally, since older ACTIVE users already passed the
+    role check, but all of them with `what_if` (gatekeeper enabled now).
+    """
+    session = Session()
+    try:
+        dialect = session.get_bind().dialect.name
+        now = bindparam("now", clock.now(), type_=DateTime)
+        zero = literal(0.0, Float)
+
+        removal = seconds_from(TrackedUser.removal_date, now, dialect)
+        final_window = RemovalWorkflow.FINAL_NOTICE_DURATION.total_seconds()
+        warning_window = RemovalWorkflow.FIRST_WARNING_DURATION.total_seconds()
+        in_guild = (
+            TrackedUser.guild_id == str(guild_id),
+            TrackedUser.departed_at.is_(None),
+        )
+
+        # ACTIVE: marked and warned when the grace period ends (or right away)
+        grace_ends = (
+            seconds_from(TrackedUser.joined_at, now, dialect)
+            + grace_period.total_seconds()
+        )
+        marked = _later(grace_ends, zero)
+        active = and_(*in_guild, TrackedUser.removal_status == RemovalStatus.ACTIVE)
+        if not what_if:
+            active = and_(active, grace_ends > 0)
+
+        # PENDING_REMOVAL: warned on the next tick, unless backing off
+        pending = and_(
+            *in_guild,
+            TrackedUser.removal_status == RemovalStatus.PENDING_REMOVAL,
+            TrackedUser.removal_date.isnot(None),
+        )
+        warned = _later(
+            func.coalesce(seconds_from(TrackedUser.next_attempt_at, now, dialect), 0),
+            zero,
+        )
+
+        warned_users = and_(
+            *in_guild,
+            TrackedUser.removal_status == RemovalStatus.FIRST_WARNING_SENT,
+            TrackedUser.removal_date.isnot(None),
+        )
+        noticed_users = and_(
+            *in_guild,
+            TrackedUser.removal_status == RemovalStatus.FINAL_NOTICE_SENT,
+            TrackedUser.removal_date.isnot(None),
+        )
+
+        def event(stage, seconds, criteria):
+            return select(
+                literal(stage).label("stage"), seconds.label("seconds")
+            ).where(criteria)
+
+        events = union_all(
+            event("first_warning", marked, active),
+            event("final_notice", marked + (warning_window - final_window), active),
+            event("removal", marked + warning_window, active),
+            event("first_warning", warned, pending),
+            event(
+                "final_notice",
+                _later(removal - final_window, warned),
+                and_(pending, warned < removal),
+            ),
+            event("removal", _later(removal, warned), pending),
+            event("final_notice", _later(removal - final_window, zero), warned_users),
+            event("removal", _later(removal, zero), warned_users),
+            event("removal", _later(removal, zero), noticed_users),
+        ).subquery()
+
+        day = day_offset(events.c.seconds, dialect).label("day")
+        rows = session.execute(
+            select(events.c.stage, day, func.count())
+            .where(events.c.seconds < days * DAY)
+            .group_by(events.c.stage, day)
+        ).all()
+    finally:
+        session.close()
+
+    forecast = {stage: [0] * days for stage in STAGES}
+    for stage, offset, count in rows:
+        if 0 <= offset < days:
+            forecast[stage][offset] += count
+    return forecast
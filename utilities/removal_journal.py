@@ -0,0 +1,117 @@
+"""
+Append-only journal of removal status transitions, written in batches
+"""
+
+import datetime
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from sqlalchemy import create_engine, insert, select, tuple_
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import RemovalStatus, RemovalTransition
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+# Cursor for keyset paging: (occurred_at, id) of the last row on a page
+HistoryCursor = Tuple[datetime.datetime, int]
+
+
+class RemovalJournal:
+    """Buffers transitions in memory; flush() appends them in one INSERT."""
+
+    def __init__(self):
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()  # flush() runs in a worker thread
+
+    def record(
+        self,
+        user_id: str,
+        guild_id: str,
+        from_status: Optional[RemovalStatus],
+        to_status: RemovalStatus,
+        occurred_at: datetime.datetime,
+        message_id: Optional[str] = None,
+        actor: str = "gatekeeper",
+    ):
+        """Queue one transition. Cheap, safe to call on the hot path."""
+        with self._lock:
+            self._pending.append(
+                {
+                    "user_id": str(user_id),
+                    "guild_id": str(guild_id),
+                    "from_status": from_status,
+                    "to_status": to_status,
+                    "occurred_at": occurred_at,
+                    "message_id": message_id,
+                    "actor": actor,
+                }
+            )
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write buffered transitions. Returns how many rows were appended."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        session = Session()
+        try:
+            session.execute(insert(RemovalTransition), pending)
+            session.commit()
+            return len(pending)
+        except Exception as e:
+            session.rollback()
+            # Keep them (in order) so the next flush retries
+            with self._lock:
+                self._pending[:0] = pending
+            raise e
+        finally:
+            session.close()
+
+
+# Shared by RemovalWorkflow and whatever flushes it (the gatekeeper cog)
+JOURNAL = RemovalJournal()
+
+
+def get_history(
+    guild_id: str,
+    user_id: Optional[str] = None,
+    before: Optional[HistoryCursor] = None,
+    limit: int = 10,
+) -> Tuple[List[RemovalTransition], Optional[HistoryCursor]]:
+    """
+    One page of transitions, newest first. Pass the returned cursor as `before`
+    to get the next page; it is None on the last page.
+    """
+    stmt = select(RemovalTransition).where(RemovalTransition.guild_id == str(guild_id))
+    if user_id is not None:
+        stmt = stmt.where(RemovalTransition.user_id == str(user_id))
+    if before is not None:
+        stmt = stmt.where(
+            tuple_(RemovalTransition.occurred_at, RemovalTransition.id)
+            < tuple_(*before)
+        )
+    stmt = stmt.order_by(
+        RemovalTransition.occurred_at.desc(), RemovalTransition.id.desc()
+    ).limit(limit + 1)
+
+    session = Session()
+    try:
+        rows = session.scalars(stmt).all()
+        session.expunge_all()
+    finally:
+        session.close()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1].occurred_at, rows[-1].id)
+    return rows, None
@@ -3,9 +3,24 @@ Removal workflow utilities for managing user removal process
 """
 
 import datetime
-from typing import Optional, List
+import os
+from typing import Iterator, Optional, List, Sequence, Tuple
+from sqlalchemy import or_, select, tuple_, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from PatsBot.models import TrackedUser, RemovalStatus
+from PatsBot.models import OutboxMessage, TrackedUser, RemovalStatus
+from utilities.clock import Clock, SYSTEM_CLOCK
+from utilities.removal_journal import JOURNAL
+from utilities.outbox import FAILED, PENDING, SENDING, enqueue
+
+# Rows per query when the removal loop scans a guild
+SCAN_CHUNK_SIZE = int(os.environ.get("REMOVAL_SCAN_CHUNK_SIZE", "500"))
+
+# First warning retry delay after a refused DM, doubling with each failure
+RETRY_BACKOFF_BASE = datetime.timedelta(
+    minutes=int(os.environ.get("DM_RETRY_BACKOFF_MINUTES", "60"))
+)
+RETRY_BACKOFF_MAX = datetime.timedelta(days=1)
 
 
 class RemovalWorkflow:
@@ -15,12 +30,78 @@ class RemovalWorkflow:
     FIRST_WARNING_DURATION = datetime.timedelta(days=7)  # 1 week warning
     FINAL_NOTICE_DURATION = datetime.timedelta(days=2)  # 2 days final notice
 
+    @staticmethod
+    def _journal(
+        user_id: str,
+        guild_id: str,
+        from_status: Optional[RemovalStatus],
+        to_status: RemovalStatus,
+        occurred_at: datetime.datetime,
+        message_id: Optional[str] = None,
+        actor: str = "gatekeeper",
+    ) -> None:
+        """Queue a transition for the journal, call after the state change commits"""
+        if from_status != to_status:
+            JOURNAL.record(
+                user_id,
+                guild_id,
+                from_status,
+                to_status,
+                occurred_at,
+                message_id=message_id,
+                actor=actor,
+            )
+
+    @staticmethod
+    def _get(session: Session, user_id: str, guild_id: str) -> Optional[TrackedUser]:
+        """A user's membership row in one guild"""
+        return session.get(TrackedUser, {"guild_id": guild_id, "user_id": user_id})
+
+    @staticmethod
+    def _clear_removal_fields(user: TrackedUser) -> None:
+        """Forget any removal in progress (caller sets the new status)"""
+        user.removal_date = None
+        user.first_warning_sent_at = None
+        user.final_notice_sent_at = None
+        user.removed_at = None
+        user.first_warning_message_id = None
+        user.final_notice_message_id = None
+        user.removal_message_id = None
+        user.bot_retries = 0
+        user.next_attempt_at = None
+
     @staticmethod
     def mark_user_for_removal(
-        session: Session, user_id: str, guild_id: str
-    ) -> TrackedUser:
-        """Mark a user for removal and set the removal date"""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        clock: Clock = SYSTEM_CLOCK,
+        actor: str = "gatekeeper",
+        outbox: Sequence[dict] = (),
+        removal_date: Optional[datetime.datetime] = None,
+        only_from: Optional[RemovalStatus] = None,
+    ) -> Optional[TrackedUser]:
+        """
+        Mark a user for removal and set the removal date. `outbox` entries are
+        enqueued in the same transaction (likewise for the other mark_* methods).
+        With `only_from`, the row is locked and nothing happens (returns None)
+        unless the user is still in that status, e.g. a peer got there first.
+        """
+        if only_from is not None:
+            user = session.get(
+                TrackedUser,
+                {"guild_id": guild_id, "user_id": user_id},
+                with_for_update=True,
+                populate_existing=True,
+            )
+            if not user or user.removal_status != only_from:
+                session.rollback()
+                return None
+        else:
+            user = RemovalWorkflow._get(session, user_id, guild_id)
+        from_status = user.removal_status if user else None
+        now = clock.now()
+        removal_date = removal_date or now + RemovalWorkflow.FIRST_WARNING_DURATION
 
         if not user:
             # Create new tracked user
@@ -28,142 +109,418 @@ class RemovalWorkflow:
                 user_id=user_id,
                 guild_id=guild_id,
                 removal_status=RemovalStatus.PENDING_REMOVAL,
-                removal_date=datetime.datetime.utcnow()
-                + RemovalWorkflow.FIRST_WARNING_DURATION,
+                removal_date=removal_date,
             )
             session.add(user)
         else:
             # Update existing user
-            user.guild_id = guild_id
+            RemovalWorkflow._clear_removal_fields(user)
             user.removal_status = RemovalStatus.PENDING_REMOVAL
-            user.removal_date = (
-                datetime.datetime.utcnow() + RemovalWorkflow.FIRST_WARNING_DURATION
-            )
-            user.first_warning_sent_at = None
-            user.final_notice_sent_at = None
-            user.removed_at = None
-            user.first_warning_message_id = None
-            user.final_notice_message_id = None
-            user.removal_message_id = None
-            user.bot_retries = 0
+            user.removal_date = removal_date
 
+        enqueue(session, outbox, clock)
         session.commit()
+        RemovalWorkflow._journal(
+            user_id,
+            guild_id,
+            from_status,
+            RemovalStatus.PENDING_REMOVAL,
+            now,
+            actor=actor,
+        )
         return user
 
+    @staticmethod
+    def iter_tracked_users(
+        session: Session,
+        columns: list,
+        *criteria,
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[Row]:
+        """
+        Yield (user_id, *columns) rows matching `criteria`, in user_id order.
+        Each chunk is its own short keyset query on a fresh connection, so
+        memory stays flat and no read transaction stays open while the caller
+        commits updates or yields to the event loop. Rows the caller updates
+        are already behind the cursor, so they are never seen twice.
+        """
+        chunk_size = chunk_size or SCAN_CHUNK_SIZE
+        stmt = select(TrackedUser.user_id, *columns).where(*criteria)
+        last_user_id = None
+        while True:
+            chunk_stmt = stmt
+            if last_user_id is not None:
+                chunk_stmt = chunk_stmt.where(TrackedUser.user_id > last_user_id)
+            with session.get_bind().connect() as connection:
+                rows = connection.execute(
+                    chunk_stmt.order_by(TrackedUser.user_id).limit(chunk_size)
+                ).all()
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last_user_id = rows[-1].user_id
+
     @staticmethod
     def get_users_needing_first_warning(
-        session: Session, guild_id: str
-    ) -> List[TrackedUser]:
-        """Get users who need their first warning sent"""
-        return (
-            session.query(TrackedUser)
-            .filter(
-                TrackedUser.guild_id == guild_id,
-                TrackedUser.removal_status == RemovalStatus.PENDING_REMOVAL,
-            )
-            .all()
+        session: Session, guild_id: str, clock: Clock = SYSTEM_CLOCK
+    ) -> Iterator[Row]:
+        """Get users who need their first warning sent, skipping ones backing off"""
+        return RemovalWorkflow.iter_tracked_users(
+            session,
+            [TrackedUser.removal_date, TrackedUser.bot_retries],
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status == RemovalStatus.PENDING_REMOVAL,
+            or_(
+                TrackedUser.next_attempt_at.is_(None),
+                TrackedUser.next_attempt_at <= clock.now(),
+            ),
         )
 
     @staticmethod
     def get_users_needing_final_notice(
-        session: Session, guild_id: str
-    ) -> List[TrackedUser]:
+        session: Session, guild_id: str, clock: Clock = SYSTEM_CLOCK
+    ) -> Iterator[Row]:
         """Get users who need their final notice sent (within 2 days of removal)"""
 
-        now = datetime.datetime.utcnow()
-        return (
-            session.query(TrackedUser)
-            .filter(
-                TrackedUser.guild_id == guild_id,
-                TrackedUser.removal_status == RemovalStatus.FIRST_WARNING_SENT,
-                TrackedUser.removal_date - RemovalWorkflow.FINAL_NOTICE_DURATION <= now,
-                TrackedUser.removal_date > now,
-            )
-            .all()
+        now = clock.now()
+        return RemovalWorkflow.iter_tracked_users(
+            session,
+            [TrackedUser.removal_date],
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status == RemovalStatus.FIRST_WARNING_SENT,
+            # Shift now rather than the column, SQLite can't subtract intervals
+            TrackedUser.removal_date <= now + RemovalWorkflow.FINAL_NOTICE_DURATION,
+            TrackedUser.removal_date > now,
         )
 
     @staticmethod
     def get_users_ready_for_removal(
-        session: Session, guild_id: str
-    ) -> List[TrackedUser]:
+        session: Session, guild_id: str, clock: Clock = SYSTEM_CLOCK
+    ) -> Iterator[Row]:
         """Get users who are ready to be removed (past their removal date)"""
-        now = datetime.datetime.utcnow()
-
-        return (
-            session.query(TrackedUser)
-            .filter(
-                TrackedUser.guild_id == guild_id,
-                TrackedUser.removal_status.in_(
-                    [RemovalStatus.FIRST_WARNING_SENT, RemovalStatus.FINAL_NOTICE_SENT]
-                ),
-                TrackedUser.removal_date <= now,
+        now = clock.now()
+
+        return RemovalWorkflow.iter_tracked_users(
+            session,
+            [TrackedUser.removal_date],
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status.in_(
+                [RemovalStatus.FIRST_WARNING_SENT, RemovalStatus.FINAL_NOTICE_SENT]
+            ),
+            TrackedUser.removal_date <= now,
+        )
+
+    @staticmethod
+    def get_flagged_users(session: Session, guild_id: str) -> Iterator[Row]:
+        """Get users anywhere in the removal process (not ACTIVE)"""
+        return RemovalWorkflow.iter_tracked_users(
+            session,
+            [],
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status != RemovalStatus.ACTIVE,
+        )
+
+    @staticmethod
+    def get_active_users(session: Session, guild_id: str) -> Iterator[Row]:
+        """Get ACTIVE users with their join time, to check the grace period"""
+        return RemovalWorkflow.iter_tracked_users(
+            session,
+            [TrackedUser.joined_at],
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status == RemovalStatus.ACTIVE,
+        )
+
+    @staticmethod
+    def mark_many_departed(
+        session: Session,
+        user_ids: Sequence[str],
+        guild_id: str,
+        clock: Clock = SYSTEM_CLOCK,
+    ) -> int:
+        """
+        Users left the guild (or were kicked). Departed users are skipped by
+        the removal loop and archived later. One UPDATE per chunk of
+        SCAN_CHUNK_SIZE IDs, returns how many tracked users were marked.
+        """
+        now = clock.now()
+        user_ids = list(user_ids)
+        departed = 0
+        for start in range(0, len(user_ids), SCAN_CHUNK_SIZE):
+            result = session.execute(
+                update(TrackedUser)
+                .where(
+                    TrackedUser.user_id.in_(user_ids[start : start + SCAN_CHUNK_SIZE]),
+                    TrackedUser.guild_id == guild_id,
+                    TrackedUser.departed_at.is_(None),
+                )
+                .values(departed_at=now)
             )
-            .all()
+            departed += result.rowcount
+        session.commit()
+        return departed
+
+    @staticmethod
+    def mark_guild_departed(
+        session: Session, guild_id: str, clock: Clock = SYSTEM_CLOCK
+    ) -> int:
+        """The bot left a guild: every user tracked there counts as departed."""
+        result = session.execute(
+            update(TrackedUser)
+            .where(TrackedUser.guild_id == guild_id, TrackedUser.departed_at.is_(None))
+            .values(departed_at=clock.now())
         )
+        session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def mark_rejoined(
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        joined_at: datetime.datetime,
+        clock: Clock = SYSTEM_CLOCK,
+    ) -> None:
+        """
+        A departed user came back before being archived. Removed users start
+        over as ACTIVE with a new grace period, anyone else picks up where
+        they left off.
+        """
+        user = RemovalWorkflow._get(session, user_id, guild_id)
+        if not user:
+            return
+        from_status = user.removal_status
+        user.joined_at = joined_at
+        user.departed_at = None
+        if from_status == RemovalStatus.REMOVED:
+            RemovalWorkflow._clear_removal_fields(user)
+            user.removal_status = RemovalStatus.ACTIVE
+        to_status = user.removal_status
+        session.commit()
+        RemovalWorkflow._journal(user_id, guild_id, from_status, to_status, clock.now())
 
     @staticmethod
     def mark_first_warning_sent(
-        session: Session, user_id: str, message_id: str
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        message_id: Optional[str],
+        clock: Clock = SYSTEM_CLOCK,
+        outbox: Sequence[dict] = (),
     ) -> None:
         """Mark that the first warning has been sent to a user"""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = RemovalWorkflow._get(session, user_id, guild_id)
         if user:
+            from_status, now = user.removal_status, clock.now()
             user.removal_status = RemovalStatus.FIRST_WARNING_SENT
-            user.first_warning_sent_at = datetime.datetime.utcnow()
+            user.first_warning_sent_at = now
             user.first_warning_message_id = message_id
-            user.bot_retries = 0  # Reset retry count on successful send
+            enqueue(session, outbox, clock)
             session.commit()
+            RemovalWorkflow._journal(
+                user_id,
+                guild_id,
+                from_status,
+                RemovalStatus.FIRST_WARNING_SENT,
+                now,
+                message_id,
+            )
 
     @staticmethod
-    def mark_final_notice_sent(session: Session, user_id: str, message_id: str) -> None:
+    def mark_final_notice_sent(
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        message_id: Optional[str],
+        clock: Clock = SYSTEM_CLOCK,
+        outbox: Sequence[dict] = (),
+    ) -> None:
         """Mark that the final notice has been sent to a user"""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = RemovalWorkflow._get(session, user_id, guild_id)
         if user:
+            from_status, now = user.removal_status, clock.now()
             user.removal_status = RemovalStatus.FINAL_NOTICE_SENT
-            user.final_notice_sent_at = datetime.datetime.utcnow()
+            user.final_notice_sent_at = now
             user.final_notice_message_id = message_id
+            enqueue(session, outbox, clock)
             session.commit()
+            RemovalWorkflow._journal(
+                user_id,
+                guild_id,
+                from_status,
+                RemovalStatus.FINAL_NOTICE_SENT,
+                now,
+                message_id,
+            )
 
     @staticmethod
-    def mark_user_removed(session: Session, user_id: str, message_id: str) -> None:
+    def mark_user_removed(
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        message_id: Optional[str],
+        clock: Clock = SYSTEM_CLOCK,
+        outbox: Sequence[dict] = (),
+    ) -> None:
         """Mark that a user has been removed from the guild"""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = RemovalWorkflow._get(session, user_id, guild_id)
         if user:
+            from_status, now = user.removal_status, clock.now()
             user.removal_status = RemovalStatus.REMOVED
-            user.removed_at = datetime.datetime.utcnow()
+            user.removed_at = now
             user.removal_message_id = message_id
+            enqueue(session, outbox, clock)
             session.commit()
+            RemovalWorkflow._journal(
+                user_id, guild_id, from_status, RemovalStatus.REMOVED, now, message_id
+            )
 
     @staticmethod
-    def reset_user_status(session: Session, user_id: str) -> None:
-        """Reset a user's status to active (when they verify)"""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+    def reset_user_status(
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        clock: Clock = SYSTEM_CLOCK,
+        actor: str = "gatekeeper",
+        outbox: Sequence[dict] = (),
+    ) -> None:
+        """
+        Reset a user's status to active (when they verify). Their undelivered
+        outbox entries are failed in the same transaction, so no DM or kick
+        from the old removal goes out late.
+        """
+        user = RemovalWorkflow._get(session, user_id, guild_id)
         if user:
+            from_status = user.removal_status
+            RemovalWorkflow._clear_removal_fields(user)
             user.removal_status = RemovalStatus.ACTIVE
-            user.removal_date = None
-            user.first_warning_sent_at = None
-            user.final_notice_sent_at = None
-            user.removed_at = None
-            user.first_warning_message_id = None
-            user.final_notice_message_id = None
-            user.removal_message_id = None
-            user.bot_retries = 0
+            # Clearing claimed_by also makes a worker mid-send lose its lease
+            session.execute(
+                update(OutboxMessage)
+                .where(
+                    OutboxMessage.guild_id == guild_id,
+                    OutboxMessage.user_id == user_id,
+                    OutboxMessage.status.in_([PENDING, SENDING]),
+                )
+                .values(
+                    status=FAILED,
+                    claimed_by=None,
+                    finished_at=clock.now(),
+                    last_error="User status was reset",
+                )
+            )
+            enqueue(session, outbox, clock)
             session.commit()
+            RemovalWorkflow._journal(
+                user_id,
+                guild_id,
+                from_status,
+                RemovalStatus.ACTIVE,
+                clock.now(),
+                actor=actor,
+            )
 
     @staticmethod
-    def increment_bot_retries(session: Session, user_id: str) -> int:
-        """Increment the bot_retries counter for a user. Returns the new count."""
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
-        if user:
-            user.bot_retries = (user.bot_retries or 0) + 1
-            session.commit()
-            return user.bot_retries
-        return 0
+    def mark_first_warning_failed(
+        session: Session,
+        user_id: str,
+        guild_id: str,
+        clock: Clock = SYSTEM_CLOCK,
+        outbox: Sequence[dict] = (),
+    ) -> int:
+        """
+        The first warning DM couldn't be delivered: back to PENDING_REMOVAL so
+        it is retried after an exponential backoff, counting the failure.
+        Returns the new bot_retries.
+        """
+        user = RemovalWorkflow._get(session, user_id, guild_id)
+        if not user or user.removal_status != RemovalStatus.FIRST_WARNING_SENT:
+            return 0
+        from_status = user.removal_status
+        user.removal_status = RemovalStatus.PENDING_REMOVAL
+        user.first_warning_sent_at = None
+        user.bot_retries = (user.bot_retries or 0) + 1
+        retries = user.bot_retries
+        user.next_attempt_at = clock.now() + RemovalWorkflow.retry_backoff(retries)
+        enqueue(session, outbox, clock)
+        session.commit()
+        RemovalWorkflow._journal(
+            user_id,
+            guild_id,
+            from_status,
+            RemovalStatus.PENDING_REMOVAL,
+            clock.now(),
+        )
+        return retries
+
+    @staticmethod
+    def retry_backoff(retries: int) -> datetime.timedelta:
+        """How long to wait before the next first warning attempt"""
+        return min(RETRY_BACKOFF_BASE * 2 ** max(retries - 1, 0), RETRY_BACKOFF_MAX)
+
+    @staticmethod
+    def record_dm_delivered(
+        session: Session, user_id: str, guild_id: str, field: str, message_id: str
+    ) -> None:
+        """
+        Store a delivered DM's ID in `field` (e.g. first_warning_message_id) and
+        reset the retry count. Runs inside the outbox's transaction, caller commits.
+        """
+        session.query(TrackedUser).filter_by(guild_id=guild_id, user_id=user_id).update(
+            {field: message_id, "bot_retries": 0, "next_attempt_at": None},
+            synchronize_session=False,
+        )
+
+    @staticmethod
+    def get_user_status(
+        session: Session, user_id: str, guild_id: str
+    ) -> Optional[TrackedUser]:
+        """Get the current status of a user in a guild"""
+        return RemovalWorkflow._get(session, user_id, guild_id)
 
     @staticmethod
-    def get_user_status(session: Session, user_id: str) -> Optional[TrackedUser]:
-        """Get the current status of a user"""
-        return session.query(TrackedUser).filter_by(user_id=user_id).first()
+    def get_removal_queue_page(
+        session: Session,
+        guild_id: str,
+        status: RemovalStatus,
+        after: Optional[Tuple[datetime.datetime, str]] = None,
+        limit: int = 15,
+    ) -> Tuple[list, Optional[Tuple[datetime.datetime, str]]]:
+        """
+        One page of users in `status`, soonest removal first. Keyset paged on
+        (removal_date, user_id) so every page is one range scan of the
+        guild/status/date index. Returns the rows and the cursor for the next
+        page (None on the last page).
+        """
+        stmt = select(
+            TrackedUser.user_id,
+            TrackedUser.removal_date,
+            TrackedUser.joined_at,
+            TrackedUser.bot_retries,
+        ).where(
+            TrackedUser.guild_id == guild_id,
+            TrackedUser.departed_at.is_(None),
+            TrackedUser.removal_status == status,
+            TrackedUser.removal_date.isnot(None),
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(TrackedUser.removal_date, TrackedUser.user_id) > tuple_(*after)
+            )
+        rows = session.execute(
+            stmt.order_by(TrackedUser.removal_date, TrackedUser.user_id).limit(
+                limit + 1
+            )
+        ).all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, (rows[-1].removal_date, rows[-1].user_id)
+        return rows, None
 
     @staticmethod
     def get_removal_summary(session: Session, guild_id: str) -> dict:
@@ -0,0 +1,64 @@
+"""
+Shard cluster helpers for running the bot as several AutoShardedBot processes
+"""
+
+import os
+from typing import List, Optional
+
+
+def _shard_count_from_env() -> Optional[int]:
+    """Parse SHARD_COUNT. Unset means unsharded, 0 ("auto") lets Discord decide."""
+    raw = os.environ.get("SHARD_COUNT")
+    if raw is None or raw == "":
+        return None
+    if raw.lower() == "auto":
+        return 0
+    return int(raw)
+
+
+SHARD_COUNT = _shard_count_from_env()
+CLUSTER_COUNT = int(os.environ.get("CLUSTER_COUNT", "1"))
+CLUSTER_ID = int(os.environ.get("CLUSTER_ID", "0"))
+
+if CLUSTER_COUNT > 1 and not SHARD_COUNT:
+    raise RuntimeError(
+        "CLUSTER_COUNT > 1 needs an explicit SHARD_COUNT so clusters agree on the split"
+    )
+if not 0 <= CLUSTER_ID < CLUSTER_COUNT:
+    raise RuntimeError(f"CLUSTER_ID {CLUSTER_ID} is outside 0..{CLUSTER_COUNT - 1}")
+
+
+def is_sharded() -> bool:
+    """True when the bot should run as an AutoShardedBot."""
+    return SHARD_COUNT is not None
+
+
+def is_primary_cluster() -> bool:
+    """The first cluster owns process-wide chores like command sync."""
+    return CLUSTER_ID == 0
+
+
+def cluster_shard_ids(
+    cluster_id: int = CLUSTER_ID,
+    cluster_count: int = CLUSTER_COUNT,
+    shard_count: Optional[int] = SHARD_COUNT,
+) -> Optional[List[int]]:
+    """Shards handled by a cluster, or None to let discord.py run all of them."""
+    if not shard_count or cluster_count <= 1:
+        return None
+    return [
+        shard for shard in range(shard_count) if shard % cluster_count == cluster_id
+    ]
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Discord's shard formula: (guild_id >> 22) % shard_count"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def owns_guild(guild_id: int) -> bool:
+    """Check if this cluster is responsible for a guild."""
+    shard_ids = cluster_shard_ids()
+    if shard_ids is None:
+        return True
+    return shard_for_guild(guild_id, SHARD_COUNT) in shard_ids
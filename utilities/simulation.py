@@ -0,0 +1,310 @@
+"""
+Replay the gatekeeper removal lifecycle on a simulated clock.
+
+Drives the real Gatekeeper cog (sync_member, removal_check_loop and the
+RemovalWorkflow queries behind them) against fake Discord objects and a
+throwaway SQLite database, so days of joins, verifications, warnings and kicks
+play out without waiting for them. Handy for what-if runs before changing the
+timings:
+
+    python -m utilities.simulation --users 5000 --verify-rate 0.6 --days 12
+
+Sleeps on the simulated clock are instant, but every join, warning, kick and
+outbox delivery is still a real committed transaction, so throughput is about
+20 users per second of wall time: 1000 users over 14 days take about a minute,
+the example above about 4.5 minutes. Most of that is per-user transactions,
+a coarser --tick-minutes only saves the per-tick rescans.
+"""
+
+import argparse
+import asyncio
+import datetime
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_ids = itertools.count(10**17)
+
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.id = next(_ids)
+        self.channel = channel
+        self.content = content
+
+
+class FakeChannel:
+    """Text or DM channel that records what was sent to it."""
+
+    def __init__(self, channel_id=None, name="channel"):
+        self.id = channel_id or next(_ids)
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(self, content)
+        self.sent.append(message)
+        return message
+
+
+class FakeRole:
+    def __init__(self, name, role_id=None):
+        self.id = role_id or next(_ids)
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+
+class FakeMember:
+    def __init__(self, guild, member_id=None, joined_at=None, bot=False, admin=False):
+        self.id = member_id or next(_ids)
+        self.guild = guild
+        self.joined_at = joined_at
+        self.bot = bot
+        self.display_name = f"user{self.id}"
+        self.mention = f"<@{self.id}>"
+        self.guild_permissions = SimpleNamespace(administrator=admin)
+        self.roles = [guild.default_role]
+        self.dm_channel = FakeChannel(name=f"dm-{self.id}")
+        self.dms_closed = False
+        self.kicked = False
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    def add_role(self, role):
+        if role not in self.roles:
+            self.roles = self.roles + [role]
+
+    async def send(self, content=None, **kwargs):
+        if self.dms_closed:
+            raise _forbidden_50007()
+        return await self.dm_channel.send(content, **kwargs)
+
+    async def kick(self, reason=None):
+        self.kicked = True
+        self.guild.members_by_id.pop(self.id, None)
+
+
+class FakeGuild:
+    def __init__(self, guild_id=None, name="Sim Guild"):
+        self.id = guild_id or next(_ids)
+        self.name = name
+        self.default_role = FakeRole("@everyone", role_id=self.id)
+        self.members_by_id = {}
+        self.channels_by_id = {}
+        self.roles_by_id = {}
+        self.chunked = True
+
+    @property
+    def members(self):
+        return list(self.members_by_id.values())
+
+    def add_member(self, member):
+        self.members_by_id[member.id] = member
+        return member
+
+    def add_channel(self, channel):
+        self.channels_by_id[channel.id] = channel
+        return channel
+
+    def add_role(self, role):
+        self.roles_by_id[role.id] = role
+        return role
+
+    def get_member(self, member_id):
+        return self.members_by_id.get(member_id)
+
+    def get_channel(self, channel_id):
+        return self.channels_by_id.get(channel_id)
+
+    def get_role(self, role_id):
+        return self.roles_by_id.get(role_id)
+
+    async def fetch_members(self, limit=None):
+        for member in self.members:
+            yield member
+
+
+class FakeBot:
+    def __init__(self, guilds=()):
+        self.guilds = list(guilds)
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_partial_messageable(self, channel_id, **kwargs):
+        return FakeChannel(channel_id)
+
+
+def _forbidden_50007():
+    import discord
+
+    response = SimpleNamespace(status=403, reason="Forbidden")
+    return discord.Forbidden(
+        response, {"code": 50007, "message": "Cannot send messages to this user"}
+    )
+
+
+def use_temp_database() -> str:
+    """
+    Point every module level engine at a fresh SQLite file. Must run before
+    importing cogs/utilities that create their engine at import time.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="patsbot-sim-"), "sim.sqlite")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.engine import Engine
+    from PatsBot.models import Base
+
+    @event.listens_for(Engine, "connect")
+    def _fast_sqlite(dbapi_connection, connection_record):
+        # Throwaway DB, durability doesn't matter but fsyncs would dominate
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.close()
+
+    Base.metadata.create_all(create_engine(os.environ["DATABASE_URL"]))
+    return path
+
+
+async def simulate_lifecycle(
+    users: int = 1000,
+    days: float = 14,
+    verify_rate: float = 0.5,
+    closed_dm_rate: float = 0.02,
+    join_window_days: float = 2,
+    tick_minutes: float = 60,
+    seed: int = 0,
+) -> dict:
+    """
+    Replay `days` of gatekeeper activity for `users` synthetic joins. Expects
+    use_temp_database() to have run first. Returns counters for the run.
+    """
+    from cogs.gatekeeper import Gatekeeper, Session
+    from utilities.clock import SimulatedClock
+    from utilities.guild_leases import rebalance_leases
+    from utilities.guild_settings import set_guild_settings
+    from utilities.removal_workflow import RemovalWorkflow
+
+    rng = random.Random(seed)
+    clock = SimulatedClock(datetime.datetime(2025, 1, 1))
+    start = clock.now()
+
+    guild = FakeGuild()
+    verified_role = guild.add_role(FakeRole("Verified"))
+    admin_channel = guild.add_channel(FakeChannel(name="gatekeeper-admin"))
+    bot = FakeBot([guild])
+    set_guild_settings(
+        guild.id,
+        {
+            "gatekeeper_enabled": True,
+            "gatekeeper_admin_channel": admin_channel.id,
+            "gatekeeper_required_role": verified_role.name,
+        },
+    )
+
+    cog = Gatekeeper(bot, clock=clock)
+    cog.leased_guild_ids = rebalance_leases([guild.id])
+
+    # Schedule (time, action, member) events: joins, and verifications for some
+    events = []
+    for _ in range(users):
+        joined_at = start + datetime.timedelta(days=rng.uniform(0, join_window_days))
+        member = FakeMember(guild, joined_at=joined_at)
+        member.dms_closed = rng.random() < closed_dm_rate
+        events.append((joined_at, "join", member))
+        if rng.random() < verify_rate:
+            verify_at = joined_at + datetime.timedelta(days=rng.expovariate(1 / 2))
+            events.append((verify_at, "verify", member))
+    events.sort(key=lambda event: event[0])
+
+    end = start + datetime.timedelta(days=days)
+    tick = datetime.timedelta(minutes=tick_minutes)
+    next_event = 0
+    ticks = 0
+    wall_start = time.perf_counter()
+
+    while clock.now() < end:
+        # Apply everything that happened since the last tick
+        while next_event < len(events) and events[next_event][0] <= clock.now():
+            _, action, member = events[next_event]
+            next_event += 1
+            if member.kicked:
+                continue
+            if action == "join":
+                guild.add_member(member)
+                await cog.on_member_join(member)
+            else:
+                member.add_role(verified_role)
+
+        tick_start = clock.now()
+        await cog.removal_check_loop()
+        # Deliver the DMs, kicks and admin posts the tick queued
+        await cog.outbox.drain()
+        ticks += 1
+        # The loop's own rate limit sleeps already advanced the clock
+        clock.advance(max(tick - (clock.now() - tick_start), datetime.timedelta(0)))
+
+    session = Session()
+    try:
+        summary = RemovalWorkflow.get_removal_summary(session, str(guild.id))
+    finally:
+        session.close()
+
+    dms = sum(len(m.dm_channel.sent) for _, a, m in events if a == "join")
+    return {
+        "users": users,
+        "ticks": ticks,
+        "simulated_days": (clock.now() - start).total_seconds() / 86400,
+        "wall_seconds": time.perf_counter() - wall_start,
+        "dms_sent": dms,
+        "admin_posts": len(admin_channel.sent),
+        "kicked": sum(1 for _, a, m in events if a == "join" and m.kicked),
+        **summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--verify-rate", type=float, default=0.5)
+    parser.add_argument("--closed-dm-rate", type=float, default=0.02)
+    parser.add_argument("--join-window-days", type=float, default=2)
+    parser.add_argument("--tick-minutes", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    results = asyncio.run(
+        simulate_lifecycle(
+            users=args.users,
+            days=args.days,
+            verify_rate=args.verify_rate,
+            closed_dm_rate=args.closed_dm_rate,
+            join_window_days=args.join_window_days,
+            tick_minutes=args.tick_minutes,
+            seed=args.seed,
+        )
+    )
+
+    print(f"🧪 Removal lifecycle simulation (db: {path})")
+    print("-" * 50)
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
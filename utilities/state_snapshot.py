@@ -0,0 +1,179 @@
+"""
+Warm restart snapshot of gatekeeper state
+
+Layout (little endian):
+
+    header   magic "PBSNAP\\0\\0", version u32, metadata length u32,
+             crc32 of everything after the header u32, reserved u32
+    metadata JSON: written_at, guild_ids, and per guild its config, when its
+             members were last synced and where its member ID array starts
+    arrays   sorted uint64 member IDs per guild, 8 byte aligned
+
+The arrays are read straight out of an mmap, so loading is cheap however many
+members there are, and membership checks are a binary search.
+"""
+
+import bisect
+import datetime
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from utilities.sharding import CLUSTER_ID
+
+DATA_DIR = Path(__file__).parent.parent / "PatsBot" / "Data"
+# One file per cluster, they run in separate processes
+SNAPSHOT_PATH = os.environ.get(
+    "GATEKEEPER_SNAPSHOT_PATH", str(DATA_DIR / f".gatekeeper{CLUSTER_ID}.snapshot")
+)
+# Older snapshots are ignored, a full sync is cheaper than reconciling that much
+SNAPSHOT_MAX_AGE = datetime.timedelta(
+    hours=float(os.environ.get("GATEKEEPER_SNAPSHOT_MAX_AGE_HOURS", "24"))
+)
+
+MAGIC = b"PBSNAP\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII")
+
+logger = logging.getLogger(__name__)
+
+
+class GuildState(NamedTuple):
+    """What gets written for one guild."""
+
+    config: dict  # Gatekeeper settings the sync was done under
+    synced_at: datetime.datetime
+    member_ids: Iterable[int]  # Everyone in the guild as of synced_at
+
+
+class GuildCheckpoint:
+    """One guild's state from a loaded snapshot. member_ids is a view on the mmap."""
+
+    def __init__(self, config: dict, synced_at: datetime.datetime, member_ids):
+        self.config = config
+        self.synced_at = synced_at
+        self.member_ids = member_ids
+
+    def __contains__(self, member_id: int) -> bool:
+        i = bisect.bisect_left(self.member_ids, member_id)
+        return i < len(self.member_ids) and self.member_ids[i] == member_id
+
+    def __len__(self) -> int:
+        return len(self.member_ids)
+
+
+class Snapshot:
+    def __init__(self, written_at, guild_ids, checkpoints, mapped=None):
+        self.written_at = written_at
+        self.guild_ids = guild_ids  # Guilds whose records already exist in the DB
+        self.checkpoints = checkpoints  # guild_id -> GuildCheckpoint
+        self._mapped = mapped
+
+    def checkpoint(self, guild_id: int) -> Optional[GuildCheckpoint]:
+        return self.checkpoints.get(guild_id)
+
+    def close(self):
+        """Release the mmap, checkpoints can't be used after this."""
+        for checkpoint in self.checkpoints.values():
+            checkpoint.member_ids.release()
+        self.checkpoints = {}
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+
+def write_snapshot(
+    guilds: Dict[int, GuildState],
+    guild_ids: Iterable[int],
+    written_at: datetime.datetime,
+    path: str = SNAPSHOT_PATH,
+):
+    """Write atomically, a crash mid-write leaves the previous snapshot."""
+    arrays = []
+    offset = 0
+    meta_guilds = {}
+    for guild_id, state in guilds.items():
+        ids = array("Q", sorted(state.member_ids))
+        if sys.byteorder != "little":
+            ids.byteswap()
+        meta_guilds[str(guild_id)] = {
+            "config": state.config,
+            "synced_at": state.synced_at.isoformat(),
+            "offset": offset,
+            "count": len(ids),
+        }
+        arrays.append(ids.tobytes())
+        offset += len(arrays[-1])
+
+    meta = json.dumps(
+        {
+            "written_at": written_at.isoformat(),
+            "guild_ids": sorted(guild_ids),
+            "guilds": meta_guilds,
+        }
+    ).encode()
+    meta += b" " * (-(HEADER.size + len(meta)) % 8)  # Align the arrays
+    body = meta + b"".join(arrays)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(meta), zlib.crc32(body), 0))
+        file.write(body)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(
+    now: datetime.datetime,
+    path: str = SNAPSHOT_PATH,
+    max_age: datetime.timedelta = SNAPSHOT_MAX_AGE,
+) -> Optional[Snapshot]:
+    """The snapshot at `path`, or None if it's missing, stale or doesn't validate."""
+    if sys.byteorder != "little":
+        return None  # The arrays are viewed in place, they must be native order
+    try:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None  # ValueError: empty file
+
+    try:
+        magic, version, meta_length, crc, _ = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"unknown format {magic!r} v{version}")
+        body = memoryview(mapped)[HEADER.size :]
+        if zlib.crc32(body) != crc:
+            raise ValueError("checksum mismatch")
+        meta = json.loads(bytes(body[:meta_length]))
+        written_at = datetime.datetime.fromisoformat(meta["written_at"])
+        if now - written_at > max_age:
+            logger.info(f"Ignoring snapshot from {written_at}, too old")
+            body.release()
+            mapped.close()
+            return None
+
+        arrays = body[meta_length:]
+        checkpoints = {}
+        for guild_id, guild in meta["guilds"].items():
+            start, count = guild["offset"], guild["count"]
+            checkpoints[int(guild_id)] = GuildCheckpoint(
+                guild["config"],
+                datetime.datetime.fromisoformat(guild["synced_at"]),
+                arrays[start : start + count * 8].cast("Q"),
+            )
+        return Snapshot(written_at, set(meta["guild_ids"]), checkpoints, mapped)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # Views still point into it, the GC will close it
+        return None
@@ -62,9 +62,13 @@ def mark_user_for_removal(user_id: str, guild_id: str):
     """Mark a user for removal (sets removal date to 7 days from now)"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         # Set removal date to 7 days from now
@@ -85,13 +89,17 @@ def mark_user_for_removal(user_id: str, guild_id: str):
         session.close()
 
 
-def simulate_first_warning_sent(user_id: str):
+def simulate_first_warning_sent(user_id: str, guild_id: str):
     """Simulate that first warning was sent (sets first_warning_sent_at to now)"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         user.removal_status = RemovalStatus.FIRST_WARNING_SENT
@@ -105,13 +113,17 @@ def simulate_first_warning_sent(user_id: str):
         session.close()
 
 
-def simulate_final_notice_sent(user_id: str):
+def simulate_final_notice_sent(user_id: str, guild_id: str):
     """Simulate that final notice was sent (sets final_notice_sent_at to now)"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         user.removal_status = RemovalStatus.FINAL_NOTICE_SENT
@@ -125,13 +137,17 @@ def simulate_final_notice_sent(user_id: str):
         session.close()
 
 
-def simulate_user_removed(user_id: str):
+def simulate_user_removed(user_id: str, guild_id: str):
     """Simulate that user was removed (sets removed_at to now)"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         user.removal_status = RemovalStatus.REMOVED
@@ -145,13 +161,17 @@ def simulate_user_removed(user_id: str):
         session.close()
 
 
-def reset_user_status(user_id: str):
+def reset_user_status(user_id: str, guild_id: str):
     """Reset a user's status to active"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         user.removal_status = RemovalStatus.ACTIVE
@@ -170,13 +190,17 @@ def reset_user_status(user_id: str):
         session.close()
 
 
-def set_removal_date(user_id: str, days_from_now: int):
+def set_removal_date(user_id: str, guild_id: str, days_from_now: int):
     """Set a user's removal date to a specific number of days from now"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         removal_date = datetime.utcnow() + timedelta(days=days_from_now)
@@ -191,13 +215,17 @@ def set_removal_date(user_id: str, days_from_now: int):
         session.close()
 
 
-def set_joined_date(user_id: str, days_ago: int):
+def set_joined_date(user_id: str, guild_id: str, days_ago: int):
     """Set a user's joined date to a specific number of days ago"""
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
 
         joined_date = datetime.utcnow() - timedelta(days=days_ago)
@@ -212,12 +240,16 @@ def set_joined_date(user_id: str, days_ago: int):
         session.close()
 
 
-def set_first_warning_date(user_id: str, days_ago: int):
+def set_first_warning_date(user_id: str, guild_id: str, days_ago: int):
     session = Session()
     try:
-        user = session.query(TrackedUser).filter_by(user_id=user_id).first()
+        user = (
+            session.query(TrackedUser)
+            .filter_by(user_id=user_id, guild_id=guild_id)
+            .first()
+        )
         if not user:
-            print(f"❌ User {user_id} not found in database")
+            print(f"❌ User {user_id} not found in guild {guild_id}")
             return
         user.removal_status = RemovalStatus.FIRST_WARNING_SENT
         user.first_warning_sent_at = datetime.utcnow() - timedelta(days=days_ago)
@@ -236,15 +268,17 @@ def main():
         print("\nAvailable commands:")
         print("1. list - List all tracked users")
         print("2. mark <user_id> <guild_id> - Mark user for removal")
-        print("3. first <user_id> - Simulate first warning sent")
-        print("4. final <user_id> - Simulate final notice sent")
-        print("5. remove <user_id> - Simulate user removed")
-        print("6. reset <user_id> - Reset user status to active")
-        print("7. set_removal <user_id> <days> - Set removal date (days from now)")
-        print("8. set_joined <user_id> <days> - Set joined date (days ago)")
+        print("3. first <user_id> <guild_id> - Simulate first warning sent")
+        print("4. final <user_id> <guild_id> - Simulate final notice sent")
+        print("5. remove <user_id> <guild_id> - Simulate user removed")
+        print("6. reset <user_id> <guild_id> - Reset user status to active")
+        print(
+            "7. set_removal <user_id> <guild_id> <days> - Set removal date (days from now)"
+        )
+        print("8. set_joined <user_id> <guild_id> <days> - Set joined date (days ago)")
         print("9. quit - Exit")
         print(
-            "10. set_first_warning <user_id> <days> - Set first warning date (days ago)"
+            "10. set_first_warning <user_id> <guild_id> <days> - Set first warning date (days ago)"
         )
 
         command = input("\nEnter command: ").strip().split()
@@ -259,20 +293,20 @@ def main():
                 list_users()
             elif cmd == "mark" and len(command) >= 3:
                 mark_user_for_removal(command[1], command[2])
-            elif cmd == "first" and len(command) >= 2:
-                simulate_first_warning_sent(command[1])
-            elif cmd == "final" and len(command) >= 2:
-                simulate_final_notice_sent(command[1])
-            elif cmd == "remove" and len(command) >= 2:
-                simulate_user_removed(command[1])
-            elif cmd == "reset" and len(command) >= 2:
-                reset_user_status(command[1])
-            elif cmd == "set_removal" and len(command) >= 3:
-                set_removal_date(command[1], int(command[2]))
-            elif cmd == "set_joined" and len(command) >= 3:
-                set_joined_date(command[1], int(command[2]))
-            elif cmd == "set_first_warning" and len(command) >= 3:
-                set_first_warning_date(command[1], int(command[2]))
+            elif cmd == "first" and len(command) >= 3:
+                simulate_first_warning_sent(command[1], command[2])
+            elif cmd == "final" and len(command) >= 3:
+                simulate_final_notice_sent(command[1], command[2])
+            elif cmd == "remove" and len(command) >= 3:
+                simulate_user_removed(command[1], command[2])
+            elif cmd == "reset" and len(command) >= 3:
+                reset_user_status(command[1], command[2])
+            elif cmd == "set_removal" and len(command) >= 4:
+                set_removal_date(command[1], command[2], int(command[3]))
+            elif cmd == "set_joined" and len(command) >= 4:
+                set_joined_date(command[1], command[2], int(command[3]))
+            elif cmd == "set_first_warning" and len(command) >= 4:
+                set_first_warning_date(command[1], command[2], int(command[3]))
             elif cmd == "quit":
                 print("👋 Goodbye!")
                 break
@@ -0,0 +1,116 @@
+"""
+Moves departed, removed and orphaned users out of tracked_users in batches
+"""
+
+import datetime
+import os
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import create_engine, delete, insert, select, tuple_
+from sqlalchemy.orm import sessionmaker
+
+from PatsBot.models import ArchivedTrackedUser, RemovalStatus, TrackedUser
+from utilities.clock import Clock, SYSTEM_CLOCK
+
+# Use the same DB URL logic as Alembic
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./.local.sqlite"
+engine = create_engine(DATABASE_URL, future=True)
+Session = sessionmaker(bind=engine)
+
+# How long departed/removed rows stay put, in case the user (or the bot) is back
+ARCHIVE_AFTER = datetime.timedelta(
+    days=int(os.environ.get("TRACKED_USER_ARCHIVE_DAYS", "7"))
+)
+ARCHIVE_BATCH_SIZE = int(os.environ.get("TRACKED_USER_ARCHIVE_BATCH_SIZE", "500"))
+
+tracked_users = TrackedUser.__table__
+
+
+def get_tracked_guild_ids() -> List[str]:
+    """Every guild with rows in tracked_users, to spot ones the bot has left."""
+    session = Session()
+    try:
+        return session.scalars(select(TrackedUser.guild_id).distinct()).all()
+    finally:
+        session.close()
+
+
+def archive_rules(
+    clock: Clock = SYSTEM_CLOCK, orphaned_guild_ids: Iterable[str] = ()
+) -> List[Tuple[str, tuple]]:
+    """(reason, criteria) pairs for archive_batch, most specific reason first."""
+    cutoff = clock.now() - ARCHIVE_AFTER
+    rules = []
+    orphaned_guild_ids = list(orphaned_guild_ids)
+    if orphaned_guild_ids:
+        rules.append(
+            (
+                "orphaned",
+                (
+                    TrackedUser.guild_id.in_(orphaned_guild_ids),
+                    TrackedUser.departed_at <= cutoff,
+                ),
+            )
+        )
+    rules.append(
+        (
+            "removed",
+            (
+                TrackedUser.removal_status == RemovalStatus.REMOVED,
+                TrackedUser.removed_at <= cutoff,
+                # A failed kick leaves them in the guild, keep their row
+                TrackedUser.departed_at.is_not(None),
+            ),
+        )
+    )
+    rules.append(("departed", (TrackedUser.departed_at <= cutoff,)))
+    return rules
+
+
+def archive_batch(
+    reason: str,
+    criteria: tuple,
+    clock: Clock = SYSTEM_CLOCK,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Move up to `batch_size` rows matching `criteria` to tracked_users_archive
+    in one transaction. The DELETE returns the rows it removed, so replicas
+    archiving at the same time never copy a row twice. Returns rows moved.
+    """
+    batch = (
+        select(TrackedUser.guild_id, TrackedUser.user_id)
+        .where(*criteria)
+        .order_by(TrackedUser.guild_id, TrackedUser.user_id)
+        .limit(batch_size)
+    )
+    session = Session()
+    try:
+        # Criteria are repeated so rows changed since the subquery (a rejoin) stay
+        rows = (
+            session.execute(
+                delete(tracked_users)
+                .where(
+                    tuple_(tracked_users.c.guild_id, tracked_users.c.user_id).in_(
+                        batch
+                    ),
+                    *criteria,
+                )
+                .returning(*tracked_users.c)
+            )
+            .mappings()
+            .all()
+        )
+        if rows:
+            now = clock.now()
+            session.execute(
+                insert(ArchivedTrackedUser),
+                [{**row, "archived_at": now, "archive_reason": reason} for row in rows],
+            )
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
@@ -0,0 +1,12 @@
+"""
+Dialect helpers for INSERT ... ON CONFLICT statements
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(bind, table):
+    """Return an insert() for the bind's dialect so on_conflict_* is available."""
+    if bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)